@@ -0,0 +1,69 @@
+"""
+Scaling benchmark for engine.compute_churn_risk
+
+Generates synthetic customers/events/tickets at increasing sizes and times the
+columnar churn-risk engine.
+
+Usage:
+    python benchmarks/bench_churn_risk.py
+    python benchmarks/bench_churn_risk.py --sizes 10000 100000 1000000 --events-per-customer 20
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from engine import compute_churn_risk
+
+REFERENCE_DATE = '2024-12-12'
+EVENT_TYPES = ['login', 'feature_use', 'page_view', 'export_data', 'invite_sent']
+
+
+def make_inputs(num_customers, events_per_customer, seed=42):
+    """Build synthetic customers, events and tickets frames."""
+    rng = np.random.default_rng(seed)
+    ids = pd.Series([f'U{i+1:08d}' for i in range(num_customers)])
+    customers = pd.DataFrame({'customer_id': ids})
+
+    num_events = num_customers * events_per_customer
+    ref = pd.Timestamp(REFERENCE_DATE)
+    events = pd.DataFrame({
+        'customer_id': ids.values[rng.integers(0, num_customers, num_events)],
+        'event_name': np.array(EVENT_TYPES)[rng.integers(0, len(EVENT_TYPES), num_events)],
+        'event_timestamp': ref - pd.to_timedelta(rng.integers(0, 365, num_events), unit='D')
+    })
+
+    num_tickets = num_customers // 5
+    tickets = pd.DataFrame({
+        'customer_id': ids.values[rng.integers(0, num_customers, num_tickets)],
+        'satisfaction_score': rng.integers(1, 6, num_tickets).astype(float)
+    })
+    return customers, events, tickets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--events-per-customer', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    print(f"{'customers':>12} {'events':>14} {'seconds':>10} {'customers/s':>14}")
+    for size in args.sizes:
+        customers, events, tickets = make_inputs(size, args.events_per_customer)
+        start = time.perf_counter()
+        compute_churn_risk(customers, events, tickets, REFERENCE_DATE)
+        elapsed = time.perf_counter() - start
+        print(f"{size:>12,} {len(events):>14,} {elapsed:>10.3f} {size / elapsed:>14,.0f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
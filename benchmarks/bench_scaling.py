@@ -0,0 +1,277 @@
+"""
+Scaling benchmark suite for the public metric functions
+
+Generates synthetic users and raw tables at increasing sizes (the vectorized
+simulator and snapshot builder behind export_data_snapshots.py), times every
+metric function on them and records its peak traced memory. Results are
+written as JSON; a previous results file can be passed as the baseline to
+fail on time or memory regressions. The scaling table reports the log-log
+slope between the two largest sizes per function, so anything growing
+faster than linearly stands out.
+
+Usage:
+    python benchmarks/bench_scaling.py
+    python benchmarks/bench_scaling.py --sizes 1000 10000 100000 1000000 10000000 --output results.json
+    python benchmarks/bench_scaling.py --baseline benchmarks/baseline.json --sizes 1000 10000 100000
+    python benchmarks/bench_scaling.py --only compute_rfm compute_churn_risk --plot scaling.png
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add repo root (export_data_snapshots) and src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from export_data_snapshots import SNAPSHOT_END, _snapshot_rng, build_snapshots
+from engine import compute_churn_risk
+from funnel import calculate_funnel_metrics, calculate_conversion_summary
+from ledger import PlanChangeLedger
+from metrics import compute_rfm
+from retention import calculate_retention_metrics, calculate_churn_rate_monthly, generate_cohort_retention_matrix
+from revenue import calculate_revenue_metrics, calculate_mrr_bridge, calculate_net_revenue_retention
+from unit_economics import calculate_unit_economics, calculate_unit_economics_summary
+from user_simulation import generate_user_lifecycle
+
+REFERENCE_DATE = SNAPSHOT_END
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+# Benchmark name -> function of the inputs dict built by make_inputs
+BENCHMARKS = {
+    'calculate_funnel_metrics': lambda d: calculate_funnel_metrics(d['users']),
+    'calculate_conversion_summary': lambda d: calculate_conversion_summary(d['users']),
+    'calculate_retention_metrics': lambda d: calculate_retention_metrics(d['users']),
+    'calculate_churn_rate_monthly': lambda d: calculate_churn_rate_monthly(d['users']),
+    'generate_cohort_retention_matrix': lambda d: generate_cohort_retention_matrix(d['users']),
+    'calculate_revenue_metrics': lambda d: calculate_revenue_metrics(d['users']),
+    'plan_change_ledger': lambda d: PlanChangeLedger.from_users(d['users']),
+    'calculate_mrr_bridge': lambda d: calculate_mrr_bridge(d['users']),
+    'calculate_net_revenue_retention': lambda d: calculate_net_revenue_retention(d['users']),
+    'calculate_unit_economics': lambda d: calculate_unit_economics(d['users']),
+    'calculate_unit_economics_summary': lambda d: calculate_unit_economics_summary(d['economics']),
+    'compute_rfm': lambda d: compute_rfm(d['customers'], d['transactions'], REFERENCE_DATE, events_df=d['events']),
+    'compute_churn_risk': lambda d: compute_churn_risk(d['customers'], d['events'], d['support_tickets'],
+                                                       REFERENCE_DATE),
+}
+
+
+def make_inputs(num_users, seed=42):
+    """Simulated users, the raw tables built from them, and per-user unit economics."""
+    users = generate_user_lifecycle(num_users=num_users, start_date='2022-01-01', end_date=SNAPSHOT_END,
+                                    seed=seed)
+    inputs = build_snapshots(users, _snapshot_rng(seed, 0))
+    inputs['users'] = users
+    inputs['economics'] = calculate_unit_economics(users)
+    return inputs
+
+
+def time_call(func, inputs, repeat):
+    """Best wall time of func(inputs) over up to repeat runs (runs over 5s are not repeated)."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(inputs)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        if elapsed > 5:
+            break
+    return best
+
+
+def peak_memory_mb(func, inputs):
+    """Peak memory traced while running func(inputs) once, in MB."""
+    tracemalloc.start()
+    try:
+        func(inputs)
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(sizes, names, repeat=3, seed=42, memory=True):
+    """
+    Time (and optionally trace) every benchmark at every size.
+
+    Returns:
+        List of dicts with benchmark, size, seconds and peak_mb (None
+        without memory tracing)
+    """
+    results = []
+    for size in sizes:
+        start = time.perf_counter()
+        inputs = make_inputs(size, seed)
+        print(f"\n{size:,} users ({len(inputs['events']):,} events, {len(inputs['transactions']):,} transactions; "
+              f"built in {time.perf_counter() - start:.1f}s)")
+        for name in names:
+            seconds = time_call(BENCHMARKS[name], inputs, repeat)
+            peak_mb = peak_memory_mb(BENCHMARKS[name], inputs) if memory else None
+            memory_note = f"{peak_mb:>10.1f} MB" if peak_mb is not None else ""
+            print(f"  {name:<34} {seconds:>10.4f}s {memory_note}")
+            results.append({'benchmark': name, 'size': size, 'seconds': seconds, 'peak_mb': peak_mb})
+        del inputs
+    return results
+
+
+def scaling_exponents(results, min_seconds=0.01):
+    """
+    Log-log slope of time against size between the two largest sizes, per benchmark.
+
+    1.0 is linear and 2.0 quadratic. Runs faster than min_seconds are
+    dominated by fixed overhead and are not used.
+
+    Returns:
+        Dict of benchmark -> exponent (None with fewer than two usable sizes)
+    """
+    exponents = {}
+    for name in dict.fromkeys(r['benchmark'] for r in results):
+        points = sorted((r['size'], r['seconds']) for r in results
+                        if r['benchmark'] == name and r['seconds'] >= min_seconds)
+        if len(points) < 2:
+            exponents[name] = None
+            continue
+        (small, small_seconds), (large, large_seconds) = points[-2:]
+        exponents[name] = float(np.log(large_seconds / small_seconds) / np.log(large / small))
+    return exponents
+
+
+def print_scaling_table(results, exponents, superlinear=1.15):
+    """Seconds per size for every benchmark, with its scaling exponent."""
+    sizes = sorted({r['size'] for r in results})
+    seconds = {(r['benchmark'], r['size']): r['seconds'] for r in results}
+    header = f"{'benchmark':<34}" + "".join(f"{size:>12,}" for size in sizes) + f"{'exponent':>10}"
+    print("\n" + header)
+    print("-" * len(header))
+    for name, exponent in exponents.items():
+        cells = "".join(f"{seconds[(name, size)]:>12.4f}" if (name, size) in seconds else f"{'-':>12}"
+                        for size in sizes)
+        flag = "  super-linear" if exponent is not None and exponent > superlinear else ""
+        exponent_text = f"{exponent:>10.2f}" if exponent is not None else f"{'-':>10}"
+        print(f"{name:<34}{cells}{exponent_text}{flag}")
+
+
+def compare_to_baseline(results, baseline, time_threshold=0.25, memory_threshold=0.25,
+                        min_seconds=0.1, min_mb=1.0):
+    """
+    Regressions of results against a baseline results list.
+
+    A time (memory) regression is a slowdown (growth) beyond the relative
+    threshold that is also larger than min_seconds (min_mb), so scheduler
+    jitter on small inputs does not fail the comparison.
+
+    Returns:
+        List of (benchmark, size, metric, baseline value, current value)
+    """
+    previous = {(r['benchmark'], r['size']): r for r in baseline}
+    regressions = []
+    for current in results:
+        before = previous.get((current['benchmark'], current['size']))
+        if before is None:
+            continue
+        checks = [('seconds', time_threshold, min_seconds), ('peak_mb', memory_threshold, min_mb)]
+        for metric, threshold, floor in checks:
+            old, new = before.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > floor:
+                regressions.append((current['benchmark'], current['size'], metric, old, new))
+    return regressions
+
+
+def write_results(path, results, exponents, args):
+    """Results JSON: environment, settings, timings and fitted exponents."""
+    payload = {
+        'meta': {
+            'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+        'exponents': exponents,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2) + "\n")
+    print(f"\n✓ Wrote {path}")
+
+
+def plot_scaling(path, results):
+    """Log-log time against size per benchmark, with a linear reference line."""
+    if importlib.util.find_spec('matplotlib') is None:
+        raise ImportError("--plot requires matplotlib (pip install matplotlib)")
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 7))
+    for name in dict.fromkeys(r['benchmark'] for r in results):
+        points = sorted((r['size'], r['seconds']) for r in results if r['benchmark'] == name)
+        ax.plot(*zip(*points), marker='o', label=name)
+    sizes = sorted({r['size'] for r in results})
+    slowest = max(r['seconds'] for r in results if r['size'] == sizes[0])
+    ax.plot(sizes, [slowest * size / sizes[0] for size in sizes], 'k--', label='O(n) reference')
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('customers')
+    ax.set_ylabel('seconds')
+    ax.legend(fontsize='small')
+    fig.tight_layout()
+    fig.savefig(path)
+    print(f"✓ Wrote {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        metavar='NAME', help="Benchmarks to run (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="Best of N timed runs")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced peak-memory run")
+    parser.add_argument('--output', default=None, help="Write results JSON here")
+    parser.add_argument('--baseline', default=None,
+                        help=f"Compare against this results JSON and exit 1 on regressions (e.g. {BASELINE_PATH})")
+    parser.add_argument('--time-threshold', type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help="Allowed relative memory growth")
+    parser.add_argument('--plot', default=None, help="Save a log-log scaling plot (requires matplotlib)")
+    args = parser.parse_args(argv)
+
+    results = run_suite(sorted(args.sizes), args.only, args.repeat, args.seed, memory=not args.no_memory)
+    exponents = scaling_exponents(results)
+    print_scaling_table(results, exponents)
+
+    if args.output:
+        write_results(args.output, results, exponents, args)
+    if args.plot:
+        plot_scaling(args.plot, results)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())['results']
+        regressions = compare_to_baseline(results, baseline, args.time_threshold, args.memory_threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regressions against {args.baseline}:")
+            for name, size, metric, old, new in regressions:
+                print(f"  {name} @ {size:,}: {metric} {old:.4f} -> {new:.4f} ({new / old:.2f}x)")
+            return 1
+        print(f"\n✓ No regressions against {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
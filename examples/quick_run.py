@@ -17,7 +17,7 @@ from unit_economics import calculate_unit_economics_summary
 
 # Generate 1000 users for quick demo
 print("Generating 1000 sample users...")
-users = generate_user_lifecycle(num_users=1000)
+users = generate_user_lifecycle(num_users=1000, seed=42, vectorized=False)
 
 # Calculate funnel
 print("\nFunnel Metrics:")
@@ -4,6 +4,10 @@ Export synthetic dataset snapshots from user_simulation.py
 This script generates and exports raw CSV files for Power BI and external analysis.
 """
 
+import argparse
+import gzip
+import importlib.util
+import json
 import sys
 from pathlib import Path
 import pandas as pd
@@ -12,51 +16,382 @@ import numpy as np
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
-from user_simulation import generate_user_lifecycle
+from user_simulation import SHARD_SIZE, generate_user_chunks, generate_user_lifecycle
+from utils import PLAN_PRICING
 
-# Set seed for reproducibility
-np.random.seed(42)
+SNAPSHOT_END = '2024-12-12'
+EVENT_TYPES = ['login', 'feature_use', 'page_view', 'export_data', 'invite_sent']
+COUNTRIES = ['US', 'UK', 'CA', 'AU', 'DE']
+SNAPSHOT_TABLES = ['customers', 'transactions', 'subscriptions', 'events', 'support_tickets']
+
+# --scale output formats and the manifest that makes them resumable
+SCALE_FORMATS = ['csv', 'csv.gz', 'parquet']
+MANIFEST_NAME = '_manifest.json'
+
+# Date column each table is partitioned by (month) in Parquet output
+PARTITION_COLUMNS = {
+    'customers': 'signup_date',
+    'transactions': 'transaction_date',
+    'subscriptions': 'start_date',
+    'events': 'event_timestamp',
+    'support_tickets': 'created_at'
+}
+
+
+def export_raw_snapshots(num_users=10000, data_dir="data/raw_sample", seed=42, legacy=False):
+    """
+    Export raw data snapshots to data_dir.
+
+    Args:
+        num_users: Number of simulated customers
+        data_dir: Output directory for the CSVs
+        seed: Random seed
+        legacy: Use the original per-row loops (reproduces the committed
+            data/raw_sample exactly, but is far too slow beyond ~10k users)
+    """
+    print(f"Generating {num_users:,} users...")
+    if legacy:
+        np.random.seed(seed)
+        users = generate_user_lifecycle(num_users=num_users, start_date='2022-01-01', end_date=SNAPSHOT_END)
+    else:
+        users = generate_user_lifecycle(num_users=num_users, start_date='2022-01-01', end_date=SNAPSHOT_END,
+                                        seed=seed)
 
-def export_raw_snapshots():
-    """Export raw data snapshots to data/raw_sample/"""
-    
-    print("Generating 10,000 users...")
-    users = generate_user_lifecycle(num_users=10000, start_date='2022-01-01', end_date='2024-12-12')
-    
     # Force U000001 to be a paid user for consistent validation/examples
     users.at[0, 'converted_to_paid'] = True
     users.at[0, 'conversion_date'] = pd.to_datetime('2023-02-01')
     users.at[0, 'current_plan'] = 'Pro'
     users.at[0, 'churned'] = False
     users.at[0, 'churn_date'] = pd.NaT
-    
+
+    if legacy:
+        tables = build_snapshots_loop(users)
+    else:
+        tables = build_snapshots(users, _snapshot_rng(seed, 0))
+
     # Create directory
-    data_dir = Path("data/raw_sample")
+    data_dir = Path(data_dir)
     data_dir.mkdir(parents=True, exist_ok=True)
-    
-    # 1. Export customers.csv
+
+    for name in SNAPSHOT_TABLES:
+        tables[name].to_csv(data_dir / f'{name}.csv', index=False)
+        print(f"✓ Exported {name}.csv ({len(tables[name])} rows)")
+
+    print(f"\n✓ All snapshots exported to {data_dir}/")
+    print(f"  Total customers: {len(tables['customers']):,}")
+    print(f"  Total transactions: {len(tables['transactions']):,}")
+    print(f"  Total subscriptions: {len(tables['subscriptions']):,}")
+    print(f"  Total events: {len(tables['events']):,}")
+    print(f"  Total support tickets: {len(tables['support_tickets']):,}")
+    return tables
+
+
+def export_scaled_snapshots(num_users, data_dir="data/raw_scale", seed=42, chunk_size=SHARD_SIZE, fmt='csv'):
+    """
+    Stream raw snapshots for num_users to disk, one chunk of users at a time.
+
+    Each chunk's customers, subscriptions, transactions, events and tickets
+    are generated and appended to the output before the next chunk starts,
+    so memory is bounded by chunk_size rather than num_users. After every
+    chunk, MANIFEST_NAME records the chunks done, the next sequential ids
+    and the byte size of each CSV. Rerunning with the same arguments cuts
+    the files back to those sizes (dropping a partly written chunk) and
+    resumes with the next chunk; chunks are seeded independently, so a
+    resumed export is identical to an uninterrupted one.
+
+    Args:
+        num_users: Number of simulated customers
+        data_dir: Output directory
+        seed: Root seed (chunk i uses user stream i and snapshot stream i)
+        chunk_size: Users per chunk
+        fmt: 'csv', 'csv.gz' (one gzip member per chunk) or 'parquet'
+            (<table>/month=YYYY-MM/part-<chunk>.parquet; requires pyarrow)
+
+    Returns:
+        The final manifest dict
+    """
+    if fmt not in SCALE_FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {SCALE_FORMATS}")
+    if fmt == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    config = {'num_users': num_users, 'seed': seed, 'chunk_size': chunk_size,
+              'format': fmt, 'end_date': SNAPSHOT_END}
+    manifest = _load_manifest(data_dir, config)
+    num_chunks = max(1, -(-num_users // chunk_size))
+    if manifest['chunks_done'] >= num_chunks:
+        print(f"✓ {data_dir}/ already holds all {num_chunks} chunks")
+        return manifest
+    if manifest['chunks_done']:
+        print(f"Resuming after chunk {manifest['chunks_done']}/{num_chunks}")
+    if fmt != 'parquet':
+        _truncate_to_manifest(data_dir, manifest, fmt)
+
+    chunks = generate_user_chunks(num_users, '2022-01-01', SNAPSHOT_END, seed, chunk_size,
+                                  first_chunk=manifest['chunks_done'])
+    for chunk, users in chunks:
+        tables = build_snapshots(users, _snapshot_rng(seed, chunk), first_ids=manifest['next_ids'])
+        for name in SNAPSHOT_TABLES:
+            if fmt == 'parquet':
+                _write_month_partitions(data_dir / name, tables[name], PARTITION_COLUMNS[name], chunk)
+            else:
+                manifest['bytes'][name] = _append_csv(
+                    data_dir / f'{name}.{fmt}', tables[name], manifest['bytes'][name], fmt == 'csv.gz'
+                )
+            manifest['rows'][name] += len(tables[name])
+        for name in manifest['next_ids']:
+            manifest['next_ids'][name] += len(tables[name])
+        manifest['chunks_done'] = chunk + 1
+        _save_manifest(data_dir, manifest)
+        print(f"✓ Chunk {chunk + 1}/{num_chunks}: {len(users):,} users, "
+              f"{len(tables['transactions']):,} transactions, {len(tables['events']):,} events")
+
+    print(f"\n✓ Scaled snapshots exported to {data_dir}/ ({fmt})")
+    for name in SNAPSHOT_TABLES:
+        print(f"  {name}: {manifest['rows'][name]:,} rows")
+    return manifest
+
+
+def _load_manifest(data_dir, config):
+    """Manifest of an export in progress in data_dir, or a fresh one."""
+    path = data_dir / MANIFEST_NAME
+    if not path.exists():
+        return {
+            'config': config,
+            'chunks_done': 0,
+            'next_ids': {'transactions': 1, 'events': 1, 'support_tickets': 1},
+            'bytes': {name: 0 for name in SNAPSHOT_TABLES},
+            'rows': {name: 0 for name in SNAPSHOT_TABLES}
+        }
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest['config'] != config:
+        raise ValueError(f"{data_dir}/ holds an export with different settings "
+                         f"({manifest['config']}); use another directory")
+    return manifest
+
+
+def _save_manifest(data_dir, manifest):
+    """Write the manifest atomically."""
+    tmp_path = data_dir / (MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    tmp_path.replace(data_dir / MANIFEST_NAME)
+
+
+def _truncate_to_manifest(data_dir, manifest, fmt):
+    """Cut each CSV back to its size after the last completed chunk."""
+    for name in SNAPSHOT_TABLES:
+        path = data_dir / f'{name}.{fmt}'
+        size = manifest['bytes'][name]
+        if path.exists():
+            if path.stat().st_size < size:
+                raise ValueError(f"{path} is shorter than the manifest records; cannot resume")
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+        elif size:
+            raise ValueError(f"{path} is missing; cannot resume")
+
+
+def _append_csv(path, df, offset, compress):
+    """Append df as CSV at byte offset (header only at 0); returns the new size."""
+    data = df.to_csv(index=False, header=offset == 0).encode()
+    if compress:
+        # Concatenated gzip members form one valid gzip stream
+        data = gzip.compress(data, mtime=0)
+    with open(path, 'ab') as f:
+        f.write(data)
+    return offset + len(data)
+
+
+def _write_month_partitions(table_dir, df, date_column, chunk):
+    """Write df as one Parquet file per month of date_column (overwrites on resume)."""
+    months = np.datetime_as_string(df[date_column].to_numpy(dtype='datetime64[ns]').astype('datetime64[M]'))
+    for month, part in df.groupby(months, sort=True):
+        part_dir = table_dir / f'month={month}'
+        part_dir.mkdir(parents=True, exist_ok=True)
+        part.to_parquet(part_dir / f'part-{chunk:05d}.parquet', index=False)
+
+
+def build_snapshots(users, rng, end_date=SNAPSHOT_END, first_ids=None):
+    """
+    Build every raw table from simulated users with array operations only.
+
+    Per-user counts (billing months, events, tickets) are drawn or computed
+    for all users at once, then expanded to rows with np.repeat.
+
+    Args:
+        users: DataFrame from generate_user_lifecycle
+        rng: numpy Generator for the event/ticket/country draws
+        end_date: Snapshot cut-off; activity after it is not generated
+        first_ids: Optional dict of table name -> first sequential id number
+            (transactions, events, support_tickets), for chunked generation
+
+    Returns:
+        Dict of table name -> DataFrame (same columns as build_snapshots_loop)
+    """
+    first_ids = {**{'transactions': 1, 'events': 1, 'support_tickets': 1}, **(first_ids or {})}
+    end = np.datetime64(pd.Timestamp(end_date), 'ns')
+    user_id = users['user_id'].to_numpy(dtype=object)
+    sign_up = pd.to_datetime(users['sign_up_date']).to_numpy(dtype='datetime64[ns]')
+    conversion = pd.to_datetime(users['conversion_date']).to_numpy(dtype='datetime64[ns]')
+    churn = pd.to_datetime(users['churn_date']).to_numpy(dtype='datetime64[ns]')
+    # Activity window per user: sign-up (or conversion) through churn or the snapshot end
+    user_end = np.where(np.isnat(churn), end, churn)
+    paid = users['converted_to_paid'].to_numpy(dtype=bool)
+    price = users['current_plan'].map(PLAN_PRICING).fillna(0).to_numpy()
+
+    customers = users[['user_id', 'sign_up_date', 'acquisition_channel', 'initial_plan', 'activated']].copy()
+    customers.columns = ['customer_id', 'signup_date', 'acquisition_source', 'initial_plan', 'activated']
+    customers['country'] = np.array(COUNTRIES, dtype=object)[rng.integers(0, len(COUNTRIES), len(customers))]
+
+    # Transactions: one per month from the billing start while on a paid plan
+    billing_start = np.where(np.isnat(conversion), sign_up, conversion)
+    billed = paid & (price > 0)
+    dates, owner = _monthly_schedule(billing_start[billed], user_end[billed])
+    billed_idx = np.flatnonzero(billed)[owner]
+    transactions = pd.DataFrame({
+        'transaction_id': _format_ids('TXN', len(dates), 8, first_ids['transactions']),
+        'customer_id': user_id[billed_idx],
+        'transaction_date': dates,
+        'amount': price[billed_idx].astype(np.int64),
+        'currency': 'USD',
+        'invoice_status': 'paid'
+    })
+
+    churned = users['churned'].to_numpy(dtype=bool)
+    subs = np.flatnonzero(paid)
+    subscriptions = pd.DataFrame({
+        'subscription_id': 'SUB' + users['user_id'].str[1:].to_numpy(dtype=object)[subs],
+        'customer_id': user_id[subs],
+        'start_date': billing_start[subs],
+        'end_date': np.where(churned[subs], churn[subs], np.datetime64('NaT')),
+        'status': np.where(churned[subs], 'churned', 'active').astype(object),
+        'plan_price': price[subs].astype(np.int64),
+        'plan_name': users['current_plan'].to_numpy(dtype=object)[subs]
+    })
+
+    # Events: 5-20 per activated user, uniform over the user's active days
+    active = np.flatnonzero(users['activated'].to_numpy(dtype=bool))
+    owner = np.repeat(active, rng.integers(5, 21, len(active)))
+    events = pd.DataFrame({
+        'event_id': _format_ids('EVT', len(owner), 8, first_ids['events']),
+        'customer_id': user_id[owner],
+        'event_name': np.array(EVENT_TYPES, dtype=object)[rng.integers(0, len(EVENT_TYPES), len(owner))],
+        'event_timestamp': _uniform_days(rng, sign_up[owner], user_end[owner])
+    })
+
+    # Support tickets: 20% of users open 1-3 tickets, closed 1-7 days later
+    opens = np.flatnonzero(rng.random(len(users)) < 0.20)
+    owner = np.repeat(opens, rng.integers(1, 4, len(opens)))
+    created = _uniform_days(rng, sign_up[owner], user_end[owner])
+    closed = created + rng.integers(1, 8, len(owner)).astype('timedelta64[D]')
+    is_closed = closed <= user_end[owner]
+    tickets = pd.DataFrame({
+        'ticket_id': _format_ids('TKT', len(owner), 6, first_ids['support_tickets']),
+        'customer_id': user_id[owner],
+        'created_at': created,
+        'closed_at': np.where(is_closed, closed, np.datetime64('NaT')),
+        'status': np.where(is_closed, 'closed', 'open').astype(object),
+        'satisfaction_score': np.where(is_closed, rng.integers(1, 6, len(owner)), np.nan)
+    })
+
+    return {
+        'customers': customers,
+        'transactions': transactions,
+        'subscriptions': subscriptions,
+        'events': events,
+        'support_tickets': tickets
+    }
+
+
+def _snapshot_rng(seed, chunk):
+    """
+    Generator for chunk's snapshot draws.
+
+    User shards draw from SeedSequence(seed) children with spawn_key (i,);
+    the (chunk, 1) key keeps snapshot streams disjoint from them.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk, 1)))
+
+
+def _monthly_schedule(start, end):
+    """
+    Expand [start, end] windows into monthly dates, as repeated DateOffset(months=1).
+
+    Stepping month by month clamps the day to each month's length and never
+    recovers it (Jan 31 -> Feb 28 -> Mar 28), so the day of month is the running
+    minimum of the start day and every month length passed so far.
+
+    Returns:
+        Tuple of (dates, owner) where owner indexes the window of each date
+    """
+    start_month = start.astype('datetime64[M]')
+    start_day = (start - start_month.astype('datetime64[ns]')).astype('timedelta64[D]').astype(np.int64) + 1
+    months = (end.astype('datetime64[M]') - start_month).astype(np.int64) + 1
+    months = np.maximum(months, 0)
+
+    owner = np.repeat(np.arange(len(start)), months)
+    first_row = np.cumsum(months) - months
+    step = np.arange(len(owner)) - first_row[owner]
+    month = start_month[owner] + step.astype('timedelta64[M]')
+    month_length = ((month + 1).astype('datetime64[D]') - month.astype('datetime64[D]')).astype(np.int64)
+
+    # Segmented running minimum: offsetting each window by 32 * owner makes
+    # one global maximum.accumulate restart at every window boundary
+    clamped = np.minimum(start_day[owner], month_length)
+    day = 31 - (np.maximum.accumulate(owner * 32 + (31 - clamped)) - owner * 32)
+
+    dates = month.astype('datetime64[D]') + (day - 1).astype('timedelta64[D]')
+    dates = dates.astype('datetime64[ns]')
+    keep = dates <= end[owner]
+    return dates[keep], owner[keep]
+
+
+def _uniform_days(rng, start, end):
+    """Whole-day timestamps drawn uniformly from [start, end] per row."""
+    span = (end - start).astype('timedelta64[D]').astype(np.int64) + 1
+    offset = (rng.random(len(start)) * span).astype(np.int64)
+    return start + offset.astype('timedelta64[D]')
+
+
+def _format_ids(prefix, count, width, first=1):
+    """Sequential ids prefix + zero-padded first..first+count-1, built as fixed-width bytes."""
+    numbers = np.arange(first, first + count, dtype=np.int64)
+    width = max(width, len(str(first + count - 1)))
+    digits = (numbers[:, None] // 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)) % 10
+    raw = np.empty((count, len(prefix) + width), dtype=np.uint8)
+    raw[:, :len(prefix)] = np.frombuffer(prefix.encode(), dtype=np.uint8)
+    raw[:, len(prefix):] = digits + ord('0')
+    return raw.view(f'S{raw.shape[1]}').ravel().astype(str).astype(object)
+
+
+def build_snapshots_loop(users, end_date=SNAPSHOT_END):
+    """Original per-row generator (global np.random state), kept for --legacy."""
+    end_ts = pd.Timestamp(end_date)
+
+    # 1. customers.csv
     customers = users[['user_id', 'sign_up_date', 'acquisition_channel', 'initial_plan', 'activated']].copy()
     customers.columns = ['customer_id', 'signup_date', 'acquisition_source', 'initial_plan', 'activated']
-    customers['country'] = np.random.choice(['US', 'UK', 'CA', 'AU', 'DE'], size=len(customers))
-    customers.to_csv(data_dir / 'customers.csv', index=False)
-    print(f"✓ Exported customers.csv ({len(customers)} rows)")
-    
-    # 2. Generate and export transactions.csv
+    customers['country'] = np.random.choice(COUNTRIES, size=len(customers))
+
+    # 2. transactions.csv
     transactions = []
     transaction_id = 1
-    
+
     for _, user in users.iterrows():
         if user['converted_to_paid']:
             # Generate monthly transactions
             start = pd.to_datetime(user['conversion_date']) if pd.notna(user['conversion_date']) else pd.to_datetime(user['sign_up_date'])
-            end = pd.to_datetime(user['churn_date']) if pd.notna(user['churn_date']) else pd.Timestamp('2024-12-12')
-            
+            end = pd.to_datetime(user['churn_date']) if pd.notna(user['churn_date']) else end_ts
+
             # Monthly transactions
             current = start
             while current <= end:
-                plan_prices = {'Free': 0, 'Basic': 49, 'Pro': 199}
-                amount = plan_prices.get(user['current_plan'], 0)
-                
+                amount = PLAN_PRICING.get(user['current_plan'], 0)
+
                 if amount > 0:  # Only paid plans
                     transactions.append({
                         'transaction_id': f'TXN{transaction_id:08d}',
@@ -67,14 +402,10 @@ def export_raw_snapshots():
                         'invoice_status': 'paid'
                     })
                     transaction_id += 1
-                
+
                 current += pd.DateOffset(months=1)
-    
-    transactions_df = pd.DataFrame(transactions)
-    transactions_df.to_csv(data_dir / 'transactions.csv', index=False)
-    print(f"✓ Exported transactions.csv ({len(transactions_df)} rows)")
-    
-    # 3. Export subscriptions.csv
+
+    # 3. subscriptions.csv
     subscriptions = []
     for _, user in users.iterrows():
         if user['converted_to_paid']:
@@ -84,55 +415,46 @@ def export_raw_snapshots():
                 'start_date': user['conversion_date'] if pd.notna(user['conversion_date']) else user['sign_up_date'],
                 'end_date': user['churn_date'] if user['churned'] else None,
                 'status': 'churned' if user['churned'] else 'active',
-                'plan_price': {'Free': 0, 'Basic': 49, 'Pro': 199}.get(user['current_plan'], 0),
+                'plan_price': PLAN_PRICING.get(user['current_plan'], 0),
                 'plan_name': user['current_plan']
             })
-    
-    subscriptions_df = pd.DataFrame(subscriptions)
-    subscriptions_df.to_csv(data_dir / 'subscriptions.csv', index=False)
-    print(f"✓ Exported subscriptions.csv ({len(subscriptions_df)} rows)")
-    
-    # 4. Generate and export events.csv
+
+    # 4. events.csv
     events = []
     event_id = 1
-    event_types = ['login', 'feature_use', 'page_view', 'export_data', 'invite_sent']
-    
+
     for _, user in users.iterrows():
         if user['activated']:
             # Generate 5-20 events per activated user
             num_events = np.random.randint(5, 21)
             start = pd.to_datetime(user['sign_up_date'])
-            end = pd.to_datetime(user['churn_date']) if pd.notna(user['churn_date']) else pd.Timestamp('2024-12-12')
-            
+            end = pd.to_datetime(user['churn_date']) if pd.notna(user['churn_date']) else end_ts
+
             for _ in range(num_events):
                 event_date = start + pd.Timedelta(days=np.random.randint(0, (end - start).days + 1))
                 events.append({
                     'event_id': f'EVT{event_id:08d}',
                     'customer_id': user['user_id'],
-                    'event_name': np.random.choice(event_types),
+                    'event_name': np.random.choice(EVENT_TYPES),
                     'event_timestamp': event_date
                 })
                 event_id += 1
-    
-    events_df = pd.DataFrame(events)
-    events_df.to_csv(data_dir / 'events.csv', index=False)
-    print(f"✓ Exported events.csv ({len(events_df)} rows)")
-    
-    # 5. Generate and export support_tickets.csv
+
+    # 5. support_tickets.csv
     tickets = []
     ticket_id = 1
-    
+
     for _, user in users.iterrows():
         # 20% of users create support tickets
         if np.random.random() < 0.20:
             num_tickets = np.random.randint(1, 4)
             start = pd.to_datetime(user['sign_up_date'])
-            end = pd.to_datetime(user['churn_date']) if pd.notna(user['churn_date']) else pd.Timestamp('2024-12-12')
-            
+            end = pd.to_datetime(user['churn_date']) if pd.notna(user['churn_date']) else end_ts
+
             for _ in range(num_tickets):
                 created = start + pd.Timedelta(days=np.random.randint(0, (end - start).days + 1))
                 closed = created + pd.Timedelta(days=np.random.randint(1, 8))
-                
+
                 tickets.append({
                     'ticket_id': f'TKT{ticket_id:06d}',
                     'customer_id': user['user_id'],
@@ -142,18 +464,31 @@ def export_raw_snapshots():
                     'satisfaction_score': np.random.randint(1, 6) if closed <= end else None
                 })
                 ticket_id += 1
-    
-    tickets_df = pd.DataFrame(tickets)
-    tickets_df.to_csv(data_dir / 'support_tickets.csv', index=False)
-    print(f"✓ Exported support_tickets.csv ({len(tickets_df)} rows)")
-    
-    print(f"\n✓ All snapshots exported to {data_dir}/")
-    print(f"  Total customers: {len(customers):,}")
-    print(f"  Total transactions: {len(transactions_df):,}")
-    print(f"  Total subscriptions: {len(subscriptions_df):,}")
-    print(f"  Total events: {len(events_df):,}")
-    print(f"  Total support tickets: {len(tickets_df):,}")
+
+    return {
+        'customers': customers,
+        'transactions': pd.DataFrame(transactions),
+        'subscriptions': pd.DataFrame(subscriptions),
+        'events': pd.DataFrame(events),
+        'support_tickets': pd.DataFrame(tickets)
+    }
 
 
 if __name__ == "__main__":
-    export_raw_snapshots()
+    parser = argparse.ArgumentParser(description="Export synthetic raw CSV snapshots")
+    parser.add_argument('--num-users', type=int, default=10000)
+    parser.add_argument('--output-dir', default=None,
+                        help="Default: data/raw_sample (data/raw_scale with --scale)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--legacy', action='store_true',
+                        help="Use the original row loops (reproduces the committed data/raw_sample)")
+    parser.add_argument('--scale', type=int, metavar='NUM_USERS',
+                        help="Stream NUM_USERS customers to disk in chunks (resumable)")
+    parser.add_argument('--chunk-size', type=int, default=SHARD_SIZE, help="Users per chunk with --scale")
+    parser.add_argument('--format', choices=SCALE_FORMATS, default='csv', help="Output format with --scale")
+    args = parser.parse_args()
+    if args.scale:
+        export_scaled_snapshots(args.scale, args.output_dir or "data/raw_scale", args.seed,
+                                args.chunk_size, args.format)
+    else:
+        export_raw_snapshots(args.num_users, args.output_dir or "data/raw_sample", args.seed, args.legacy)
@@ -4,6 +4,7 @@ Generate sample pipeline outputs for examples/sample_outputs/
 This calculates actual metrics from the raw data in data/raw_sample/
 """
 
+import argparse
 import pandas as pd
 from pathlib import Path
 import sys
@@ -13,8 +14,10 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from metrics import compute_rfm
 from engine import compute_churn_risk
+from ingest import load_table, stream_event_aggregates
+from cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache, cached_call
 
-def generate_samples():
+def generate_samples(stream_events=False, chunk_size=1_000_000, cache=None):
     output_dir = Path("examples/sample_outputs")
     output_dir.mkdir(parents=True, exist_ok=True)
     
@@ -23,21 +26,33 @@ def generate_samples():
         print("Error: data/raw_sample does not exist. Run export_data_snapshots.py first.")
         return
 
-    # Load raw data
-    customers = pd.read_csv(data_dir / "customers.csv")
-    transactions = pd.read_csv(data_dir / "transactions.csv")
-    events = pd.read_csv(data_dir / "events.csv")
-    tickets = pd.read_csv(data_dir / "support_tickets.csv") if (data_dir / "support_tickets.csv").exists() else None
+    # Load raw data (typed, cached under data/raw_sample/.cache/)
+    customers = load_table("customers", data_dir)
+    transactions = load_table("transactions", data_dir)
+    tickets = load_table("support_tickets", data_dir) if (data_dir / "support_tickets.csv").exists() else None
 
     # Reference date
     REFERENCE_DATE = '2024-12-12'
 
-    # Compute RFM
-    # Note: compute_rfm returns dataframe with customer_id index
-    rfm = compute_rfm(customers, transactions, REFERENCE_DATE, events_df=events).reset_index()
-    
-    # Compute Churn Risk
-    churn_risk = compute_churn_risk(customers, events, tickets, REFERENCE_DATE)
+    if stream_events:
+        # Fold events.csv chunk by chunk into per-customer last-activity dates
+        aggregates, report = stream_event_aggregates(data_dir / "events.csv", chunk_size, as_of=REFERENCE_DATE)
+        peak_rss = f"{report['peak_rss_mb']:.1f} MB" if report['peak_rss_mb'] is not None else "n/a"
+        print(f"✓ Streamed {report['rows']:,} events in {report['chunks']} chunks "
+              f"({report['customers']:,} customers, peak RSS {peak_rss})")
+        rfm = cached_call(cache, compute_rfm, customers, transactions, REFERENCE_DATE,
+                          event_aggregates=aggregates).reset_index()
+        churn_risk = cached_call(cache, compute_churn_risk, customers, None, tickets, REFERENCE_DATE,
+                                 event_aggregates=aggregates)
+    else:
+        events = load_table("events", data_dir)
+
+        # Compute RFM
+        # Note: compute_rfm returns dataframe with customer_id index
+        rfm = cached_call(cache, compute_rfm, customers, transactions, REFERENCE_DATE, events_df=events).reset_index()
+
+        # Compute Churn Risk
+        churn_risk = cached_call(cache, compute_churn_risk, customers, events, tickets, REFERENCE_DATE)
     
     # Merge
     metrics = rfm.merge(churn_risk, on='customer_id', how='left')
@@ -72,6 +87,19 @@ def generate_samples():
     
     kpi_snapshot_sample.to_csv(output_dir / 'kpi_snapshot.csv', index=False)
     print(f"✓ Created {output_dir / 'kpi_snapshot.csv'}")
+    if cache is not None:
+        print(f"✓ {cache.summary()}")
 
 if __name__ == "__main__":
-    generate_samples()
+    parser = argparse.ArgumentParser(description="Generate examples/sample_outputs/ from data/raw_sample/")
+    parser.add_argument("--stream-events", action="store_true",
+                        help="Read events.csv in chunks instead of loading it into memory")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="Rows per events.csv chunk")
+    parser.add_argument("--cache", nargs="?", const=str(DEFAULT_CACHE_DIR), default=None, metavar="DIR",
+                        help=f"Reuse RFM / churn-risk results of unchanged inputs from DIR (default {DEFAULT_CACHE_DIR}; "
+                             "entries are pickles, so DIR must be trusted)")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                        help="Evict least recently used results above this size")
+    args = parser.parse_args()
+    cache = ResultCache(args.cache, args.cache_size_mb * 1024 ** 2) if args.cache else None
+    generate_samples(stream_events=args.stream_events, chunk_size=args.chunk_size, cache=cache)
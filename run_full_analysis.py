@@ -3,11 +3,16 @@
 Main Runner - Generates all SaaS analytics outputs
 
 Usage:
-    python run_full_analysis.py
+    python run_full_analysis.py [--executor thread|process|serial] [--workers N]
+                                [--cache [DIR]] [--cache-size-mb MB]
+                                [--trace FILE] [--trace-memory]
 """
 
+import argparse
 import sys
 import os
+import time
+from functools import partial
 from pathlib import Path
 import pandas as pd
 
@@ -19,9 +24,15 @@ from funnel import calculate_funnel_metrics, calculate_conversion_summary
 from retention import calculate_retention_metrics, calculate_churn_rate_monthly, generate_cohort_retention_matrix
 from revenue import calculate_revenue_metrics, calculate_mrr_bridge, calculate_net_revenue_retention
 from unit_economics import calculate_unit_economics, calculate_unit_economics_summary
+from cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache, cached_call
+from dataset import SaaSDataset
+from ledger import PlanChangeLedger
+from pipeline import EXECUTORS, Pipeline
+from scenarios import MULTIPLIERS, generate_scenarios, simulate_scenarios, tornado
+from tracing import Tracer, span
 
 
-def main():
+def main(executor='thread', max_workers=None, cache=None, trace_path=None, trace_memory=False):
     print("=" * 70)
     print("P4 SaaS Growth Analytics Engine - Full Analysis")
     print("=" * 70)
@@ -30,63 +41,26 @@ def main():
     output_dir = Path("outputs")
     output_dir.mkdir(exist_ok=True)
     
-    # Step 1: Generate user lifecycle data
-    print("\n[1/7] Generating 10,000+ user lifecycle data...")
-    users = generate_user_lifecycle(num_users=10000)
-    
-    # Save sample users
-    users.head(10).to_csv(output_dir / "sample_10_users.csv", index=False)
-    print(f"      OK - Generated {len(users)} users")
-    
-    # Step 2: Calculate funnel metrics
-    print("\n[2/7] Calculating funnel metrics...")
-    funnel_metrics = calculate_funnel_metrics(users)
-    funnel_metrics.to_csv(output_dir / "funnel_metrics.csv", index=False)
-    
-    conversion_summary = calculate_conversion_summary(users)
-    conversion_summary.to_csv(output_dir / "conversion_summary.csv", index=False)
-    print("      OK - Funnel metrics calculated")
-    
-    # Step 3: Calculate retention metrics
-    print("\n[3/7] Calculating retention and churn...")
-    retention_metrics = calculate_retention_metrics(users)
-    
-    monthly_churn = calculate_churn_rate_monthly(users)
-    monthly_churn.to_csv(output_dir / "monthly_churn.csv", index=False)
-    
-    cohort_retention = generate_cohort_retention_matrix(users)
-    cohort_retention.to_csv(output_dir / "cohort_retention.csv", index=False)
-    print("      OK - Retention metrics calculated")
-    
-    # Step 4: Calculate revenue metrics
-    print("\n[4/7] Calculating revenue metrics...")
-    revenue_metrics = calculate_revenue_metrics(users)
-    revenue_metrics.to_csv(output_dir / "revenue_summary.csv", index=False)
-    
-    mrr_bridge = calculate_mrr_bridge(users)
-    mrr_bridge.to_csv(output_dir / "mrr_bridge.csv", index=False)
-    
-    nrr = calculate_net_revenue_retention(users)
-    nrr.to_csv(output_dir / "net_revenue_retention.csv", index=False)
-    print("      OK - Revenue metrics calculated")
-    
-    # Step 5: Calculate unit economics
-    print("\n[5/7] Calculating unit economics...")
-    economics = calculate_unit_economics(users)
-    economics_summary = calculate_unit_economics_summary(economics)
-    economics_summary.to_csv(output_dir / "unit_economics.csv", index=False)
-    print("      OK - Unit economics calculated")
-    
-    # Step 6: Generate scenarios
-    print("\n[6/7] Running scenario analysis...")
-    scenarios = generate_scenarios(users, revenue_metrics)
-    scenarios.to_csv(output_dir / "scenarios_summary.csv", index=False)
-    print("      OK - 6 scenarios generated")
-    
-    # Step 7: Generate summary report
-    print("\n[7/7] Generating summary report...")
-    generate_summary_report(users, funnel_metrics, revenue_metrics, economics_summary, output_dir)
-    print("      OK - Summary report generated")
+    pipeline = build_pipeline(output_dir, cache=cache)
+    print(f"\nRunning {len(pipeline.stages)} stages ({executor} executor)...")
+    tracer = Tracer(memory=trace_memory) if trace_path else None
+    start = time.perf_counter()
+    if tracer is not None:
+        with tracer:
+            results = pipeline.run(executor=executor, max_workers=max_workers, verbose=True)
+    else:
+        results = pipeline.run(executor=executor, max_workers=max_workers, verbose=True)
+    elapsed = time.perf_counter() - start
+    print(f"      OK - Generated {len(results['users'])} users; {len(results)} stages in {elapsed:.2f}s "
+          f"(slowest: {max(pipeline.timings, key=pipeline.timings.get)})")
+    if cache is not None:
+        # Process workers count hits in their own copy of the cache
+        print(f"      {cache.summary()}" if executor != 'process' else
+              f"      cache {cache.cache_dir}: {cache.size() / 1024 ** 2:.1f} MB on disk")
+    if tracer is not None:
+        tracer.write_chrome_trace(trace_path)
+        print("\n" + tracer.summary())
+        print(f"\n      Trace with {len(tracer.spans)} spans written to {trace_path} (open in ui.perfetto.dev)")
     
     # Print summary
     print("\n" + "=" * 70)
@@ -103,68 +77,144 @@ def main():
     print(f"  • net_revenue_retention.csv")
     print(f"  • unit_economics.csv")
     print(f"  • scenarios_summary.csv")
+    print(f"  • scenario_bands.csv")
+    print(f"  • scenario_sensitivity.csv")
     print(f"  • full_analysis_summary.txt")
     print("=" * 70)
     
     return 0
 
 
-def generate_scenarios(users_df, base_revenue):
-    """Generate 6 scenario projections."""
-    scenarios = []
+def build_pipeline(output_dir, num_users=10000, seed=42, cache=None):
+    """
+    The full analysis as a stage graph.
     
-    # Get latest metrics
-    latest = base_revenue.iloc[-1]
-    base_mrr = latest['mrr']
-    base_users = latest['active_users']
-    base_churn = users_df['churned'].mean()
-    base_conversion = users_df['converted_to_paid'].mean()
+    Funnel, retention, revenue, ledger and unit economics depend only on
+    users and run concurrently; the ledger and MRR bridge are shared stages,
+    so NRR reuses the bridge instead of recomputing it. Metric stages take a
+    shared SaaSDataset, so parsed dates and month indexes are derived once.
     
-    # Scenario definitions
-    scenario_configs = [
-        {'name': 'Base Case', 'churn_mult': 1.0, 'growth_mult': 1.0, 'cac_mult': 1.0, 'conversion_mult': 1.0, 'price_mult': 1.0},
-        {'name': 'High Churn (+20%)', 'churn_mult': 1.2, 'growth_mult': 1.0, 'cac_mult': 1.0, 'conversion_mult': 1.0, 'price_mult': 1.0},
-        {'name': 'Reduced Churn (-15%)', 'churn_mult': 0.85, 'growth_mult': 1.0, 'cac_mult': 1.0, 'conversion_mult': 1.0, 'price_mult': 1.0},
-        {'name': 'Increased Marketing (+25% CAC)', 'churn_mult': 1.0, 'growth_mult': 1.15, 'cac_mult': 1.25, 'conversion_mult': 1.0, 'price_mult': 1.0},
-        {'name': 'Improved Conversion (+10%)', 'churn_mult': 1.0, 'growth_mult': 1.0, 'cac_mult': 1.0, 'conversion_mult': 1.10, 'price_mult': 1.0},
-        {'name': 'Pricing Change (+15% ARPU)', 'churn_mult': 1.0, 'growth_mult': 1.0, 'cac_mult': 1.0, 'conversion_mult': 1.0, 'price_mult': 1.15},
-    ]
+    With a ResultCache, user generation and every metric computation are
+    looked up by a hash of their inputs; output files are always rewritten.
+    """
+    pipeline = Pipeline()
+    pipeline.add('users', partial(_users_stage, output_dir, cache, num_users, seed))
+    pipeline.add('dataset', _dataset_stage, ['users'])
+    pipeline.add('funnel', partial(_funnel_stage, output_dir, cache), ['dataset'])
+    pipeline.add('retention', partial(_retention_stage, output_dir, cache), ['dataset'])
+    pipeline.add('revenue', partial(_revenue_stage, output_dir, cache), ['dataset'])
+    pipeline.add('ledger', partial(_ledger_stage, cache), ['dataset'])
+    pipeline.add('mrr_bridge', partial(_mrr_bridge_stage, output_dir, cache), ['dataset', 'ledger'])
+    pipeline.add('nrr', partial(_nrr_stage, output_dir, cache), ['mrr_bridge'])
+    pipeline.add('unit_economics', partial(_unit_economics_stage, output_dir, cache), ['dataset'])
+    pipeline.add('scenarios', partial(_scenarios_stage, output_dir, cache), ['users', 'revenue'])
+    pipeline.add('scenario_bands', partial(_scenario_bands_stage, output_dir, cache), ['dataset', 'revenue'])
+    pipeline.add('scenario_sensitivity', partial(_scenario_sensitivity_stage, output_dir, cache),
+                 ['users', 'revenue'])
+    pipeline.add('report', partial(generate_summary_report, output_dir=output_dir),
+                 ['users', 'funnel', 'revenue', 'unit_economics'])
+    return pipeline
+
+
+def _users_stage(output_dir, cache, num_users, seed):
+    """Generate user lifecycle data with the seeded reference loop and save a sample."""
+    users = cached_call(cache, generate_user_lifecycle, num_users=num_users, seed=seed, vectorized=False)
+    _write_csv(users.head(10), output_dir / "sample_10_users.csv")
+    return users
+
+
+def _dataset_stage(users):
+    """Shared derived-column cache over the users frame."""
+    data = SaaSDataset(users)
+    # Derive month indexes up front so concurrent stages share them
+    data.active_months
+    return data
+
+
+def _ledger_stage(cache, data):
+    """Plan-change ledger (cached on the dataset)."""
+    if cache is None:
+        return data.ledger
+    return cache.call(PlanChangeLedger.from_users, data.users)
+
+
+def _write_csv(df, path):
+    """Write df to path without the index, as an 'io' span when tracing."""
+    with span(f"write {path.name}", 'io', len(df)):
+        df.to_csv(path, index=False)
+
+
+def _funnel_stage(output_dir, cache, users):
+    """Funnel metrics and per-segment conversion summary."""
+    funnel_metrics = cached_call(cache, calculate_funnel_metrics, users)
+    _write_csv(funnel_metrics, output_dir / "funnel_metrics.csv")
+    
+    conversion_summary = cached_call(cache, calculate_conversion_summary, users)
+    _write_csv(conversion_summary, output_dir / "conversion_summary.csv")
+    return funnel_metrics
+
+
+def _retention_stage(output_dir, cache, users):
+    """Retention flags, monthly churn and the cohort retention matrix."""
+    retention_metrics = cached_call(cache, calculate_retention_metrics, users)
     
-    for config in scenario_configs:
-        # Project 12 months
-        current_mrr = base_mrr
-        current_users = base_users
-        
-        for month in range(1, 13):
-            # Apply scenario modifiers
-            monthly_churn_rate = base_churn * config['churn_mult']
-            growth_rate = 0.05 * config['growth_mult']  # 5% base growth
-            
-            # Calculate changes
-            churned_users = int(current_users * monthly_churn_rate)
-            new_users = int(current_users * growth_rate)
-            current_users = current_users - churned_users + new_users
-            
-            # MRR changes
-            current_mrr = current_mrr * (1 + growth_rate - monthly_churn_rate) * config['price_mult']
-            
-            # LTV:CAC (simplified)
-            avg_ltv = current_mrr / current_users * 12 if current_users > 0 else 0
-            avg_cac = 300 * config['cac_mult']
-            ltv_cac = avg_ltv / avg_cac if avg_cac > 0 else 0
-            
-            scenarios.append({
-                'scenario': config['name'],
-                'month': month,
-                'mrr': round(current_mrr, 2),
-                'arr': round(current_mrr * 12, 2),
-                'users': current_users,
-                'churn_rate': monthly_churn_rate,
-                'ltv_cac_ratio': round(ltv_cac, 2),
-                'net_revenue_impact': round(current_mrr - base_mrr, 2)
-            })
+    monthly_churn = cached_call(cache, calculate_churn_rate_monthly, users)
+    _write_csv(monthly_churn, output_dir / "monthly_churn.csv")
     
-    return pd.DataFrame(scenarios)
+    cohort_retention = cached_call(cache, generate_cohort_retention_matrix, users)
+    _write_csv(cohort_retention, output_dir / "cohort_retention.csv")
+    return retention_metrics
+
+
+def _revenue_stage(output_dir, cache, users):
+    """Monthly revenue metrics."""
+    revenue_metrics = cached_call(cache, calculate_revenue_metrics, users)
+    _write_csv(revenue_metrics, output_dir / "revenue_summary.csv")
+    return revenue_metrics
+
+
+def _mrr_bridge_stage(output_dir, cache, users, ledger):
+    """MRR bridge from the shared ledger."""
+    mrr_bridge = cached_call(cache, calculate_mrr_bridge, users, ledger)
+    _write_csv(mrr_bridge, output_dir / "mrr_bridge.csv")
+    return mrr_bridge
+
+
+def _nrr_stage(output_dir, cache, mrr_bridge):
+    """Net revenue retention derived from the bridge."""
+    nrr = cached_call(cache, calculate_net_revenue_retention, None, mrr_bridge=mrr_bridge)
+    _write_csv(nrr, output_dir / "net_revenue_retention.csv")
+    return nrr
+
+
+def _unit_economics_stage(output_dir, cache, users):
+    """Per-user unit economics and their segment summary."""
+    economics = cached_call(cache, calculate_unit_economics, users)
+    economics_summary = cached_call(cache, calculate_unit_economics_summary, economics)
+    _write_csv(economics_summary, output_dir / "unit_economics.csv")
+    return economics_summary
+
+
+def _scenarios_stage(output_dir, cache, users, revenue_metrics):
+    """Six scenario projections."""
+    scenarios = cached_call(cache, generate_scenarios, users, revenue_metrics)
+    _write_csv(scenarios, output_dir / "scenarios_summary.csv")
+    return scenarios
+
+
+def _scenario_bands_stage(output_dir, cache, users, revenue_metrics):
+    """Monte Carlo P10/P50/P90 bands for the same six scenarios."""
+    bands = cached_call(cache, simulate_scenarios, users, revenue_metrics)
+    _write_csv(bands, output_dir / "scenario_bands.csv")
+    return bands
+
+
+def _scenario_sensitivity_stage(output_dir, cache, users, revenue_metrics):
+    """Month-12 MRR tornado: each multiplier swung +/-20% with the rest at 1.0."""
+    ranges = {key: [0.8, 1.2] for key in MULTIPLIERS}
+    sensitivity = cached_call(cache, tornado, users, revenue_metrics, ranges)
+    _write_csv(sensitivity, output_dir / "scenario_sensitivity.csv")
+    return sensitivity
 
 
 def generate_summary_report(users, funnel, revenue, economics, output_dir):
@@ -224,4 +274,19 @@ Pro:                          {len(users[users['current_plan']=='Pro']):,} ({len
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    parser = argparse.ArgumentParser(description="Run the full SaaS analytics pipeline")
+    parser.add_argument('--executor', choices=EXECUTORS, default='thread',
+                        help="How independent stages run concurrently")
+    parser.add_argument('--workers', type=int, default=None, help="Pool size")
+    parser.add_argument('--cache', nargs='?', const=str(DEFAULT_CACHE_DIR), default=None, metavar='DIR',
+                        help=f"Reuse results of unchanged inputs from DIR (default {DEFAULT_CACHE_DIR}; "
+                             "entries are pickles, so DIR must be trusted)")
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                        help="Evict least recently used results above this size")
+    parser.add_argument('--trace', default=None, metavar='FILE',
+                        help="Write a Chrome trace of every stage and metric function to FILE")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Measure per-span peak memory with tracemalloc (several times slower)")
+    args = parser.parse_args()
+    cache = ResultCache(args.cache, args.cache_size_mb * 1024 ** 2) if args.cache else None
+    sys.exit(main(args.executor, args.workers, cache, args.trace, args.trace_memory))
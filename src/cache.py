@@ -0,0 +1,210 @@
+"""
+Result Cache - Content-addressed on-disk cache for metric function results
+
+A result is keyed by the function, the source of the package it lives in,
+and a hash of every argument: DataFrames and Series by their values
+(pd.util.hash_pandas_object), arrays by their bytes, SaaSDatasets by their
+tables, everything else by its pickle. Results are pickled under the cache
+directory; the least recently used entries are evicted once the directory
+exceeds its size bound. Caching is opt-in: nothing is cached unless a
+ResultCache is passed in (run_full_analysis.py / generate_sample_outputs.py
+--cache).
+
+Results are arbitrary objects (frames, ledgers, dicts), so entries are
+pickles and loading one can execute code: only point a ResultCache at a
+directory that you control, never at one shared with or copied from
+untrusted users.
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset import SaaSDataset
+
+
+# Bump when the key or file format changes to invalidate old entries
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path(".cache") / "results"
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of function results on disk.
+
+    Entries are unpickled on a hit, so cache_dir must be trusted (see the
+    module docstring).
+
+    Attributes:
+        cache_dir: Directory holding one <function>-<key>.pkl file per result
+        max_bytes: Total size above which least recently used files are evicted
+        stats: Dict of hits, misses, evictions and bytes written by this instance
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes_written': 0}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Process pools get a copy; its stats stay in the worker
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        """
+        func(*args, **kwargs), loaded from the cache when the same call was stored.
+
+        Returns:
+            The (possibly cached) result
+        """
+        path = self.cache_dir / f"{func.__qualname__}-{self.key(func, args, kwargs)}.pkl"
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            pass
+        else:
+            os.utime(path)  # mark as recently used
+            self._count('hits')
+            return result
+
+        self._count('misses')
+        result = func(*args, **kwargs)
+        self._store(path, result)
+        return result
+
+    def memoize(self, func):
+        """Wrap func so every call goes through call() (picklable for process pools)."""
+        return CachedFunction(self, func)
+
+    def key(self, func, args=(), kwargs=None):
+        """Hex digest identifying func's code and arguments."""
+        digest = hashlib.sha1(f"{CACHE_VERSION}:{func.__module__}.{func.__qualname__}".encode())
+        digest.update(_source_fingerprint(_source_dir(func)))
+        _update(digest, tuple(args))
+        _update(digest, sorted((kwargs or {}).items()))
+        return digest.hexdigest()
+
+    def size(self):
+        """Total bytes of cached results."""
+        return sum(entry.stat().st_size for entry in self.cache_dir.glob("*.pkl"))
+
+    def clear(self):
+        """Delete every cached result."""
+        for entry in self.cache_dir.glob("*.pkl"):
+            entry.unlink(missing_ok=True)
+
+    def summary(self):
+        """One-line hit/miss report."""
+        calls = self.stats['hits'] + self.stats['misses']
+        hit_rate = self.stats['hits'] / calls * 100 if calls else 0.0
+        return (f"cache {self.cache_dir}: {self.stats['hits']} hits, {self.stats['misses']} misses "
+                f"({hit_rate:.0f}% hit rate), {self.stats['evictions']} evicted, "
+                f"{self.size() / 1024 ** 2:.1f} MB on disk")
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _store(self, path, result):
+        """Write result atomically, then evict least recently used entries over max_bytes."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+        self._count('bytes_written', path.stat().st_size)
+
+        with self._lock:
+            entries = []
+            for entry in self.cache_dir.glob("*.pkl"):
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry.stat().st_size, entry))
+                except FileNotFoundError:
+                    continue
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries, key=lambda item: item[0]):
+                if total <= self.max_bytes or entry == path:
+                    break
+                entry.unlink(missing_ok=True)
+                total -= size
+                self.stats['evictions'] += 1
+
+
+class CachedFunction:
+    """A function whose calls go through a ResultCache (see ResultCache.memoize)."""
+
+    def __init__(self, cache, func):
+        self.cache = cache
+        self.func = func
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.cache.call(self.func, *args, **kwargs)
+
+    def __reduce__(self):
+        return CachedFunction, (self.cache, self.func)
+
+
+def cached_call(cache, func, *args, **kwargs):
+    """cache.call(func, ...) when a cache is given, else a plain call."""
+    if cache is None:
+        return func(*args, **kwargs)
+    return cache.call(func, *args, **kwargs)
+
+
+def _update(digest, value):
+    """Feed a type-tagged fingerprint of value into digest."""
+    if isinstance(value, SaaSDataset):
+        digest.update(b"dataset")
+        _update(digest, (value.users, value.transactions, value.events, value.tickets, value.pricing))
+    elif isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(b"frame" if isinstance(value, pd.DataFrame) else b"series")
+        columns = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+        dtypes = value.dtypes if isinstance(value, pd.DataFrame) else [value.dtype]
+        digest.update(repr((list(columns), [str(dtype) for dtype in dtypes], value.shape)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"array:{value.dtype.str}:{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}:{len(value)}".encode())
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, dict):
+        _update(digest, sorted(value.items(), key=lambda item: repr(item[0])))
+    elif value is None or isinstance(value, (str, bytes, int, float, bool, Path, pd.Timestamp)):
+        digest.update(f"{type(value).__name__}:{value!r}".encode())
+    else:
+        digest.update(type(value).__qualname__.encode())
+        digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _source_dir(func):
+    """Directory of the module that defines func."""
+    return Path(inspect.getfile(inspect.unwrap(func))).resolve().parent
+
+
+@functools.lru_cache(maxsize=None)
+def _source_fingerprint(directory):
+    """Digest of every .py file in directory, so code edits invalidate results."""
+    digest = hashlib.sha1()
+    for source in sorted(directory.glob("*.py")):
+        digest.update(source.name.encode())
+        digest.update(source.read_bytes())
+    return digest.digest()
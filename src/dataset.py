@@ -0,0 +1,119 @@
+"""
+SaaS Dataset - Users and raw tables with lazily derived, shared columns
+
+Metric functions in funnel, retention, revenue, unit_economics, metrics and
+engine accept a SaaSDataset wherever they take users_df. Parsed dates,
+period indexes, plan prices, active intervals and the plan-change ledger
+are computed on first use and cached on the dataset, so one run derives
+each of them once and never writes helper columns into the caller's frames.
+"""
+
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from ledger import PlanChangeLedger
+from utils import PLAN_PRICING, period_ordinals
+
+
+class SaaSDataset:
+    """
+    Lazy derived-column cache over a users frame and optional raw tables.
+
+    Args:
+        users: Simulated users (generate_user_lifecycle) or customers.csv rows
+        transactions: Optional transactions table (metrics.compute_rfm)
+        events: Optional events table (RFM recency, engine.compute_churn_risk)
+        tickets: Optional support tickets table (engine.compute_churn_risk)
+        pricing: Plan name -> monthly price
+    """
+
+    def __init__(self, users, transactions=None, events=None, tickets=None, pricing=PLAN_PRICING):
+        self.users = users
+        self.transactions = transactions
+        self.events = events
+        self.tickets = tickets
+        self.pricing = pricing
+        self._datetimes = {}
+        self._periods = {}
+
+    def __len__(self):
+        return len(self.users)
+
+    def datetimes(self, column, table='users'):
+        """Column of table parsed once as a datetime64[ns] array."""
+        key = (table, column)
+        if key not in self._datetimes:
+            values = getattr(self, table)[column]
+            self._datetimes[key] = pd.to_datetime(values).to_numpy(dtype='datetime64[ns]')
+        return self._datetimes[key]
+
+    def periods(self, column, freq='M'):
+        """Period ordinals of a users date column (NO_PERIOD where missing)."""
+        key = (column, freq)
+        if key not in self._periods:
+            self._periods[key] = period_ordinals(self.datetimes(column), freq)
+        return self._periods[key]
+
+    @cached_property
+    def sign_up_date(self):
+        return self.datetimes('sign_up_date')
+
+    @cached_property
+    def churn_date(self):
+        return self.datetimes('churn_date')
+
+    @cached_property
+    def sign_up_month(self):
+        return self.periods('sign_up_date', 'M')
+
+    @cached_property
+    def churn_month(self):
+        return self.periods('churn_date', 'M')
+
+    @cached_property
+    def plan_price(self):
+        """Monthly price of each user's current plan (int64)."""
+        return self.users['current_plan'].map(self.pricing).fillna(0).astype(np.int64).to_numpy()
+
+    @cached_property
+    def is_paying(self):
+        """True where the current plan is not Free."""
+        return (self.users['current_plan'] != 'Free').to_numpy()
+
+    @cached_property
+    def month_horizon(self):
+        """(first month ordinal, number of months): first sign-up month through 12 months after the last."""
+        first_month = self.sign_up_month.min()
+        return first_month, int(self.sign_up_month.max() - first_month) + 13
+
+    @cached_property
+    def active_months(self):
+        """
+        Active interval per user as [start, end) month indexes into month_horizon.
+
+        End is clipped to the horizon length for users who never churn.
+        """
+        first_month, num_months = self.month_horizon
+        start = self.sign_up_month - first_month
+        end = np.minimum(self.churn_month, first_month + num_months) - first_month
+        return start, end
+
+    @cached_property
+    def ledger(self):
+        """Plan-change ledger built from the users frame."""
+        return PlanChangeLedger.from_users(self.users)
+
+    @cached_property
+    def last_activity(self):
+        """Latest login / feature_use per customer (engine.last_activity_by_customer)."""
+        from engine import last_activity_by_customer
+        if self.events is None:
+            raise ValueError("SaaSDataset has no events table")
+        return last_activity_by_customer(self.events)
+
+
+def as_dataset(data):
+    """Wrap a users DataFrame in a SaaSDataset (datasets pass through unchanged)."""
+    return data if isinstance(data, SaaSDataset) else SaaSDataset(data)
@@ -1,70 +1,271 @@
-# See docs/SCHEMA.md and docs/LOGIC.md for metric definitions.
 # Logic Documentation: docs/LOGIC.md | Schema: docs/SCHEMA.md
 import pandas as pd
 import numpy as np
 
-def compute_churn_risk(users_df, events_df, tickets_df=None, reference_date=None):
+from dataset import SaaSDataset
+from ids import NO_TIME, AsOfIndex, as_codes, group_max_dates
+from tracing import traced
+
+# Sentinel used when a customer has never logged in / used a feature
+NO_ACTIVITY_DAYS = 999
+
+
+@traced
+def last_activity_by_customer(events_df):
+    """
+    Reduce an event log to the latest login and feature_use per customer.
+
+    Single grouped pass over the (customer_id, event_name) pairs of interest,
+    unstacked into one column per event type.
+
+    Returns:
+    - DataFrame indexed by customer_id with 'last_login' and 'last_feature_use'
+    """
+    tracked = events_df['event_name'].isin(['login', 'feature_use'])
+    evts = events_df.loc[tracked, ['customer_id', 'event_name']]
+    evts = evts.assign(event_timestamp=pd.to_datetime(events_df.loc[tracked, 'event_timestamp']))
+
+    last = (
+        evts.groupby(['customer_id', 'event_name'], observed=True)['event_timestamp']
+        .max()
+        .unstack('event_name')
+    )
+    last = last.reindex(columns=['login', 'feature_use']).astype('datetime64[ns]')
+    last.columns = ['last_login', 'last_feature_use']
+    return last
+
+
+@traced
+def compute_churn_risk(users_df, events_df=None, tickets_df=None, reference_date=None, event_aggregates=None, ids=None):
     """
     Compute churn risk based on deterministic rules.
-    
+
     Rules:
     - High Risk: No login in > 30 days OR Support ticket satisfaction < 2
     - Medium Risk: No usage of core features in > 14 days
     - Low Risk: Active in last 7 days
-    
+
+    Pass event_aggregates (e.g. from ingest.stream_event_aggregates) instead
+    of events_df when the event log does not fit in memory.
+
+    Pass ids (an ids.IdDictionary) to group events on dense integer customer
+    codes instead of hashing ID strings; output IDs are decoded.
+
+    users_df may be a SaaSDataset: events_df and tickets_df then default to
+    its tables, and its cached last_activity replaces the event grouping.
+
     Returns:
     - DataFrame with 'churn_risk' column (High, Medium, Low)
     """
     ref_date = pd.to_datetime(reference_date)
-    risk_scores = []
-    
-    # Pre-process events
-    events_df['event_timestamp'] = pd.to_datetime(events_df['event_timestamp'])
-    
-    # Pre-process tickets if provided
-    churn_ticket_ids = set()
+    if isinstance(users_df, SaaSDataset):
+        data, users_df = users_df, users_df.users
+        tickets_df = data.tickets if tickets_df is None else tickets_df
+        if events_df is None and event_aggregates is None:
+            events_df = data.events
+            if ids is None:
+                event_aggregates = data.last_activity
+    if ids is not None and event_aggregates is None:
+        return _compute_churn_risk_coded(users_df, events_df, tickets_df, ref_date, ids)
+    customer_ids = users_df['customer_id']
+
+    # Latest login / feature_use per customer, aligned to users_df row order
+    if event_aggregates is None:
+        event_aggregates = last_activity_by_customer(events_df)
+    lookup = customer_ids.values
+    if ids is not None and pd.api.types.is_integer_dtype(event_aggregates.index):
+        # Aggregates streamed with ids are indexed by code
+        lookup = as_codes(customer_ids, ids, add=False)
+    last = event_aggregates[['last_login', 'last_feature_use']].reindex(lookup)
+
+    days_since_login = _days_since(ref_date, last['last_login'])
+    days_since_feature = _days_since(ref_date, last['last_feature_use'])
+
+    # Customers with a support ticket satisfaction < 2
+    bad_ticket = np.zeros(len(users_df), dtype=bool)
     if tickets_df is not None and not tickets_df.empty:
-         # Filter for satisfaction < 2
-         bad_tickets = tickets_df[tickets_df['satisfaction_score'] < 2]
-         churn_ticket_ids = set(bad_tickets['customer_id'].unique())
-
-    # Optimize event lookup
-    grouped_events = events_df.groupby('customer_id')
-    
-    for _, user in users_df.iterrows():
-        user_id = user['customer_id']
-        
-        last_login = pd.NaT
-        last_feature = pd.NaT
-        
-        if user_id in grouped_events.groups:
-            user_events = grouped_events.get_group(user_id)
-            # Find max timestamp for each event type
-            # Assuming event_name and event_timestamp columns exist
-            # Optimizing further: filter by event type then max
-            # But iterating small groups is fast enough
-            
-            logins = user_events[user_events['event_name'] == 'login']['event_timestamp']
-            if not logins.empty:
-                last_login = logins.max()
-                
-            features = user_events[user_events['event_name'] == 'feature_use']['event_timestamp']
-            if not features.empty:
-                last_feature = features.max()
-        
-        days_since_login = (ref_date - last_login).days if pd.notna(last_login) else 999
-        days_since_feature = (ref_date - last_feature).days if pd.notna(last_feature) else 999
-        
-        risk = 'Low'
-        if days_since_login > 30 or user_id in churn_ticket_ids:
-            risk = 'High'
-        elif days_since_feature > 14:
-            risk = 'Medium'
-            
-        risk_scores.append({
-            'customer_id': user_id,
-            'churn_risk': risk,
-            'days_since_active': min(days_since_login, days_since_feature)
-        })
-        
-    return pd.DataFrame(risk_scores)
+        bad_tickets = tickets_df[tickets_df['satisfaction_score'] < 2]
+        bad_ticket = customer_ids.isin(bad_tickets['customer_id'].unique()).to_numpy()
+
+    return score_churn_risk(customer_ids.to_numpy(), days_since_login, days_since_feature, bad_ticket)
+
+
+def _compute_churn_risk_coded(users_df, events_df, tickets_df, ref_date, ids):
+    """compute_churn_risk on dense customer codes (sort-based group maxima, array lookups)."""
+    user_codes = as_codes(users_df['customer_id'], ids)
+    evt_codes = as_codes(events_df['customer_id'], ids)
+    size = len(ids)
+
+    names = events_df['event_name'].to_numpy()
+    timestamps = pd.to_datetime(events_df['event_timestamp']).to_numpy(dtype='datetime64[ns]')
+    days = {}
+    for name in ('login', 'feature_use'):
+        is_name = names == name
+        # Trailing NaT slot serves users whose code is NO_ID
+        last = np.append(group_max_dates(evt_codes[is_name], timestamps[is_name], size), np.datetime64('NaT'))
+        days[name] = _days_since(ref_date, pd.Series(last[user_codes]))
+
+    bad = np.zeros(size + 1, dtype=bool)
+    if tickets_df is not None and not tickets_df.empty:
+        bad_tickets = tickets_df[tickets_df['satisfaction_score'] < 2]
+        bad_codes = as_codes(bad_tickets['customer_id'], ids, add=False)
+        bad[bad_codes[bad_codes >= 0]] = True
+
+    customer_ids = users_df['customer_id'].to_numpy()
+    if pd.api.types.is_integer_dtype(users_df['customer_id']):
+        customer_ids = ids.decode(user_codes)
+    return score_churn_risk(customer_ids, days['login'], days['feature_use'], bad[user_codes])
+
+
+def score_churn_risk(customer_ids, days_since_login, days_since_feature, bad_ticket,
+                     login_days=30, feature_days=14):
+    """
+    Apply the churn-risk rules to per-customer activity gaps.
+
+    Args:
+        customer_ids: Array of customer ids (output row order)
+        days_since_login: int array, NO_ACTIVITY_DAYS where never logged in
+        days_since_feature: int array, NO_ACTIVITY_DAYS where never used a feature
+        bad_ticket: bool array, True where a ticket scored satisfaction < 2
+        login_days, feature_days: High / Medium thresholds (e.g. for calibration)
+
+    Returns:
+        DataFrame with 'customer_id', 'churn_risk' and 'days_since_active'
+    """
+    high = (days_since_login > login_days) | bad_ticket
+    medium = ~high & (days_since_feature > feature_days)
+    risk = np.where(high, 'High', np.where(medium, 'Medium', 'Low'))
+
+    return pd.DataFrame({
+        'customer_id': customer_ids,
+        'churn_risk': risk.astype(object),
+        'days_since_active': np.minimum(days_since_login, days_since_feature)
+    })
+
+
+@traced
+def backtest_churn_risk(subscriptions_df, events_df, tickets_df=None, reference_dates=None, horizon_days=30,
+                        login_days=30, feature_days=14, ids=None):
+    """
+    Churn-risk labels as of many past dates, next to the churn that followed.
+
+    Login and feature_use events are sorted once per customer; each
+    reference date then needs one binary search per event type for the
+    last login / feature use on or before it. A customer's bad-ticket
+    status as of a date is whether their first ticket with satisfaction < 2
+    was created by then. Unlike compute_churn_risk, which scores whatever
+    events and tickets it is given, nothing after a reference date is used.
+
+    Each date scores the customers whose subscription is live on it
+    (start_date <= date < end_date, an empty end_date meaning still
+    active); a customer's subscriptions are combined into first start and
+    last end. The customer churned within the horizon if end_date falls in
+    (date, date + horizon_days].
+
+    Args:
+        subscriptions_df: subscriptions.csv rows (customer_id, start_date, end_date)
+        events_df: Events with customer_id, event_name, event_timestamp
+        tickets_df: Optional support tickets with customer_id, created_at, satisfaction_score
+        reference_dates: Iterable of dates, e.g. weekly over two years
+        horizon_days: Days after each date in which realized churn is counted
+        login_days, feature_days: Rule thresholds (see score_churn_risk)
+        ids: Optional ids.IdDictionary; customer_id columns are matched on its
+            codes (they may already be coded) and output IDs are decoded
+
+    Returns:
+        DataFrame with one row per (reference_date, live customer):
+        reference_date, customer_id, churn_risk, days_since_active,
+        days_since_login, days_since_feature, bad_ticket and churned
+    """
+    if reference_dates is None:
+        raise ValueError("reference_dates is required")
+    reference_dates = pd.DatetimeIndex(pd.to_datetime(list(reference_dates)))
+    horizon = pd.Timedelta(days=horizon_days).value
+    day = pd.Timedelta(days=1).value
+
+    def keys(df):
+        return df['customer_id'] if ids is None else as_codes(df['customer_id'], ids)
+
+    subs = subscriptions_df.assign(customer_id=keys(subscriptions_df),
+                                   start_date=pd.to_datetime(subscriptions_df['start_date']),
+                                   end_date=pd.to_datetime(subscriptions_df['end_date']))
+    # An open subscription outlives every reference date
+    subs['end_date'] = subs['end_date'].fillna(pd.Timestamp.max)
+    lifetimes = subs.groupby('customer_id').agg(start=('start_date', 'min'), end=('end_date', 'max'))
+    customer_ids = lifetimes.index.to_numpy()
+    start = lifetimes['start'].to_numpy(dtype='datetime64[ns]').view('int64')
+    end = lifetimes['end'].to_numpy(dtype='datetime64[ns]').view('int64')
+
+    names = events_df['event_name'].to_numpy()
+    event_codes = lifetimes.index.get_indexer(keys(events_df))
+    timestamps = pd.to_datetime(events_df['event_timestamp'])
+    indexes = {name: AsOfIndex(event_codes[names == name], timestamps[names == name])
+               for name in ('login', 'feature_use')}
+
+    first_bad = np.full(len(customer_ids), NO_TIME)
+    if tickets_df is not None and not tickets_df.empty:
+        bad_tickets = tickets_df[tickets_df['satisfaction_score'] < 2]
+        first = pd.to_datetime(bad_tickets['created_at']).groupby(keys(bad_tickets)).min()
+        first = first.reindex(customer_ids).to_numpy(dtype='datetime64[ns]')
+        first_bad = np.where(np.isnat(first), NO_TIME, first.view('int64'))
+
+    frames = []
+    for ref_date in reference_dates:
+        ref_ns = ref_date.value
+        live = np.flatnonzero((start <= ref_ns) & (end > ref_ns))
+        days = {}
+        for name, index in indexes.items():
+            last = index.last_time(live, index.position(live, ref_ns))
+            days[name] = np.where(last == NO_TIME, NO_ACTIVITY_DAYS, (ref_ns - last) // day)
+        bad_ticket = (first_bad[live] != NO_TIME) & (first_bad[live] <= ref_ns)
+
+        live_ids = customer_ids[live] if ids is None else ids.decode(customer_ids[live])
+        frame = score_churn_risk(live_ids, days['login'], days['feature_use'], bad_ticket,
+                                 login_days, feature_days)
+        frame.insert(0, 'reference_date', ref_date)
+        frame['days_since_login'] = days['login']
+        frame['days_since_feature'] = days['feature_use']
+        frame['bad_ticket'] = bad_ticket
+        frame['churned'] = end[live] <= ref_ns + horizon
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def churn_risk_precision_recall(panel, by_date=False):
+    """
+    Precision and recall of backtest_churn_risk labels against realized churn.
+
+    Two alerting policies are evaluated: flagging High risk only, and
+    flagging High or Medium.
+
+    Args:
+        panel: Output of backtest_churn_risk
+        by_date: One row per reference date and policy instead of pooled
+
+    Returns:
+        DataFrame with flagged_as, customers, churned, flagged,
+        true_positives, precision and recall (NaN where undefined), led by
+        reference_date when by_date
+    """
+    policies = {'High': panel['churn_risk'] == 'High', 'High+Medium': panel['churn_risk'] != 'Low'}
+    counts = pd.concat([pd.DataFrame({
+        'reference_date': panel['reference_date'].to_numpy(),
+        'flagged_as': policy,
+        'customers': 1,
+        'churned': panel['churned'].to_numpy(),
+        'flagged': flagged.to_numpy(),
+        'true_positives': (flagged & panel['churned']).to_numpy(),
+    }) for policy, flagged in policies.items()])
+
+    keys = ['reference_date', 'flagged_as'] if by_date else ['flagged_as']
+    result = counts.drop(columns=[] if by_date else ['reference_date']).groupby(keys, sort=by_date).sum()
+    result = result.astype('int64').reset_index()
+    result['precision'] = result['true_positives'] / result['flagged'].where(result['flagged'] > 0)
+    result['recall'] = result['true_positives'] / result['churned'].where(result['churned'] > 0)
+    return result
+
+
+def _days_since(ref_date, timestamps):
+    """Whole days between timestamps and ref_date, NO_ACTIVITY_DAYS where missing."""
+    days = (ref_date - timestamps).dt.days
+    return days.fillna(NO_ACTIVITY_DAYS).astype('int64').to_numpy()
@@ -0,0 +1,112 @@
+"""
+Event-Name Normalization - Maps producer-specific event names to canonical ones
+
+configs/event_name_map.yaml lists, per canonical event, the aliases other
+producers emit ('Login', 'sign_in' -> 'login'). The map is compiled once;
+normalizing a column then only translates its distinct categories and applies
+one vectorized take over the categorical codes, however many rows it has.
+"""
+
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+
+EVENT_NAME_MAP_PATH = Path(__file__).parent.parent / "configs" / "event_name_map.yaml"
+
+
+def load_event_name_map(path=EVENT_NAME_MAP_PATH):
+    """
+    Read an alias map as {alias: canonical name}.
+
+    Args:
+        path: YAML file of canonical name -> list of aliases, or a headerless
+            CSV of alias,canonical rows
+
+    Returns:
+        Dict of alias -> canonical event name (canonical names map to themselves)
+    """
+    path = Path(path)
+    if path.suffix == '.csv':
+        rows = pd.read_csv(path, header=None, names=['alias', 'canonical'], dtype=str)
+        alias_map = dict(zip(rows['canonical'], rows['canonical']))
+        alias_map.update(zip(rows['alias'], rows['canonical']))
+        return alias_map
+
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    alias_map = {}
+    for canonical, aliases in config.items():
+        alias_map[canonical] = canonical
+        for alias in aliases or []:
+            if alias_map.get(alias, canonical) != canonical:
+                raise ValueError(f"Event alias '{alias}' maps to both '{alias_map[alias]}' and '{canonical}'")
+            alias_map[alias] = canonical
+    return alias_map
+
+
+class EventNameNormalizer:
+    """
+    Compiled alias -> canonical event-name lookup.
+
+    Names missing from the map are kept as-is and tallied in unknown_counts
+    (accumulated across calls, e.g. over the chunks of a streamed file).
+    """
+
+    def __init__(self, alias_map):
+        self.canonical = list(dict.fromkeys(alias_map.values()))
+        position = {name: i for i, name in enumerate(self.canonical)}
+        self._lookup = {alias: position[canonical] for alias, canonical in alias_map.items()}
+        self.unknown_counts = Counter()
+
+    @classmethod
+    def from_config(cls, path=EVENT_NAME_MAP_PATH):
+        """Compile the normalizer from an alias map file."""
+        return cls(load_event_name_map(path))
+
+    def normalize(self, names):
+        """
+        Map event names to canonical names.
+
+        Args:
+            names: Series or array of event names (categorical is fastest)
+
+        Returns:
+            Categorical of canonical names; categories are the canonical names
+            followed by any unknown names
+        """
+        if isinstance(getattr(names, 'dtype', None), pd.CategoricalDtype):
+            names = pd.Categorical(names)
+        else:
+            names = pd.Categorical(np.asarray(names, dtype=object))
+        categories = names.categories
+
+        # Translate each distinct category once
+        targets = np.array([self._lookup.get(name, -1) for name in categories], dtype=np.int64)
+        unknown = np.flatnonzero(targets < 0)
+        targets[unknown] = len(self.canonical) + np.arange(len(unknown))
+        new_categories = self.canonical + list(categories[unknown])
+
+        codes = names.codes
+        if len(unknown):
+            counts = np.bincount(codes[codes >= 0], minlength=len(categories))[unknown]
+            self.unknown_counts.update({categories[i]: int(n) for i, n in zip(unknown, counts) if n})
+
+        # One take over the row codes; the trailing -1 keeps missing names missing
+        new_codes = np.append(targets, -1)[codes]
+        return pd.Categorical.from_codes(new_codes, new_categories)
+
+
+@lru_cache(maxsize=None)
+def _default_alias_map():
+    """Alias map from configs/event_name_map.yaml, read once per process."""
+    return load_event_name_map(EVENT_NAME_MAP_PATH)
+
+
+def default_normalizer():
+    """Fresh normalizer (own unknown_counts) over the default config map."""
+    return EventNameNormalizer(_default_alias_map())
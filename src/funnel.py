@@ -5,17 +5,23 @@ Funnel Analysis - Calculates activation and conversion metrics
 import pandas as pd
 import numpy as np
 
+from dataset import as_dataset
+from segments import DEFAULT_GROUPING_SETS, grouping_sets_summary
+from tracing import traced
 
+
+@traced
 def calculate_funnel_metrics(users_df):
     """
     Calculate funnel conversion rates.
     
     Args:
-        users_df: DataFrame with user lifecycle data
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
         
     Returns:
         DataFrame with funnel metrics
     """
+    users_df = as_dataset(users_df).users
     total_users = len(users_df)
     free_users = len(users_df[users_df['initial_plan'] == 'Free'])
     
@@ -59,59 +65,28 @@ def calculate_funnel_metrics(users_df):
     return funnel_metrics
 
 
-def calculate_conversion_summary(users_df):
+@traced
+def calculate_conversion_summary(users_df, grouping_sets=DEFAULT_GROUPING_SETS):
     """
     Calculate detailed conversion metrics by channel and plan.
     
     Args:
-        users_df: DataFrame with user lifecycle data
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
+        grouping_sets: Segments to report, e.g. cube('acquisition_channel',
+            'current_plan', 'sign_up_month'). Defaults to Overall, per channel
+            and per plan.
         
     Returns:
         DataFrame with conversion summary
     """
-    summaries = []
-    
-    # Overall conversion
-    summaries.append({
-        'segment': 'Overall',
-        'total_users': len(users_df),
-        'activated': users_df['activated'].sum(),
-        'activation_rate': users_df['activated'].mean(),
-        'converted_to_paid': users_df['converted_to_paid'].sum(),
-        'conversion_rate': users_df['converted_to_paid'].mean(),
-        'churned': users_df['churned'].sum(),
-        'churn_rate': users_df['churned'].mean()
-    })
-    
-    # By acquisition channel
-    for channel in users_df['acquisition_channel'].unique():
-        channel_users = users_df[users_df['acquisition_channel'] == channel]
-        summaries.append({
-            'segment': f'Channel: {channel}',
-            'total_users': len(channel_users),
-            'activated': channel_users['activated'].sum(),
-            'activation_rate': channel_users['activated'].mean(),
-            'converted_to_paid': channel_users['converted_to_paid'].sum(),
-            'conversion_rate': channel_users['converted_to_paid'].mean(),
-            'churned': channel_users['churned'].sum(),
-            'churn_rate': channel_users['churned'].mean()
-        })
-    
-    # By current plan
-    for plan in users_df['current_plan'].unique():
-        plan_users = users_df[users_df['current_plan'] == plan]
-        summaries.append({
-            'segment': f'Plan: {plan}',
-            'total_users': len(plan_users),
-            'activated': plan_users['activated'].sum(),
-            'activation_rate': plan_users['activated'].mean(),
-            'converted_to_paid': plan_users['converted_to_paid'].sum(),
-            'conversion_rate': plan_users['converted_to_paid'].mean(),
-            'churned': plan_users['churned'].sum(),
-            'churn_rate': plan_users['churned'].mean()
-        })
-    
-    return pd.DataFrame(summaries)
+    return grouping_sets_summary(as_dataset(users_df).users, grouping_sets, 'total_users', [
+        ('activated', 'activated', 'sum'),
+        ('activation_rate', 'activated', 'mean'),
+        ('converted_to_paid', 'converted_to_paid', 'sum'),
+        ('conversion_rate', 'converted_to_paid', 'mean'),
+        ('churned', 'churned', 'sum'),
+        ('churn_rate', 'churned', 'mean')
+    ])
 
 
 if __name__ == "__main__":
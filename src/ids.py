@@ -0,0 +1,192 @@
+"""
+ID Dictionary - Dense int32 codes for external customer IDs
+
+External IDs ('U000001', ...) are hashed once at ingest and replaced by
+dense codes 0..n-1. Internal aggregation then runs on codes (bincount,
+array indexing, sort-based group maxima) and IDs are decoded only when
+results are written out.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Code for missing / unknown IDs
+NO_ID = -1
+
+# AsOfIndex time (int64 ns) for codes with no rows before a date; NaT's value
+NO_TIME = np.iinfo(np.int64).min
+
+
+class IdDictionary:
+    """
+    Append-only mapping between external IDs and dense int32 codes.
+
+    Codes are assigned in first-seen order and never change, so arrays
+    indexed by code stay valid as new IDs arrive. Lookups go through a
+    pandas Index over the bulk of the IDs plus a small dict of recent
+    additions, which is folded into the Index once it grows past a fraction
+    of it; adding a batch of IDs therefore costs amortized O(batch).
+    """
+
+    def __init__(self, ids=()):
+        self._values = np.empty(0, dtype=object)
+        self._size = 0
+        self._index = pd.Index([], dtype=object)
+        self._recent = {}
+        if len(ids):
+            self.encode(ids)
+
+    def __len__(self):
+        return self._size
+
+    def __getstate__(self):
+        return {'values': self.values}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self._values = np.asarray(state['values'], dtype=object)
+        self._size = len(self._values)
+        self._index = pd.Index(self._values)
+
+    @property
+    def values(self):
+        """External IDs indexed by code."""
+        return self._values[:self._size]
+
+    def encode(self, ids, add=True):
+        """
+        Map external IDs to codes.
+
+        Args:
+            ids: Array-like of external IDs
+            add: Assign codes to unseen IDs; otherwise they map to NO_ID
+
+        Returns:
+            int32 array of codes (NO_ID for missing values)
+        """
+        inverse, uniques = pd.factorize(np.asarray(ids, dtype=object))
+        codes = self._lookup(uniques)
+        unseen = codes == NO_ID
+        if add and unseen.any():
+            codes[unseen] = self._append(uniques[unseen])
+        codes = np.append(codes, NO_ID).astype(np.int32)
+        # factorize marks missing values with -1, which picks the trailing NO_ID
+        return codes[inverse]
+
+    def decode(self, codes):
+        """Map codes back to external IDs (None for NO_ID)."""
+        codes = np.asarray(codes)
+        return np.append(self.values, None)[np.where(codes < 0, self._size, codes)]
+
+    def _lookup(self, uniques):
+        """Codes for unique IDs, NO_ID where unseen."""
+        codes = self._index.get_indexer(uniques).astype(np.int64)
+        if self._recent:
+            misses = np.flatnonzero(codes == NO_ID)
+            codes[misses] = [self._recent.get(uid, NO_ID) for uid in uniques[misses]]
+        return codes
+
+    def _append(self, new_ids):
+        """Assign the next codes to new_ids and return them."""
+        start = self._size
+        end = start + len(new_ids)
+        if end > len(self._values):
+            grown = np.empty(max(end, 2 * len(self._values)), dtype=object)
+            grown[:start] = self._values[:start]
+            self._values = grown
+        self._values[start:end] = new_ids
+        self._size = end
+
+        codes = np.arange(start, end)
+        self._recent.update(zip(new_ids, codes))
+        if len(self._recent) > len(self._index) // 4 + 1024:
+            self._index = pd.Index(self.values)
+            self._recent = {}
+        return codes
+
+
+def group_count(codes, size):
+    """Rows per code (codes < 0 ignored)."""
+    codes = np.asarray(codes)
+    return np.bincount(codes[codes >= 0], minlength=size)
+
+
+def group_sum(codes, values, size):
+    """Sum of values per code (codes < 0 ignored)."""
+    codes = np.asarray(codes)
+    keep = codes >= 0
+    return np.bincount(codes[keep], weights=np.asarray(values, dtype=np.float64)[keep], minlength=size)
+
+
+def group_max_dates(codes, dates, size):
+    """
+    Latest datetime64[ns] per code via one sort (NaT where a code has none).
+
+    Sorting by (code, date) puts each code's maximum last in its run, which
+    avoids hashing and the slow ufunc.at path.
+    """
+    codes = np.asarray(codes)
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    keep = (codes >= 0) & ~np.isnat(dates)
+    codes, dates = codes[keep], dates[keep]
+
+    result = np.full(size, np.datetime64('NaT'), dtype='datetime64[ns]')
+    if len(codes):
+        order = np.lexsort((dates, codes))
+        sorted_codes = codes[order]
+        last = np.append(sorted_codes[1:] != sorted_codes[:-1], True)
+        result[sorted_codes[last]] = dates[order][last]
+    return result
+
+
+class AsOfIndex:
+    """
+    Rows sorted once by (code, time) for batched as-of lookups.
+
+    Rows are keyed by the int64 code x T + dense rank of the time among the
+    T distinct times, so the rows of one code at or before any time are
+    found with one searchsorted over the whole table, for all codes at once.
+    Rows with NO_ID codes or NaT times are dropped.
+
+    Attributes:
+        keys: Sorted composite keys
+        times: int64 ns times in key order
+        cumulative: Prefix sums of values in key order (with a leading 0),
+            if values were given
+    """
+
+    def __init__(self, codes, times, values=None):
+        times = pd.DatetimeIndex(times)
+        codes = np.asarray(codes, dtype=np.int64)
+        keep = (codes >= 0) & ~times.isna()
+        ns = times.asi8[keep]
+        codes = codes[keep]
+        self.distinct, ranks = np.unique(ns, return_inverse=True)
+        self.stride = len(self.distinct) + 1
+        keys = codes * self.stride + ranks
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.times = ns[order]
+        if values is not None:
+            self.cumulative = np.concatenate([[0.0], np.cumsum(np.asarray(values, dtype=float)[keep][order])])
+
+    def position(self, codes, ns):
+        """Index one past each code's last row at or before ns (int64 ns)."""
+        rank = np.searchsorted(self.distinct, ns, side='right')
+        return np.searchsorted(self.keys, codes * self.stride + rank, side='left')
+
+    def last_time(self, codes, end):
+        """Time of each code's row before position end, or NO_TIME if it has none."""
+        if not len(self.keys):
+            return np.full(len(codes), NO_TIME)
+        previous = np.maximum(end - 1, 0)
+        found = (end > 0) & (self.keys[previous] // self.stride == codes)
+        return np.where(found, self.times[previous], NO_TIME)
+
+
+def as_codes(values, ids, add=True):
+    """Codes for an ID column: passed through if already integer codes, else encoded."""
+    if pd.api.types.is_integer_dtype(values):
+        return np.asarray(values, dtype=np.int32)
+    return ids.encode(values, add=add)
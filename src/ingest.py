@@ -0,0 +1,361 @@
+"""
+Raw Data Ingest - Typed loading of data/raw_sample/ CSVs with a binary cache
+
+Each table is parsed once with the dtypes declared in docs/SCHEMA.md
+(categoricals, datetime64 dates, bool flags) and persisted column by column
+under <data_dir>/.cache/: one .npy file per column (categoricals as codes
+plus categories, strings as fixed-width unicode plus a missing mask) and a
+JSON sidecar with the column order and kinds. Later loads reuse the cache
+until the CSV changes. Nothing is unpickled (np.load runs with
+allow_pickle=False), so a cache directory cannot execute code on load.
+"""
+
+import hashlib
+import json
+import shutil
+import sys
+import warnings
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: no peak-RSS reporting
+    resource = None
+
+import numpy as np
+import pandas as pd
+
+from event_names import default_normalizer
+from ids import group_max_dates
+
+
+RAW_SAMPLE_DIR = Path(__file__).parent.parent / "data" / "raw_sample"
+
+# Bump when RAW_SCHEMA or the parsing logic changes to invalidate old caches
+CACHE_VERSION = 2
+
+# Declared dtypes per raw table (see docs/SCHEMA.md)
+RAW_SCHEMA = {
+    'customers': {
+        'customer_id': 'str',
+        'signup_date': 'datetime',
+        'acquisition_source': 'category',
+        'initial_plan': 'category',
+        'activated': 'bool',
+        'country': 'category'
+    },
+    'transactions': {
+        'transaction_id': 'str',
+        'customer_id': 'str',
+        'transaction_date': 'datetime',
+        'amount': 'float64',
+        'currency': 'category',
+        'invoice_status': 'category'
+    },
+    'subscriptions': {
+        'subscription_id': 'str',
+        'customer_id': 'str',
+        'start_date': 'datetime',
+        'end_date': 'datetime',
+        'status': 'category',
+        'plan_price': 'float64',
+        'plan_name': 'category'
+    },
+    'events': {
+        'event_id': 'str',
+        'customer_id': 'str',
+        'event_name': 'category',
+        'event_timestamp': 'datetime'
+    },
+    'support_tickets': {
+        'ticket_id': 'str',
+        'customer_id': 'str',
+        'created_at': 'datetime',
+        'closed_at': 'datetime',
+        'status': 'category',
+        'satisfaction_score': 'float64'
+    }
+}
+
+
+def load_table(name, data_dir=RAW_SAMPLE_DIR, use_cache=True, validate='stat', ids=None,
+               normalize_events=True):
+    """
+    Load one raw table with declared dtypes, using the binary cache when fresh.
+
+    Args:
+        name: Table name (key of RAW_SCHEMA), e.g. 'events'
+        data_dir: Directory holding <name>.csv
+        use_cache: Read/write the cache under <data_dir>/.cache/
+        validate: 'stat' keys the cache on file size + mtime, 'hash' on a
+            BLAKE2 digest of the CSV bytes (robust to touch/copy, costs one read)
+        ids: Optional ids.IdDictionary; customer_id is then replaced by its
+            int32 codes (the cache always holds the external IDs)
+        normalize_events: Map events.event_name aliases to canonical names
+            (configs/event_name_map.yaml); unmapped names are kept and counted
+            in attrs['unknown_event_names']
+
+    Returns:
+        Typed DataFrame
+    """
+    if name not in RAW_SCHEMA:
+        raise ValueError(f"Unknown raw table: {name}")
+    csv_path = Path(data_dir) / f"{name}.csv"
+
+    if not use_cache:
+        return _finish(_parse_csv(csv_path, RAW_SCHEMA[name]), ids, normalize_events)
+
+    cache_path = _cache_path(csv_path, validate)
+    if (cache_path / "columns.json").exists():
+        return _finish(_read_columns(cache_path), ids, normalize_events)
+
+    df = _parse_csv(csv_path, RAW_SCHEMA[name])
+    cache_path.parent.mkdir(exist_ok=True)
+    # Replace this mode's entry (and older cache versions); the other mode's entry stays valid
+    current = f"{name}-v{CACHE_VERSION}-"
+    for stale in cache_path.parent.glob(f"{name}-*"):
+        if stale.name.startswith(current) and not stale.name.startswith(f"{current}{validate}-"):
+            continue
+        if stale.is_dir():
+            shutil.rmtree(stale)
+        else:
+            stale.unlink()
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    _write_columns(df, tmp_path)
+    tmp_path.replace(cache_path)
+    return _finish(df, ids, normalize_events)
+
+
+def load_raw_sample(data_dir=RAW_SAMPLE_DIR, tables=None, **kwargs):
+    """
+    Load several raw tables (default: every table present in data_dir).
+
+    Keyword arguments go to load_table; pass one shared ids dictionary so
+    customer codes agree across tables.
+
+    Returns:
+        Dict of table name -> typed DataFrame
+    """
+    if tables is None:
+        tables = [name for name in RAW_SCHEMA if (Path(data_dir) / f"{name}.csv").exists()]
+    return {name: load_table(name, data_dir, **kwargs) for name in tables}
+
+
+def stream_event_aggregates(csv_path=RAW_SAMPLE_DIR / "events.csv", chunksize=1_000_000, as_of=None, ids=None):
+    """
+    Fold events.csv into per-customer running maxima, one chunk at a time.
+
+    Event names are normalized per chunk with the compiled alias map.
+
+    Only the running aggregate (one row per customer) and the current chunk
+    are ever in memory, so peak memory tracks the customer count rather than
+    the event count.
+
+    Args:
+        csv_path: Path to an events CSV (event_id, customer_id, event_name, event_timestamp)
+        chunksize: Rows per chunk
+        as_of: Optional cutoff; events after it are ignored. Required (equal to
+            the reference date) when the result feeds metrics.compute_rfm.
+        ids: Optional ids.IdDictionary; chunks are then folded into arrays
+            indexed by code (group_max_dates) instead of grouping ID strings,
+            and the aggregates are indexed by code
+
+    Returns:
+        Tuple of (aggregates, report):
+        - aggregates: DataFrame indexed by customer_id (codes with ids) with 'last_event',
+          'last_login' and 'last_feature_use'; attrs['as_of'] holds the cutoff
+        - report: Dict with 'chunks', 'rows', 'customers', 'unknown_event_names'
+          (name -> count of events not in the alias map) and 'peak_rss_mb'
+    """
+    cutoff = pd.to_datetime(as_of) if as_of is not None else None
+    schema = RAW_SCHEMA['events']
+    columns = ['customer_id', 'event_name', 'event_timestamp']
+    running = None
+    chunks = rows = 0
+    normalizer = default_normalizer()
+
+    reader = pd.read_csv(csv_path, usecols=columns, chunksize=chunksize,
+                         dtype={'customer_id': object, 'event_name': schema['event_name']})
+    for chunk in reader:
+        chunks += 1
+        rows += len(chunk)
+        timestamps = pd.to_datetime(chunk['event_timestamp'], format='ISO8601')
+        if cutoff is not None:
+            keep = (timestamps <= cutoff).to_numpy()
+            chunk, timestamps = chunk[keep], timestamps[keep]
+
+        customer = chunk['customer_id']
+        name = pd.Series(normalizer.normalize(chunk['event_name']), index=chunk.index)
+        if ids is not None:
+            running = _fold_coded(running, ids.encode(customer), timestamps, name, len(ids))
+            continue
+        partial = pd.concat([
+            timestamps.groupby(customer).max(),
+            timestamps[name == 'login'].groupby(customer[name == 'login']).max(),
+            timestamps[name == 'feature_use'].groupby(customer[name == 'feature_use']).max()
+        ], axis=1, keys=['last_event', 'last_login', 'last_feature_use'])
+
+        if running is None:
+            running = partial
+        else:
+            running = pd.concat([running, partial]).groupby(level=0).max()
+
+    if ids is not None:
+        running = _coded_aggregates(running)
+    elif running is None:
+        running = pd.DataFrame(columns=['last_event', 'last_login', 'last_feature_use'],
+                               dtype='datetime64[ns]')
+    running.index.name = 'customer_id'
+    running.attrs['as_of'] = cutoff
+
+    report = {
+        'chunks': chunks,
+        'rows': rows,
+        'customers': len(running),
+        'unknown_event_names': dict(normalizer.unknown_counts),
+        'peak_rss_mb': _peak_rss_mb()
+    }
+    _warn_unknown_event_names(normalizer.unknown_counts)
+    return running, report
+
+
+def _fold_coded(running, codes, timestamps, name, size):
+    """Fold one chunk into per-code arrays of last event / login / feature_use."""
+    timestamps = timestamps.to_numpy(dtype='datetime64[ns]')
+    name = name.to_numpy()
+    partial = {
+        'last_event': group_max_dates(codes, timestamps, size),
+        'last_login': group_max_dates(codes[name == 'login'], timestamps[name == 'login'], size),
+        'last_feature_use': group_max_dates(codes[name == 'feature_use'], timestamps[name == 'feature_use'], size),
+    }
+    if running is None:
+        return partial
+    # Codes only grow; fmax keeps the non-NaT side
+    for column, values in partial.items():
+        grown = np.full(size, np.datetime64('NaT'), dtype='datetime64[ns]')
+        grown[:len(running[column])] = running[column]
+        partial[column] = np.fmax(grown, values)
+    return partial
+
+
+def _coded_aggregates(running):
+    """Per-code arrays as a frame of the codes that had any event."""
+    if running is None:
+        return pd.DataFrame(columns=['last_event', 'last_login', 'last_feature_use'], dtype='datetime64[ns]',
+                            index=pd.Index([], dtype=np.int32))
+    seen = np.flatnonzero(~np.isnat(running['last_event']))
+    return pd.DataFrame({column: values[seen] for column, values in running.items()},
+                        index=pd.Index(seen.astype(np.int32)))
+
+
+def _finish(df, ids, normalize_events):
+    """Post-load steps kept out of the cache: event-name normalization and ID encoding."""
+    if normalize_events and 'event_name' in df:
+        normalizer = default_normalizer()
+        df = df.assign(event_name=normalizer.normalize(df['event_name']))
+        df.attrs['unknown_event_names'] = dict(normalizer.unknown_counts)
+        _warn_unknown_event_names(normalizer.unknown_counts)
+    if ids is not None and 'customer_id' in df:
+        df = df.assign(customer_id=ids.encode(df['customer_id']))
+    return df
+
+
+def _warn_unknown_event_names(unknown_counts):
+    """Warn about the event names missing from the alias map, most frequent first."""
+    if unknown_counts:
+        listed = ', '.join(f"{name} ({count})" for name, count in unknown_counts.most_common(10))
+        warnings.warn(f"{sum(unknown_counts.values())} events with unmapped names: {listed}", stacklevel=3)
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MiB (None where unavailable)."""
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _parse_csv(csv_path, schema):
+    """Parse a CSV once, applying the declared dtype of every column."""
+    read_dtypes = {}
+    for col, kind in schema.items():
+        if kind == 'str':
+            read_dtypes[col] = object
+        elif kind in ('category', 'float64'):
+            read_dtypes[col] = kind
+    df = pd.read_csv(csv_path, dtype=read_dtypes)
+
+    for col, kind in schema.items():
+        if col not in df:
+            continue
+        if kind == 'datetime':
+            df[col] = pd.to_datetime(df[col], format='ISO8601')
+        elif kind == 'bool' and df[col].dtype != bool:
+            df[col] = df[col].astype(str).str.lower().map({'true': True, 'false': False}).fillna(False).astype(bool)
+    return df
+
+
+def _cache_path(csv_path, validate):
+    """Cache file for csv_path; the name encodes what the cache was built from."""
+    if validate == 'stat':
+        stat = csv_path.stat()
+        key = f"{stat.st_size}-{stat.st_mtime_ns}"
+    elif validate == 'hash':
+        digest = hashlib.blake2b(digest_size=16)
+        with open(csv_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        key = digest.hexdigest()
+    else:
+        raise ValueError(f"Unknown cache validation mode: {validate}")
+    return csv_path.parent / ".cache" / f"{csv_path.stem}-v{CACHE_VERSION}-{validate}-{key}"
+
+
+def _write_columns(df, path):
+    """Write df as one .npy per column plus columns.json (see module docstring)."""
+    path.mkdir()
+    columns = []
+    for i, (name, values) in enumerate(df.items()):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            kind = 'category'
+            np.save(path / f"{i}.npy", values.cat.codes.to_numpy())
+            _save_strings(path / f"{i}.categories", values.cat.categories.to_numpy())
+        elif values.dtype == object:
+            kind = 'string'
+            _save_strings(path / f"{i}", values.to_numpy())
+        else:
+            kind = 'array'
+            np.save(path / f"{i}.npy", values.to_numpy())
+        columns.append({'name': name, 'kind': kind})
+    (path / "columns.json").write_text(json.dumps({'rows': len(df), 'columns': columns}))
+
+
+def _read_columns(path):
+    """Inverse of _write_columns."""
+    meta = json.loads((path / "columns.json").read_text())
+    data = {}
+    for i, column in enumerate(meta['columns']):
+        if column['kind'] == 'category':
+            codes = np.load(path / f"{i}.npy", allow_pickle=False)
+            categories = _load_strings(path / f"{i}.categories")
+            data[column['name']] = pd.Categorical.from_codes(codes, categories)
+        elif column['kind'] == 'string':
+            data[column['name']] = _load_strings(path / f"{i}")
+        else:
+            data[column['name']] = np.load(path / f"{i}.npy", allow_pickle=False)
+    return pd.DataFrame(data, index=pd.RangeIndex(meta['rows']))
+
+
+def _save_strings(stem, values):
+    """Object array of strings (NaN/None for missing) as unicode .npy plus a missing mask."""
+    missing = pd.isna(values)
+    np.save(stem.with_name(stem.name + ".str.npy"), np.where(missing, '', values).astype(str))
+    np.save(stem.with_name(stem.name + ".missing.npy"), missing)
+
+
+def _load_strings(stem):
+    """Inverse of _save_strings: object array with NaN where missing."""
+    values = np.load(stem.with_name(stem.name + ".str.npy"), allow_pickle=False).astype(object)
+    values[np.load(stem.with_name(stem.name + ".missing.npy"), allow_pickle=False)] = np.nan
+    return values
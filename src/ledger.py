@@ -0,0 +1,218 @@
+"""
+Plan-Change Ledger - Event-sourced record of subscription plan changes
+
+One entry per change: customer, date, from-plan and to-plan. Sign-ups are
+entries from NO_PLAN, churns are entries to NO_PLAN, and each entry's
+from-plan is the plan in force before it, so summing price deltas over a
+customer's entries reconstructs their MRR at any date (zero after churn).
+"""
+
+import pandas as pd
+import numpy as np
+
+from ids import as_codes
+from utils import PLAN_PRICING, period_ordinals
+
+
+# Plan code meaning "no subscription" (before sign-up / after churn)
+NO_PLAN = -1
+
+# Default plan catalogue; codes are indexes into this list
+LEDGER_PLANS = ['Free', 'Basic', 'Pro']
+
+
+class PlanChangeLedger:
+    """
+    Array-backed plan-change ledger, sorted by change date.
+
+    Attributes:
+        customer_id: Customer per entry (int32 codes of ids when given)
+        change_date: datetime64[ns] date of each change
+        from_plan: int8 code into plans (NO_PLAN before sign-up)
+        to_plan: int8 code into plans (NO_PLAN after churn)
+        plans: Plan names indexed by code
+        ids: Optional ids.IdDictionary decoding customer_id in to_frame()
+    """
+
+    def __init__(self, customer_id, change_date, from_plan, to_plan, plans=LEDGER_PLANS, ids=None):
+        order = np.argsort(np.asarray(change_date, dtype='datetime64[ns]'), kind='stable')
+        self.customer_id = np.asarray(customer_id)[order]
+        self.change_date = np.asarray(change_date, dtype='datetime64[ns]')[order]
+        self.from_plan = np.asarray(from_plan, dtype=np.int8)[order]
+        self.to_plan = np.asarray(to_plan, dtype=np.int8)[order]
+        self.plans = list(plans)
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.change_date)
+
+    @classmethod
+    def from_users(cls, users_df, ids=None):
+        """
+        Build the ledger from simulated user lifecycles.
+
+        Emits sign-up, conversion, upgrade, downgrade and churn entries. Frames
+        without upgrade_date/downgrade_date columns get no plan-change entries
+        beyond conversion. With ids (an ids.IdDictionary) entries hold int32
+        customer codes instead of ID strings.
+        """
+        plans = LEDGER_PLANS
+        code = {plan: i for i, plan in enumerate(plans)}
+        free, basic, pro = code['Free'], code['Basic'], code['Pro']
+
+        user_id = users_df['user_id'].to_numpy() if ids is None else as_codes(users_df['user_id'], ids)
+        initial = _plan_codes(users_df['initial_plan'], plans)
+        current = _plan_codes(users_df['current_plan'], plans)
+
+        def dates(column):
+            if column not in users_df:
+                return np.full(len(users_df), np.datetime64('NaT'), dtype='datetime64[ns]')
+            return pd.to_datetime(users_df[column]).to_numpy(dtype='datetime64[ns]')
+
+        sign_up = dates('sign_up_date')
+        conversion = dates('conversion_date')
+        upgrade = dates('upgrade_date')
+        downgrade = dates('downgrade_date')
+        churn = dates('churn_date')
+
+        upgraded = ~np.isnat(upgrade)
+        downgraded = ~np.isnat(downgrade)
+        converted = users_df['converted_to_paid'].to_numpy(dtype=bool) & ~np.isnat(conversion)
+        churned = ~np.isnat(churn)
+
+        # Plan at conversion: upgrades start from Basic, downgrades from Pro
+        conversion_plan = np.where(upgraded, basic, np.where(downgraded, pro, current))
+        # Both delays are drawn from the conversion date; a downgrade undoes the upgrade
+        downgrade = np.where(upgraded & downgraded, np.maximum(downgrade, upgrade), downgrade)
+
+        # Changes on or after the churn date never took effect
+        def before_churn(when):
+            return ~churned | (when < churn)
+
+        n = len(users_df)
+        rows = np.arange(n)
+        # (mask, date, to-plan) in the order same-day changes apply
+        entries = [
+            (np.ones(n, dtype=bool), sign_up, initial),
+            (converted & before_churn(conversion), conversion, conversion_plan),
+            (upgraded & before_churn(upgrade), upgrade, np.full(n, pro)),
+            (downgraded & before_churn(downgrade), downgrade, np.full(n, basic)),
+            (churned, churn, np.full(n, NO_PLAN)),
+        ]
+        row = np.concatenate([rows[mask] for mask, _, _ in entries])
+        when = np.concatenate([when[mask] for mask, when, _ in entries])
+        kind = np.concatenate([np.full(mask.sum(), i) for i, (mask, _, _) in enumerate(entries)])
+        to_plan = np.concatenate([dst[mask] for mask, _, dst in entries]).astype(np.int8)
+
+        # Chain each customer's entries in date order: from-plan = previous to-plan
+        order = np.lexsort((kind, when, row))
+        row, when, to_plan = row[order], when[order], to_plan[order]
+        from_plan = np.full(len(row), NO_PLAN, dtype=np.int8)
+        continues = np.zeros(len(row), dtype=bool)
+        continues[1:] = row[1:] == row[:-1]
+        from_plan[1:][continues[1:]] = to_plan[:-1][continues[1:]]
+        return cls(user_id[row], when, from_plan, to_plan, plans, ids)
+
+    @classmethod
+    def from_subscriptions(cls, subscriptions_df, ids=None):
+        """
+        Build the ledger from subscriptions.csv rows (customer codes with ids).
+
+        Each row is a plan segment [start_date, end_date). A segment starting
+        while the customer's previous segment is still open (or ends that day)
+        is a plan change from that segment's plan; otherwise it is a new
+        subscription. Segment ends not followed by such a change are churns.
+        """
+        customer_id = subscriptions_df['customer_id']
+        subs = subscriptions_df.assign(
+            customer_id=customer_id if ids is None else as_codes(customer_id, ids),
+            start_date=pd.to_datetime(subscriptions_df['start_date']),
+            end_date=pd.to_datetime(subscriptions_df['end_date'])
+        ).sort_values(['customer_id', 'start_date'], kind='stable')
+
+        names = subs['plan_name'].astype(str)
+        plans = LEDGER_PLANS + sorted(set(names.unique()) - set(LEDGER_PLANS))
+        plan = _plan_codes(names, plans)
+
+        customer = subs['customer_id'].to_numpy()
+        start = subs['start_date'].to_numpy(dtype='datetime64[ns]')
+        end = subs['end_date'].to_numpy(dtype='datetime64[ns]')
+
+        same_customer = np.zeros(len(subs), dtype=bool)
+        same_customer[1:] = customer[1:] == customer[:-1]
+        prev_end = np.roll(end, 1)
+        prev_plan = np.roll(plan, 1)
+        continues = same_customer & (np.isnat(prev_end) | (prev_end >= start))
+
+        # A segment's end is a churn unless the next segment continues from it
+        superseded = np.zeros(len(subs), dtype=bool)
+        superseded[:-1] = continues[1:]
+        churns = ~np.isnat(end) & ~superseded
+
+        return cls(
+            np.concatenate([customer, customer[churns]]),
+            np.concatenate([start, end[churns]]),
+            np.concatenate([np.where(continues, prev_plan, NO_PLAN), plan[churns]]),
+            np.concatenate([plan, np.full(churns.sum(), NO_PLAN)]),
+            plans,
+            ids
+        )
+
+    def to_frame(self):
+        """Return the ledger as a DataFrame with plan names (None = no plan)."""
+        # NO_PLAN (-1) indexes the trailing None
+        names = np.array(self.plans + [None], dtype=object)
+        return pd.DataFrame({
+            'customer_id': self.customer_id if self.ids is None else self.ids.decode(self.customer_id),
+            'change_date': self.change_date,
+            'from_plan': names[self.from_plan],
+            'to_plan': names[self.to_plan]
+        })
+
+    def prices(self, pricing=PLAN_PRICING):
+        """Monthly price before and after each change (0 for NO_PLAN)."""
+        # NO_PLAN (-1) indexes the trailing 0
+        price = np.array([pricing.get(plan, 0) for plan in self.plans] + [0])
+        return price[self.from_plan], price[self.to_plan]
+
+    def monthly_mrr_components(self, first_month, num_months, pricing=PLAN_PRICING):
+        """
+        New, expansion, contraction and churned MRR per month in one grouped pass.
+
+        Args:
+            first_month: Monthly period ordinal of the first month
+            num_months: Number of months to report
+            pricing: Plan name -> monthly price
+
+        Returns:
+            Dict of arrays (length num_months): new, expansion, contraction, churned
+        """
+        from_price, to_price = self.prices(pricing)
+        month = period_ordinals(self.change_date) - first_month
+        in_range = (month >= 0) & (month < num_months)
+
+        # Classify each change by the price it moves from/to
+        was_paying = from_price > 0
+        is_paying = to_price > 0
+        delta = to_price - from_price
+        kinds = {
+            'new': (~was_paying & is_paying, to_price),
+            'expansion': (was_paying & is_paying & (delta > 0), delta),
+            'contraction': (was_paying & is_paying & (delta < 0), -delta),
+            'churned': (was_paying & ~is_paying, from_price),
+        }
+
+        components = {}
+        for kind, (mask, amount) in kinds.items():
+            mask = mask & in_range
+            totals = np.bincount(month[mask], weights=amount[mask], minlength=num_months)
+            if np.issubdtype(amount.dtype, np.integer):
+                totals = np.rint(totals).astype(np.int64)
+            components[kind] = totals
+        return components
+
+
+def _plan_codes(plan_names, plans):
+    """Map plan names to int8 codes into plans (unknown / missing -> NO_PLAN)."""
+    codes = pd.Categorical(plan_names, categories=plans).codes
+    return codes.astype(np.int8)
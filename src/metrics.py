@@ -3,7 +3,14 @@
 import pandas as pd
 import numpy as np
 
-def compute_rfm(users_df, transactions_df, reference_date, events_df=None):
+from dataset import SaaSDataset
+from ids import NO_TIME, AsOfIndex, as_codes, group_count, group_sum, group_max_dates
+from sketches import DEFAULT_K, KLLSketch
+from tracing import traced
+
+@traced
+def compute_rfm(users_df, transactions_df=None, reference_date=None, events_df=None, event_aggregates=None, ids=None,
+                scoring='exact', sketches=None):
     """
     Compute RFM scores for customers.
     
@@ -17,11 +24,44 @@ def compute_rfm(users_df, transactions_df, reference_date, events_df=None):
     - Frequency: Quintiles (higher is better)
     - Monetary: Quintiles (higher is better)
     
+    event_aggregates (from ingest.stream_event_aggregates with as_of equal to
+    reference_date) can replace events_df for the last-event lookup.
+    
+    Pass ids (an ids.IdDictionary) to aggregate on dense integer customer
+    codes; customer_id columns may already hold codes from ingest.load_table.
+    The output is indexed by the decoded external IDs either way.
+    
+    users_df may be a SaaSDataset: transactions_df and events_df then default
+    to its tables and their dates are parsed once per dataset.
+    
+    scoring='sketch' scores against approximate quantiles instead (see
+    score_rfm), from sketches merged across shards if given; scoring=None
+    returns the unscored recency/frequency/monetary columns, e.g. for a
+    worker that only builds its shard's sketches.
+    
     Ref: docs/LOGIC.md
     """
+    if reference_date is None:
+        raise ValueError("reference_date is required")
+    data = users_df if isinstance(users_df, SaaSDataset) else None
+    if data is not None:
+        transactions_df = data.transactions if transactions_df is None else transactions_df
+        if events_df is None and event_aggregates is None:
+            events_df = data.events
+    
     # Filter transactions before reference date
     ref_date = pd.to_datetime(reference_date)
-    txns = transactions_df[pd.to_datetime(transactions_df['transaction_date']) <= ref_date].copy()
+    txns = transactions_df[_dates(data, 'transactions', transactions_df, 'transaction_date') <= ref_date].copy()
+    
+    evts = None
+    if events_df is not None:
+        evts = events_df[_dates(data, 'events', events_df, 'event_timestamp') <= ref_date]
+    elif event_aggregates is not None:
+        if event_aggregates.attrs.get('as_of') != ref_date:
+            raise ValueError("event_aggregates must be computed with as_of equal to reference_date")
+    
+    if ids is not None:
+        return _compute_rfm_coded(txns, evts, event_aggregates, ref_date, ids, scoring, sketches)
     
     # Calculate Last Interaction Date (Max of Transaction Date and Event Timestamp)
     # 1. Last Transaction
@@ -30,16 +70,12 @@ def compute_rfm(users_df, transactions_df, reference_date, events_df=None):
     
     # 2. Last Event (if provided)
     last_evt = pd.Series(dtype='datetime64[ns]')
-    if events_df is not None:
-        evts = events_df[pd.to_datetime(events_df['event_timestamp']) <= ref_date]
+    if evts is not None:
         if not evts.empty:
             last_evt = evts.groupby('customer_id')['event_timestamp'].max()
             last_evt = pd.to_datetime(last_evt)
-    
-    # Combine to find absolute max date per customer
-    # We align them by customer_id
-    interactions = pd.concat([last_txn, last_evt], axis=1, keys=['txn', 'evt'])
-    interactions['last_interaction'] = interactions[['txn', 'evt']].max(axis=1)
+    elif event_aggregates is not None:
+        last_evt = event_aggregates['last_event'].dropna()
     
     # Aggregation for F and M
     rfm_metrics = txns.groupby('customer_id').agg({
@@ -50,6 +86,171 @@ def compute_rfm(users_df, transactions_df, reference_date, events_df=None):
         'amount': 'monetary_180d'
     })
     
+    return assemble_rfm(rfm_metrics, last_txn, last_evt, ref_date, scoring, sketches)
+
+def _dates(data, table, df, column):
+    """Parsed dates of df[column], from the dataset cache when df is its table."""
+    if data is not None and getattr(data, table) is df:
+        return data.datetimes(column, table)
+    return pd.to_datetime(df[column])
+
+def _compute_rfm_coded(txns, evts, event_aggregates, ref_date, ids, scoring='exact', sketches=None):
+    """
+    compute_rfm on dense customer codes: bincount for F/M, one sort for the
+    last-date maxima. IDs are decoded only for customers with activity.
+    """
+    txn_codes = as_codes(txns['customer_id'], ids)
+    evt_codes = as_codes(evts['customer_id'], ids) if evts is not None else None
+    size = len(ids)
+    
+    frequency = group_count(txn_codes, size)
+    has_txn = frequency > 0
+    txn_ids = ids.decode(np.flatnonzero(has_txn))
+    rfm_metrics = pd.DataFrame({
+        'frequency_180d': frequency[has_txn],
+        'monetary_180d': group_sum(txn_codes, txns['amount'], size)[has_txn]
+    }, index=pd.Index(txn_ids, name='customer_id'))
+    last_txn = pd.Series(
+        group_max_dates(txn_codes, pd.to_datetime(txns['transaction_date']), size)[has_txn],
+        index=txn_ids
+    )
+    
+    last_evt = pd.Series(dtype='datetime64[ns]')
+    if evt_codes is not None:
+        last = group_max_dates(evt_codes, pd.to_datetime(evts['event_timestamp']), size)
+        has_evt = ~np.isnat(last)
+        last_evt = pd.Series(last[has_evt], index=ids.decode(np.flatnonzero(has_evt)))
+    elif event_aggregates is not None:
+        last_evt = event_aggregates['last_event'].dropna()
+        if pd.api.types.is_integer_dtype(last_evt.index):
+            last_evt.index = ids.decode(last_evt.index)
+    
+    return assemble_rfm(rfm_metrics, last_txn, last_evt, ref_date, scoring, sketches)
+
+@traced
+def compute_rfm_history(users_df, transactions_df=None, reference_dates=None, windows=(30, 90, 180, 365),
+                        events_df=None, scoring=None, ids=None):
+    """
+    RFM for every customer at many reference dates and lookback windows in one pass.
+    
+    Transactions and events are sorted once by (customer, time); a prefix
+    sum of amounts then gives each (date, window) pair's frequency and
+    monetary value from two searchsorted lookups per customer, and the last
+    transaction / event on or before each date from one more. A 52-week
+    history costs about one sort plus 52 x (2 x windows + 2) binary
+    searches, not 52 compute_rfm calls.
+    
+    Unlike compute_rfm, whose frequency_180d / monetary_180d cover all
+    history up to the reference date, frequency_{w}d and monetary_{w}d
+    count transactions in (date - w days, date]. Recency is the same as
+    compute_rfm's, and a window longer than the history reproduces its
+    frequency and monetary values (monetary up to float summation order).
+    
+    Args:
+        users_df: Customers DataFrame (unused) or a SaaSDataset supplying
+            the other tables and cached parsed dates
+        transactions_df: Transactions with customer_id, transaction_date, amount
+        reference_dates: Iterable of dates
+        windows: Lookback windows in days
+        events_df: Optional events with customer_id, event_timestamp (recency)
+        scoring: None for metrics only, or 'exact' / 'sketch' to add score_rfm
+            quintiles per date: r_q, and f_q_{w}d, m_q_{w}d, rfm_code_{w}d
+            per window
+        ids: Optional ids.IdDictionary; customers are keyed by its codes
+            (customer_id may already be coded) and rows come in code order
+    
+    Returns:
+        DataFrame with one row per (reference_date, customer_id) that has
+        any interaction on or before the date: reference_date, customer_id,
+        recency_days, then frequency_{w}d and monetary_{w}d per window
+    """
+    if reference_dates is None:
+        raise ValueError("reference_dates is required")
+    data = users_df if isinstance(users_df, SaaSDataset) else None
+    if data is not None:
+        transactions_df = data.transactions if transactions_df is None else transactions_df
+        events_df = data.events if events_df is None else events_df
+    reference_dates = pd.DatetimeIndex(pd.to_datetime(list(reference_dates)))
+    
+    txn_times = _dates(data, 'transactions', transactions_df, 'transaction_date')
+    customer_ids = [transactions_df['customer_id']]
+    if events_df is not None:
+        evt_times = _dates(data, 'events', events_df, 'event_timestamp')
+        customer_ids.append(events_df['customer_id'])
+    if ids is None:
+        # Sorted codes put rows in compute_rfm's customer order, so exact ranks break ties alike
+        codes, uniques = pd.factorize(pd.concat(customer_ids, ignore_index=True), sort=True)
+    else:
+        codes = np.concatenate([as_codes(column, ids) for column in customer_ids])
+        uniques = ids.values
+    size = len(uniques)
+    
+    txns = AsOfIndex(codes[:len(transactions_df)], txn_times,
+                     transactions_df['amount'].fillna(0).to_numpy(dtype=float))
+    evts = AsOfIndex(codes[len(transactions_df):], evt_times) if events_df is not None else None
+    all_codes = np.arange(size)
+    
+    frames = []
+    for ref_date in reference_dates:
+        ref_ns = ref_date.value
+        txn_end = txns.position(all_codes, ref_ns)
+        last = txns.last_time(all_codes, txn_end)
+        if evts is not None:
+            last = np.maximum(last, evts.last_time(all_codes, evts.position(all_codes, ref_ns)))
+        active = last > NO_TIME
+        
+        columns = {
+            'reference_date': np.full(active.sum(), ref_date.to_datetime64()),
+            'customer_id': uniques[active],
+            'recency_days': (ref_ns - last[active]) // pd.Timedelta(days=1).value,
+        }
+        for window in windows:
+            start = txns.position(all_codes[active], ref_ns - pd.Timedelta(days=window).value)
+            columns[f'frequency_{window}d'] = txn_end[active] - start
+            columns[f'monetary_{window}d'] = txns.cumulative[txn_end[active]] - txns.cumulative[start]
+        frame = pd.DataFrame(columns)
+        if scoring is not None:
+            frame = _score_rfm_windows(frame, windows, scoring)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+def _score_rfm_windows(frame, windows, scoring):
+    """score_rfm quintiles of one reference date's history rows, per window."""
+    for i, window in enumerate(windows):
+        rfm = frame[['recency_days', f'frequency_{window}d', f'monetary_{window}d']].set_axis(
+            ['recency_days', 'frequency_180d', 'monetary_180d'], axis=1).set_index(frame['customer_id'])
+        scored = score_rfm(rfm, scoring)
+        if i == 0:
+            frame['r_q'] = scored['r_q'].to_numpy()
+        frame[f'f_q_{window}d'] = scored['f_q'].to_numpy()
+        frame[f'm_q_{window}d'] = scored['m_q'].to_numpy()
+        frame[f'rfm_code_{window}d'] = scored['rfm_code'].to_numpy()
+    return frame
+
+def assemble_rfm(rfm_metrics, last_txn, last_evt, reference_date, scoring='exact', sketches=None):
+    """
+    Score RFM from per-customer aggregates.
+    
+    Shared by compute_rfm and state.CustomerStateStore so a full recompute
+    and an incremental refresh score identically.
+    
+    Args:
+        rfm_metrics: DataFrame indexed by customer_id with 'frequency_180d' and 'monetary_180d'
+        last_txn: Series of last transaction date per customer
+        last_evt: Series of last event timestamp per customer
+        reference_date: Date recency is measured from
+        scoring, sketches: See score_rfm (scoring=None skips scoring)
+    
+    Returns:
+        DataFrame indexed by customer_id (see compute_rfm)
+    """
+    ref_date = pd.to_datetime(reference_date)
+    
+    # Combine to find absolute max date per customer
+    # We align them by customer_id
+    interactions = pd.concat([last_txn, last_evt], axis=1, keys=['txn', 'evt'])
+    interactions['last_interaction'] = interactions[['txn', 'evt']].max(axis=1)
+    
     # Merge recency source
     rfm = rfm_metrics.merge(interactions['last_interaction'], left_index=True, right_index=True, how='outer')
     
@@ -70,17 +271,95 @@ def compute_rfm(users_df, transactions_df, reference_date, events_df=None):
     # Dropping them or assigning max score.
     rfm = rfm.dropna(subset=['recency_days'])
     
-    # Scoring
-    # Use qcut with duplicates='drop'
-    # Recency: Lower days = Higher Score (5). Labels [5, 4, 3, 2, 1] means 1st quintile (lowest days) -> 5.
-    rfm['r_q'] = pd.qcut(rfm['recency_days'], 5, labels=[5, 4, 3, 2, 1], duplicates='drop').astype(int)
-    rfm['f_q'] = pd.qcut(rfm['frequency_180d'].rank(method='first'), 5, labels=[1, 2, 3, 4, 5]).astype(int)
-    rfm['m_q'] = pd.qcut(rfm['monetary_180d'].rank(method='first'), 5, labels=[1, 2, 3, 4, 5]).astype(int)
+    if scoring is None:
+        return rfm
+    return score_rfm(rfm, scoring, sketches)
+
+# Columns scored by score_rfm and sketched by build_rfm_sketches
+RFM_COLUMNS = ('recency_days', 'frequency_180d', 'monetary_180d')
+
+def score_rfm(rfm, scoring='exact', sketches=None):
+    """
+    Add r_q/f_q/m_q quintile scores and rfm_code to unscored RFM metrics.
+    
+    scoring='exact' is pd.qcut over the whole frame: recency on its values,
+    frequency and monetary on their first-occurrence ranks.
+    
+    scoring='sketch' reads the quintiles from KLL sketches (build_rfm_sketches,
+    merged over every shard when the frame is one shard), so shards score
+    independently. Recency is cut at the sketch's 20/40/60/80% quantiles.
+    Frequency and monetary use the sketch's normalized rank; ties are spread
+    over their rank range by a hash of the customer ID, the order-free
+    analogue of rank(method='first'). A score can then differ from exact
+    scoring only for customers within the sketch's rank error
+    (sketches.rank_error, about 1.3% at k=200) of a quintile boundary, and
+    by one quintile at most; tied frequencies or amounts straddling a
+    boundary are split by hash rather than by row order.
+    
+    Args:
+        rfm: DataFrame indexed by customer_id with RFM_COLUMNS
+        scoring: 'exact' or 'sketch'
+        sketches: Dict of column -> KLLSketch (default: sketched from rfm)
+    
+    Returns:
+        Copy of rfm with r_q, f_q, m_q and rfm_code
+    """
+    rfm = rfm.copy()
+    if scoring == 'exact':
+        # Use qcut with duplicates='drop'
+        # Recency: Lower days = Higher Score (5). Labels [5, 4, 3, 2, 1] means 1st quintile (lowest days) -> 5.
+        rfm['r_q'] = pd.qcut(rfm['recency_days'], 5, labels=[5, 4, 3, 2, 1], duplicates='drop').astype(int)
+        rfm['f_q'] = pd.qcut(rfm['frequency_180d'].rank(method='first'), 5, labels=[1, 2, 3, 4, 5]).astype(int)
+        rfm['m_q'] = pd.qcut(rfm['monetary_180d'].rank(method='first'), 5, labels=[1, 2, 3, 4, 5]).astype(int)
+    elif scoring == 'sketch':
+        if sketches is None:
+            sketches = build_rfm_sketches(rfm)
+        edges = np.unique(sketches['recency_days'].quantile([0.2, 0.4, 0.6, 0.8]))
+        # Right-closed bins like qcut; the first bin scores 5
+        rfm['r_q'] = 5 - np.searchsorted(edges, rfm['recency_days'].to_numpy(dtype=float), side='left')
+        jitter = pd.util.hash_pandas_object(rfm.index.to_series(), index=False).to_numpy() / 2.0 ** 64
+        rfm['f_q'] = _sketch_quintile(sketches['frequency_180d'], rfm['frequency_180d'], jitter)
+        rfm['m_q'] = _sketch_quintile(sketches['monetary_180d'], rfm['monetary_180d'], jitter)
+    else:
+        raise ValueError(f"Unknown scoring {scoring!r}; expected 'exact' or 'sketch'")
     
     rfm['rfm_code'] = rfm['r_q'].astype(str) + "-" + rfm['f_q'].astype(str) + "-" + rfm['m_q'].astype(str)
     
     return rfm
 
+def build_rfm_sketches(rfm, k=DEFAULT_K, seed=None):
+    """
+    KLL sketches of one shard's unscored RFM columns (compute_rfm with scoring=None).
+    
+    Merge the sketches of all shards with merge_rfm_sketches and pass the
+    result to score_rfm / compute_rfm(scoring='sketch') on every shard.
+    
+    Returns:
+        Dict of column -> KLLSketch
+    """
+    return {column: KLLSketch.from_values(rfm[column], k, seed) for column in RFM_COLUMNS}
+
+def merge_rfm_sketches(shard_sketches):
+    """
+    Merge build_rfm_sketches outputs of disjoint customer shards.
+    
+    Returns:
+        Dict of column -> KLLSketch over all shards
+    """
+    shard_sketches = list(shard_sketches)
+    merged = {column: KLLSketch(shard_sketches[0][column].k) for column in RFM_COLUMNS}
+    for sketches in shard_sketches:
+        for column in RFM_COLUMNS:
+            merged[column].merge(sketches[column])
+    return merged
+
+def _sketch_quintile(sketch, values, jitter):
+    """1-5 quintile of each value's sketched rank, ties spread by jitter in [0, 1)."""
+    values = values.to_numpy(dtype=float)
+    below = sketch.cdf(values, inclusive=False)
+    rank = below + jitter * (sketch.cdf(values) - below)
+    return np.clip(np.floor(rank * 5).astype(int) + 1, 1, 5)
+
 def compute_arpu(revenue_df):
     """
     Compute ARPU from revenue metrics.
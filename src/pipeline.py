@@ -0,0 +1,157 @@
+"""
+Pipeline - Dependency graph of named stages with parallel execution
+
+Each stage is a function of its dependencies' outputs. A run executes the
+stages a target needs at most once each, submitting every stage to a
+thread or process pool as soon as its dependencies are done, so
+independent stages (funnel, retention, revenue, unit economics) overlap.
+While a tracing.Tracer is active every stage is recorded as a 'stage' span,
+including stages run in worker processes.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import tracing
+
+
+EXECUTORS = ('thread', 'process', 'serial')
+
+
+class Pipeline:
+    """
+    Named stages and their dependencies.
+
+    Attributes:
+        stages: Dict of stage name -> (function, tuple of dependency names),
+            in registration order
+        timings: Seconds spent in each stage during the last run
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.timings = {}
+
+    def add(self, name, func, deps=()):
+        """
+        Register a stage; func is called with the outputs of deps, in order.
+
+        With executor='process' func and its inputs/outputs must be picklable
+        (module-level functions or functools.partial of them).
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        self.stages[name] = (func, tuple(deps))
+        return self
+
+    def stage(self, name, deps=()):
+        """Decorator form of add()."""
+        def register(func):
+            self.add(name, func, deps)
+            return func
+        return register
+
+    def plan(self, targets=None):
+        """
+        Stages needed for targets (default: all), dependencies first.
+
+        Raises:
+            ValueError: On unknown stages or dependency cycles
+        """
+        targets = list(self.stages) if targets is None else list(targets)
+        order, state = [], {}
+
+        def visit(name, path):
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'" + (f" (needed by '{path[-1]}')" if path else ""))
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dep in self.stages[name][1]:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for target in targets:
+            visit(target, [])
+        return order
+
+    def run(self, targets=None, executor='thread', max_workers=None, verbose=False):
+        """
+        Execute the stages targets need, each at most once.
+
+        Args:
+            targets: Stage names to produce (default: every stage)
+            executor: 'thread', 'process' or 'serial' (in order, no pool)
+            max_workers: Pool size (default: the executor's own default)
+            verbose: Print each stage as it finishes
+
+        Returns:
+            Dict of stage name -> output for every stage that ran
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor {executor!r}; expected one of {EXECUTORS}")
+        order = self.plan(targets)
+        self.timings = {}
+        results = {}
+
+        def report(name):
+            if verbose:
+                print(f"      [{len(results)}/{len(order)}] {name} ({self.timings[name]:.2f}s)")
+
+        tracer = tracing.active_tracer()
+        if executor == 'serial':
+            for name in order:
+                results[name], self.timings[name], _ = _timed_call(name, *self._call_args(name, results))
+                report(name)
+            return results
+
+        if executor == 'process' and tracer is not None:
+            # Workers trace into their own Tracer on the same timeline and send the spans back
+            call, extra = _traced_worker_call, (tracer.memory, tracer.start_ns)
+        else:
+            call, extra = _timed_call, ()
+
+        pool_cls = ThreadPoolExecutor if executor == 'thread' else ProcessPoolExecutor
+        pending = list(order)
+        running = {}
+        with pool_cls(max_workers=max_workers) as pool:
+            while pending or running:
+                # Submit every stage whose dependencies are all finished
+                for name in [n for n in pending if all(dep in results for dep in self.stages[n][1])]:
+                    pending.remove(name)
+                    running[pool.submit(call, name, *self._call_args(name, results), *extra)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name], self.timings[name], spans = future.result()
+                    if spans:
+                        tracer.add_spans(spans)
+                    report(name)
+        return results
+
+    def _call_args(self, name, results):
+        """(func, dependency outputs) for stage name."""
+        func, deps = self.stages[name]
+        return func, tuple(results[dep] for dep in deps)
+
+
+def _timed_call(name, func, args):
+    """
+    Run func(*args) as stage name; returns (output, wall seconds, None).
+
+    Module-level so process pools can pickle it.
+    """
+    start = time.perf_counter()
+    tracer = tracing.active_tracer()
+    output = func(*args) if tracer is None else tracer.call(name, 'stage', func, args, {})
+    return output, time.perf_counter() - start, None
+
+
+def _traced_worker_call(name, func, args, memory, start_ns):
+    """_timed_call in a worker process under a fresh Tracer; returns its spans as the third item."""
+    with tracing.Tracer(memory, start_ns) as tracer:
+        output, seconds, _ = _timed_call(name, func, args)
+    return output, seconds, tracer.spans
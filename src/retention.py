@@ -6,135 +6,149 @@ import pandas as pd
 import numpy as np
 from datetime import timedelta
 
+from dataset import as_dataset
+from utils import period_floor, period_starts, sweep_active_counts
+from tracing import traced
 
+
+@traced
 def calculate_retention_metrics(users_df):
     """
     Calculate retention metrics for each user.
     
     Args:
-        users_df: DataFrame with user lifecycle data
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
         
     Returns:
         DataFrame with retention metrics per user
     """
-    retention_data = []
-    
-    for _, user in users_df.iterrows():
-        sign_up = pd.to_datetime(user['sign_up_date'])
-        churn = pd.to_datetime(user['churn_date']) if pd.notna(user['churn_date']) else None
-        
-        # Week 1 retention (7 days)
-        week_1_date = sign_up + timedelta(days=7)
-        retention_week_1 = not user['churned'] or (churn and churn > week_1_date)
-        
-        # Week 4 retention (28 days)
-        week_4_date = sign_up + timedelta(days=28)
-        retention_week_4 = not user['churned'] or (churn and churn > week_4_date)
-        
-        # Month 3 retention (90 days)
-        month_3_date = sign_up + timedelta(days=90)
-        retention_month_3 = not user['churned'] or (churn and churn > month_3_date)
-        
-        retention_data.append({
-            'user_id': user['user_id'],
-            'sign_up_date': user['sign_up_date'],
-            'current_plan': user['current_plan'],
-            'retention_week_1': retention_week_1,
-            'retention_week_4': retention_week_4,
-            'retention_month_3': retention_month_3,
-            'lifetime_days': user['lifetime_days'],
-            'churned': user['churned']
-        })
-    
-    return pd.DataFrame(retention_data)
+    data = as_dataset(users_df)
+    users_df = data.users
+    churned = users_df['churned'].to_numpy(dtype=bool)
+    
+    # Days from sign-up to churn (NaN when never churned)
+    days_to_churn = (data.churn_date - data.sign_up_date) / np.timedelta64(1, 'D')
+    
+    def retained_past(days):
+        # Retained if not churned, or churned strictly after sign-up + days
+        return ~churned | (days_to_churn > days)
+    
+    return pd.DataFrame({
+        'user_id': users_df['user_id'].to_numpy(),
+        'sign_up_date': users_df['sign_up_date'].to_numpy(),
+        'current_plan': users_df['current_plan'].to_numpy(),
+        'retention_week_1': retained_past(7),
+        'retention_week_4': retained_past(28),
+        'retention_month_3': retained_past(90),
+        'lifetime_days': users_df['lifetime_days'].to_numpy(),
+        'churned': users_df['churned'].to_numpy()
+    })
 
 
+@traced
 def calculate_churn_rate_monthly(users_df):
     """
     Calculate monthly churn rates.
     
+    Active users at the start of each month come from a sweep line over
+    sign-up and churn months (see utils.sweep_active_counts).
+    
     Args:
-        users_df: DataFrame with user lifecycle data
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
         
     Returns:
         DataFrame with monthly churn rates
     """
-    # Convert dates
-    users_df['sign_up_month'] = pd.to_datetime(users_df['sign_up_date']).dt.to_period('M')
-    users_df['churn_month'] = pd.to_datetime(users_df['churn_date']).dt.to_period('M')
-    
-    # Get all months
-    all_months = pd.period_range(
-        start=users_df['sign_up_month'].min(),
-        end=users_df['sign_up_month'].max() + 12,
-        freq='M'
-    )
-    
-    monthly_churn = []
-    
-    for month in all_months:
-        # Active users at start of month
-        active_start = len(users_df[
-            (users_df['sign_up_month'] <= month) &
-            ((users_df['churn_month'].isna()) | (users_df['churn_month'] > month))
-        ])
-        
-        # Churned during month
-        churned_in_month = len(users_df[users_df['churn_month'] == month])
-        
-        # Churn rate
-        churn_rate = churned_in_month / active_start if active_start > 0 else 0
-        
-        monthly_churn.append({
-            'month': month.to_timestamp(),
-            'active_users_start': active_start,
-            'churned_users': churned_in_month,
-            'churn_rate_monthly': churn_rate
-        })
-    
-    return pd.DataFrame(monthly_churn)
+    data = as_dataset(users_df)
+    
+    # Horizon: first sign-up month through 12 months after the last sign-up
+    first_month, num_months = data.month_horizon
+    start, end = data.active_months
+    
+    # Active users at start of month
+    active_start = sweep_active_counts(start, end, num_months)
+    
+    # Churned during month
+    in_horizon = (end >= 0) & (end < num_months)
+    churned_in_month = np.bincount(end[in_horizon], minlength=num_months)
+    
+    churn_rate = np.divide(churned_in_month, active_start,
+                           out=np.zeros(num_months), where=active_start > 0)
+    
+    return pd.DataFrame({
+        'month': period_starts(first_month, num_months),
+        'active_users_start': active_start,
+        'churned_users': churned_in_month,
+        'churn_rate_monthly': churn_rate
+    })
+
+
+# Cohort granularity -> label used in output column names
+COHORT_UNITS = {'M': 'month', 'W': 'week', 'D': 'day'}
 
 
-def generate_cohort_retention_matrix(users_df):
+@traced
+def generate_cohort_retention_matrix(users_df, granularity='M', horizon=12):
     """
     Generate cohort retention matrix (heatmap data).
     
+    A user counts as retained at offset o if they signed up on or before the
+    start of period cohort + o and had not churned by then. Each user's
+    cohort and last surviving offset are computed once; the cohort x offset
+    matrix is a single 2D histogram of last offsets turned into survivor
+    counts with a reverse cumulative sum.
+    
     Args:
-        users_df: DataFrame with user lifecycle data
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
+        granularity: Cohort period - 'M' (monthly), 'W' (weekly) or 'D' (daily)
+        horizon: Last offset to report (offsets 0..horizon)
         
     Returns:
         DataFrame with cohort retention rates
     """
-    users_df['cohort_month'] = pd.to_datetime(users_df['sign_up_date']).dt.to_period('M')
-    
-    cohorts = []
-    
-    for cohort in sorted(users_df['cohort_month'].unique()):
-        cohort_users = users_df[users_df['cohort_month'] == cohort]
-        cohort_size = len(cohort_users)
-        
-        cohort_data = {
-            'cohort_month': cohort.to_timestamp(),
-            'cohort_size': cohort_size
-        }
-        
-        # Calculate retention for months 0-12
-        for month_offset in range(13):
-            target_date = cohort.to_timestamp() + pd.DateOffset(months=month_offset)
-            
-            # Count users still active at target date
-            retained = len(cohort_users[
-                (pd.to_datetime(cohort_users['sign_up_date']) <= target_date) &
-                ((cohort_users['churn_date'].isna()) | 
-                 (pd.to_datetime(cohort_users['churn_date']) > target_date))
-            ])
-            
-            retention_rate = retained / cohort_size if cohort_size > 0 else 0
-            cohort_data[f'month_{month_offset}'] = retention_rate
-        
-        cohorts.append(cohort_data)
-    
-    return pd.DataFrame(cohorts)
+    if granularity not in COHORT_UNITS:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+    unit = COHORT_UNITS[granularity]
+    num_offsets = horizon + 1
+    
+    data = as_dataset(users_df)
+    sign_up = data.sign_up_date
+    churn = data.churn_date
+    
+    cohort = data.periods('sign_up_date', granularity)
+    churn_period = data.periods('churn_date', granularity)
+    cohorts, cohort_idx = np.unique(cohort, return_inverse=True)
+    cohort_idx = cohort_idx.ravel()
+    
+    # Offset 0 targets the cohort start itself: only users signing up exactly then count
+    late_start = sign_up > period_floor(sign_up, granularity)
+    
+    # Last offset whose period start precedes churn (churn exactly on a start drops that offset)
+    churned = ~np.isnat(churn)
+    last_offset = np.full(len(cohort), horizon, dtype=np.int64)
+    last_offset[churned] = (churn_period[churned] - cohort[churned]
+                            - (churn[churned] == period_floor(churn[churned], granularity)))
+    last_offset = np.clip(last_offset, -1, horizon)
+    
+    # Histogram of last offsets per cohort (column 0 holds "never retained"),
+    # reverse cumsum -> users surviving at least to each offset
+    hist = np.bincount(cohort_idx * (num_offsets + 1) + last_offset + 1,
+                       minlength=len(cohorts) * (num_offsets + 1)).reshape(len(cohorts), num_offsets + 1)
+    retained = np.cumsum(hist[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    retained[:, 0] -= np.bincount(cohort_idx[late_start & (last_offset >= 0)], minlength=len(cohorts))
+    
+    cohort_size = np.bincount(cohort_idx, minlength=len(cohorts))
+    rates = retained / cohort_size[:, None]
+    
+    matrix = pd.DataFrame(rates, columns=[f'{unit}_{offset}' for offset in range(num_offsets)])
+    matrix.insert(0, f'cohort_{unit}', _cohort_starts(cohorts, granularity))
+    matrix.insert(1, 'cohort_size', cohort_size)
+    return matrix
+
+
+def _cohort_starts(ordinals, granularity):
+    """Start timestamps for cohort period ordinals."""
+    return pd.PeriodIndex(pd.arrays.PeriodArray(ordinals, dtype=pd.PeriodDtype(granularity))).to_timestamp()
 
 
 if __name__ == "__main__":
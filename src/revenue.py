@@ -6,6 +6,10 @@ import pandas as pd
 import numpy as np
 from datetime import timedelta
 
+from dataset import as_dataset
+from utils import period_starts, sweep_active_counts
+from tracing import traced
+
 
 # Plan pricing
 PLAN_PRICING = {
@@ -15,157 +19,126 @@ PLAN_PRICING = {
 }
 
 
+@traced
 def calculate_revenue_metrics(users_df):
     """
     Calculate comprehensive revenue metrics.
     
+    Active and paying users per month are derived with a sweep line: sign-up
+    and churn months are binned once and accumulated with a cumulative sum,
+    so cost grows with users + months rather than users x months.
+    
     Args:
-        users_df: DataFrame with user lifecycle data
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
         
     Returns:
         DataFrame with monthly revenue metrics
     """
-    users_df['sign_up_month'] = pd.to_datetime(users_df['sign_up_date']).dt.to_period('M')
-    users_df['churn_month'] = pd.to_datetime(users_df['churn_date']).dt.to_period('M')
-    
-    # Get all months
-    all_months = pd.period_range(
-        start=users_df['sign_up_month'].min(),
-        end=users_df['sign_up_month'].max() + 12,
-        freq='M'
-    )
-    
-    monthly_revenue = []
-    
-    for month in all_months:
-        # Active paying users
-        active_paying = users_df[
-            (users_df['sign_up_month'] <= month) &
-            ((users_df['churn_month'].isna()) | (users_df['churn_month'] > month)) &
-            (users_df['current_plan'] != 'Free')
-        ]
-        
-        # Calculate MRR
-        mrr = sum(PLAN_PRICING.get(plan, 0) for plan in active_paying['current_plan'])
-        arr = mrr * 12
-        
-        # ARPU (Average Revenue Per User - all users)
-        total_active = len(users_df[
-            (users_df['sign_up_month'] <= month) &
-            ((users_df['churn_month'].isna()) | (users_df['churn_month'] > month))
-        ])
-        arpu = mrr / total_active if total_active > 0 else 0
-        
-        # ARPPU (Average Revenue Per Paying User)
-        paying_users = len(active_paying)
-        arppu = mrr / paying_users if paying_users > 0 else 0
-        
-        monthly_revenue.append({
-            'month': month.to_timestamp(),
-            'mrr': mrr,
-            'arr': arr,
-            'active_users': total_active,
-            'paying_users': paying_users,
-            'arpu': arpu,
-            'arppu': arppu
-        })
-    
-    return pd.DataFrame(monthly_revenue)
+    data = as_dataset(users_df)
+    
+    # Horizon: first sign-up month through 12 months after the last sign-up
+    first_month, num_months = data.month_horizon
+    start, end = data.active_months
+    
+    paying = data.is_paying
+    price = data.plan_price
+    
+    total_active = sweep_active_counts(start, end, num_months)
+    paying_users = sweep_active_counts(start[paying], end[paying], num_months)
+    mrr = sweep_active_counts(start[paying], end[paying], num_months, weights=price[paying])
+    
+    # ARPU (all active users) and ARPPU (paying users only)
+    arpu = np.divide(mrr, total_active, out=np.zeros(num_months), where=total_active > 0)
+    arppu = np.divide(mrr, paying_users, out=np.zeros(num_months), where=paying_users > 0)
+    
+    return pd.DataFrame({
+        'month': period_starts(first_month, num_months),
+        'mrr': mrr,
+        'arr': mrr * 12,
+        'active_users': total_active,
+        'paying_users': paying_users,
+        'arpu': arpu,
+        'arppu': arppu
+    })
 
 
-def calculate_mrr_bridge(users_df):
+@traced
+def calculate_mrr_bridge(users_df, ledger=None):
     """
     Calculate MRR bridge (New, Expansion, Contraction, Churned MRR).
     
+    Components come from the plan-change ledger in one grouped pass: every
+    change is priced from/to plan and binned by month.
+    
     Args:
-        users_df: DataFrame with user lifecycle data
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
+        ledger: Optional PlanChangeLedger; defaults to the dataset's ledger
         
     Returns:
         DataFrame with MRR bridge components
     """
-    users_df['sign_up_month'] = pd.to_datetime(users_df['sign_up_date']).dt.to_period('M')
-    users_df['churn_month'] = pd.to_datetime(users_df['churn_date']).dt.to_period('M')
-    users_df['conversion_month'] = pd.to_datetime(users_df['conversion_date']).dt.to_period('M')
-    
-    all_months = pd.period_range(
-        start=users_df['sign_up_month'].min(),
-        end=users_df['sign_up_month'].max() + 12,
-        freq='M'
-    )
-    
-    bridge_data = []
-    prev_mrr = 0
-    
-    for month in all_months:
-        # New MRR (new paying customers this month)
-        new_paying = users_df[users_df['conversion_month'] == month]
-        new_mrr = sum(PLAN_PRICING.get(plan, 0) for plan in new_paying['current_plan'])
-        
-        # Expansion MRR (upgrades)
-        # Simplified: assume 2% of Basic users upgrade to Pro each month
-        expansion_mrr = 0  # Would need upgrade event tracking
-        
-        # Contraction MRR (downgrades)
-        contraction_mrr = 0  # Would need downgrade event tracking
-        
-        # Churned MRR (users who churned this month)
-        churned_users = users_df[users_df['churn_month'] == month]
-        churned_mrr = sum(PLAN_PRICING.get(plan, 0) for plan in churned_users['current_plan'])
-        
-        # Net new MRR
-        net_new_mrr = new_mrr + expansion_mrr - contraction_mrr - churned_mrr
-        
-        # Current MRR
-        current_mrr = prev_mrr + net_new_mrr
-        
-        bridge_data.append({
-            'month': month.to_timestamp(),
-            'starting_mrr': prev_mrr,
-            'new_mrr': new_mrr,
-            'expansion_mrr': expansion_mrr,
-            'contraction_mrr': contraction_mrr,
-            'churned_mrr': churned_mrr,
-            'net_new_mrr': net_new_mrr,
-            'ending_mrr': current_mrr
-        })
-        
-        prev_mrr = current_mrr
-    
-    return pd.DataFrame(bridge_data)
+    months, components, starting_mrr, net_new_mrr = _mrr_bridge_arrays(users_df, ledger)
+    
+    return pd.DataFrame({
+        'month': months,
+        'starting_mrr': starting_mrr,
+        'new_mrr': components['new'],
+        'expansion_mrr': components['expansion'],
+        'contraction_mrr': components['contraction'],
+        'churned_mrr': components['churned'],
+        'net_new_mrr': net_new_mrr,
+        'ending_mrr': starting_mrr + net_new_mrr
+    })
 
 
-def calculate_net_revenue_retention(users_df):
+@traced
+def calculate_net_revenue_retention(users_df, ledger=None, mrr_bridge=None):
     """
     Calculate Net Revenue Retention (NRR).
     
     Args:
-        users_df: DataFrame with user lifecycle data
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
+        ledger: Optional PlanChangeLedger; defaults to the dataset's ledger
+        mrr_bridge: Optional output of calculate_mrr_bridge; NRR is then
+            derived from it instead of recomputing the bridge
         
     Returns:
         DataFrame with NRR metrics
     """
-    # Simplified NRR calculation
     # NRR = (Starting MRR + Expansion - Contraction - Churn) / Starting MRR
+    if mrr_bridge is not None:
+        months = mrr_bridge['month'].to_numpy()
+        starting_mrr = mrr_bridge['starting_mrr'].to_numpy()
+        components = {kind: mrr_bridge[f'{kind}_mrr'].to_numpy() for kind in ('expansion', 'contraction', 'churned')}
+    else:
+        months, components, starting_mrr, _ = _mrr_bridge_arrays(users_df, ledger)
+    
+    retained_mrr = (starting_mrr + components['expansion']
+                    - components['contraction'] - components['churned'])
+    nrr = np.divide(retained_mrr, starting_mrr, out=np.zeros(len(months)), where=starting_mrr > 0)
+    
+    return pd.DataFrame({
+        'month': months,
+        'nrr': nrr,
+        'nrr_pct': nrr * 100
+    })
+
+
+def _mrr_bridge_arrays(users_df, ledger):
+    """Months, ledger MRR components, starting MRR and net new MRR over the bridge horizon."""
+    data = as_dataset(users_df)
+    if ledger is None:
+        ledger = data.ledger
     
-    bridge = calculate_mrr_bridge(users_df)
-    
-    nrr_data = []
+    # Horizon: first sign-up month through 12 months after the last sign-up
+    first_month, num_months = data.month_horizon
     
-    for _, row in bridge.iterrows():
-        if row['starting_mrr'] > 0:
-            nrr = ((row['starting_mrr'] + row['expansion_mrr'] - 
-                   row['contraction_mrr'] - row['churned_mrr']) / 
-                   row['starting_mrr'])
-        else:
-            nrr = 0
-        
-        nrr_data.append({
-            'month': row['month'],
-            'nrr': nrr,
-            'nrr_pct': nrr * 100
-        })
+    components = ledger.monthly_mrr_components(first_month, num_months, PLAN_PRICING)
+    net_new_mrr = (components['new'] + components['expansion']
+                   - components['contraction'] - components['churned'])
+    ending_mrr = np.cumsum(net_new_mrr)
     
-    return pd.DataFrame(nrr_data)
+    return period_starts(first_month, num_months), components, ending_mrr - net_new_mrr, net_new_mrr
 
 
 if __name__ == "__main__":
@@ -0,0 +1,431 @@
+"""
+Scenario Projections - Deterministic and Monte Carlo revenue scenarios
+
+generate_scenarios is the 12-month point projection of six scenarios;
+project_scenarios evaluates the same formula broadcast over arrays of
+multipliers, which sensitivity_sweep walks over a full cartesian grid in
+chunks and tornado varies one multiplier at a time. simulate_scenarios replaces its fixed rates with monthly churn,
+growth and conversion rates drawn from distributions fitted to the users
+data, simulates every path of every scenario at once as (scenarios x paths)
+arrays stepped month by month, and reports percentile bands for MRR, ARR,
+users, paying users and LTV:CAC.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dataset import as_dataset
+from tracing import traced
+from utils import sweep_active_counts
+
+
+# Scenario name -> multipliers applied to the base rates
+SCENARIOS = [
+    {'name': 'Base Case', 'churn_mult': 1.0, 'growth_mult': 1.0, 'cac_mult': 1.0, 'conversion_mult': 1.0, 'price_mult': 1.0},
+    {'name': 'High Churn (+20%)', 'churn_mult': 1.2, 'growth_mult': 1.0, 'cac_mult': 1.0, 'conversion_mult': 1.0, 'price_mult': 1.0},
+    {'name': 'Reduced Churn (-15%)', 'churn_mult': 0.85, 'growth_mult': 1.0, 'cac_mult': 1.0, 'conversion_mult': 1.0, 'price_mult': 1.0},
+    {'name': 'Increased Marketing (+25% CAC)', 'churn_mult': 1.0, 'growth_mult': 1.15, 'cac_mult': 1.25, 'conversion_mult': 1.0, 'price_mult': 1.0},
+    {'name': 'Improved Conversion (+10%)', 'churn_mult': 1.0, 'growth_mult': 1.0, 'cac_mult': 1.0, 'conversion_mult': 1.10, 'price_mult': 1.0},
+    {'name': 'Pricing Change (+15% ARPU)', 'churn_mult': 1.0, 'growth_mult': 1.0, 'cac_mult': 1.0, 'conversion_mult': 1.0, 'price_mult': 1.15},
+]
+
+MULTIPLIERS = ('churn_mult', 'growth_mult', 'cac_mult', 'conversion_mult', 'price_mult')
+BASE_CAC = 300
+BASE_GROWTH_RATE = 0.05
+BAND_QUANTILES = (0.1, 0.5, 0.9)
+BAND_METRICS = ('mrr', 'arr', 'users', 'paying_users', 'ltv_cac_ratio')
+
+
+@traced
+def generate_scenarios(users_df, base_revenue):
+    """Generate 6 scenario projections."""
+    base_mrr, base_users, base_churn, *_ = _projection_base(users_df, base_revenue)
+    multipliers = {key: np.array([config[key] for config in SCENARIOS]) for key in MULTIPLIERS}
+    projection = project_scenarios(base_mrr, base_users, base_churn, months=12, **multipliers)
+
+    scenarios = []
+    for i, config in enumerate(SCENARIOS):
+        for month in range(12):
+            current_mrr = float(projection['mrr'][i, month])
+            scenarios.append({
+                'scenario': config['name'],
+                'month': month + 1,
+                'mrr': round(current_mrr, 2),
+                'arr': round(current_mrr * 12, 2),
+                'users': projection['users'][i, month],
+                'churn_rate': base_churn * config['churn_mult'],
+                'ltv_cac_ratio': round(projection['ltv_cac_ratio'][i, month], 2),
+                'net_revenue_impact': round(current_mrr - base_mrr, 2)
+            })
+
+    return pd.DataFrame(scenarios)
+
+
+def project_scenarios(base_mrr, base_users, base_churn, churn_mult=1.0, growth_mult=1.0, cac_mult=1.0,
+                      conversion_mult=1.0, price_mult=1.0, months=12, base_paying=0, base_conversion=0.0):
+    """
+    Deterministic month-by-month projection, broadcast over multiplier arrays.
+
+    Each month users lose int(users x churn) and gain int(users x growth);
+    MRR grows by (1 + growth - churn) x price_mult, with churn = base_churn
+    x churn_mult and growth = 5% x growth_mult. LTV:CAC is 12 months of
+    ARPU over CAC ($300 x cac_mult). Conversion is its own term: paying
+    users lose int(paying x churn) and gain int(new users x conversion),
+    with conversion = base_conversion x conversion_mult (capped at 1). It
+    does not enter the MRR formula.
+
+    Users are stepped only over the churn x growth shape, paying users over
+    churn x growth x conversion and MRR over the multipliers it depends
+    on; only LTV:CAC spans the full broadcast shape. Pass multipliers
+    shaped for broadcasting (one axis each) to evaluate a grid without
+    materializing it.
+
+    Args:
+        base_mrr, base_users, base_churn: Starting MRR, active users and churn rate
+        churn_mult, growth_mult, cac_mult, conversion_mult, price_mult:
+            Scalars or arrays, broadcast against each other
+        months: Months projected
+        base_paying, base_conversion: Starting paying users and the share of
+            new users converting to paid
+
+    Returns:
+        Dict of mrr, users, paying_users and ltv_cac_ratio arrays of shape
+        (broadcast shape..., months); all but ltv_cac_ratio are read-only
+        broadcast views
+    """
+    monthly_churn_rate = base_churn * np.asarray(churn_mult, dtype=float)
+    growth_rate = BASE_GROWTH_RATE * np.asarray(growth_mult, dtype=float)
+    conversion_rate = np.minimum(base_conversion * np.asarray(conversion_mult, dtype=float), 1)
+    price_mult = np.asarray(price_mult, dtype=float)
+    avg_cac = BASE_CAC * np.asarray(cac_mult, dtype=float)[..., None]
+    shape = np.broadcast(monthly_churn_rate, growth_rate, conversion_rate, price_mult, avg_cac[..., 0]).shape
+
+    current_users = np.full(np.broadcast(monthly_churn_rate, growth_rate).shape, base_users, dtype=np.int64)
+    current_paying = np.full(np.broadcast(current_users, conversion_rate).shape, base_paying, dtype=np.int64)
+    current_mrr = np.full(np.broadcast(monthly_churn_rate, growth_rate, price_mult).shape, base_mrr, dtype=float)
+    users = np.empty(current_users.shape + (months,), dtype=np.int64)
+    paying = np.empty(current_paying.shape + (months,), dtype=np.int64)
+    mrr = np.empty(current_mrr.shape + (months,))
+    for month in range(months):
+        churned_users = np.trunc(current_users * monthly_churn_rate).astype(np.int64)
+        new_users = np.trunc(current_users * growth_rate).astype(np.int64)
+        current_users = current_users - churned_users + new_users
+        current_paying = (current_paying - np.trunc(current_paying * monthly_churn_rate).astype(np.int64)
+                          + np.trunc(new_users * conversion_rate).astype(np.int64))
+        current_mrr = current_mrr * (1 + growth_rate - monthly_churn_rate) * price_mult
+        users[..., month] = current_users
+        paying[..., month] = current_paying
+        mrr[..., month] = current_mrr
+
+    avg_ltv = np.divide(mrr, users, out=np.zeros(np.broadcast(mrr, users).shape), where=users > 0) * 12
+    ltv_cac = np.divide(avg_ltv, avg_cac, out=np.zeros(shape + (months,)), where=avg_cac > 0)
+    return {
+        'mrr': np.broadcast_to(mrr, shape + (months,)),
+        'users': np.broadcast_to(users, shape + (months,)),
+        'paying_users': np.broadcast_to(paying, shape + (months,)),
+        'ltv_cac_ratio': ltv_cac,
+    }
+
+
+@traced
+def sensitivity_sweep(users_df, base_revenue, ranges, month=12, chunk_size=250_000):
+    """
+    Evaluate project_scenarios over the full cartesian grid of multiplier ranges.
+
+    Each multiplier gets its own broadcast axis, and the grid is evaluated
+    in chunks along the first (churn_mult) axis of about chunk_size
+    combinations, so memory holds one chunk's projection at a time plus
+    the results (20^5 = 3.2M combinations take about 260 MB as a DataFrame).
+
+    Args:
+        users_df: DataFrame with user lifecycle data (at least churned and
+            converted_to_paid)
+        base_revenue: Output of calculate_revenue_metrics
+        ranges: Dict of multiplier name (see MULTIPLIERS) -> values to sweep;
+            omitted multipliers stay at 1.0
+        month: Projection month reported (1-based)
+        chunk_size: Target combinations per chunk (at least one churn_mult
+            value is evaluated at a time)
+
+    Returns:
+        Tidy DataFrame with one row per combination, in grid order: the
+        five multipliers, then mrr, arr, users, paying_users and
+        ltv_cac_ratio at month
+    """
+    axes = _sweep_axes(ranges)
+    base_mrr, base_users, base_churn, base_paying, base_conversion = _projection_base(users_df, base_revenue)
+    shape = tuple(len(values) for values in axes.values())
+    # Multiplier k varies along axis k
+    grid = {key: values.reshape([-1 if k == i else 1 for k in range(len(shape))])
+            for i, (key, values) in enumerate(axes.items())}
+
+    total = int(np.prod(shape))
+    results = {key: np.empty(total) for key in MULTIPLIERS}
+    results.update({'mrr': np.empty(total), 'arr': np.empty(total),
+                    'users': np.empty(total, dtype=np.int64), 'paying_users': np.empty(total, dtype=np.int64),
+                    'ltv_cac_ratio': np.empty(total)})
+    per_value = total // shape[0]
+    step = max(1, chunk_size // per_value)
+    for first in range(0, shape[0], step):
+        last = min(first + step, shape[0])
+        chunk = {key: values[first:last] if key == MULTIPLIERS[0] else values for key, values in grid.items()}
+        projection = project_scenarios(base_mrr, base_users, base_churn, months=month, base_paying=base_paying,
+                                       base_conversion=base_conversion, **chunk)
+
+        rows = slice(first * per_value, last * per_value)
+        chunk_shape = (last - first,) + shape[1:]
+        for key, values in chunk.items():
+            results[key][rows] = np.broadcast_to(values, chunk_shape).ravel()
+        for metric in ('mrr', 'users', 'paying_users', 'ltv_cac_ratio'):
+            results[metric][rows] = projection[metric][..., -1].ravel()
+        results['arr'][rows] = results['mrr'][rows] * 12
+    return pd.DataFrame(results)
+
+
+def tornado(users_df, base_revenue, ranges, metric='mrr', month=12):
+    """
+    One-at-a-time sensitivities for a tornado chart.
+
+    Each multiplier is set to the lowest and highest value of its range
+    while the others stay at 1.0.
+
+    Args:
+        users_df: DataFrame with user lifecycle data (at least churned and
+            converted_to_paid)
+        base_revenue: Output of calculate_revenue_metrics
+        ranges: Dict of multiplier name -> values (only min and max are used)
+        metric: 'mrr', 'arr', 'users', 'paying_users' or 'ltv_cac_ratio'
+        month: Projection month reported (1-based)
+
+    Returns:
+        DataFrame with parameter, low/high multiplier, metric at each, the
+        base value and swing (|high - low|), widest swing first
+    """
+    axes = _sweep_axes(ranges)
+    base_mrr, base_users, base_churn, base_paying, base_conversion = _projection_base(users_df, base_revenue)
+    names = [key for key in MULTIPLIERS if key in ranges]
+
+    # Row 0: all multipliers at 1.0; then each parameter at its low and high
+    multipliers = {key: np.ones(1 + 2 * len(names)) for key in MULTIPLIERS}
+    for i, key in enumerate(names):
+        multipliers[key][1 + 2 * i] = axes[key].min()
+        multipliers[key][2 + 2 * i] = axes[key].max()
+    projection = project_scenarios(base_mrr, base_users, base_churn, months=month, base_paying=base_paying,
+                                   base_conversion=base_conversion, **multipliers)
+    values = projection['mrr' if metric == 'arr' else metric][:, -1] * (12 if metric == 'arr' else 1)
+
+    table = pd.DataFrame({
+        'parameter': names,
+        'low': [axes[key].min() for key in names],
+        'high': [axes[key].max() for key in names],
+        f'{metric}_low': values[1::2],
+        f'{metric}_high': values[2::2],
+        f'{metric}_base': values[0],
+    })
+    table['swing'] = (table[f'{metric}_high'] - table[f'{metric}_low']).abs()
+    return table.sort_values('swing', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _projection_base(users_df, base_revenue):
+    """
+    (MRR, active users) of the latest revenue month, the lifetime churn share,
+    the latest paying users and the lifetime conversion share.
+    """
+    latest = base_revenue.iloc[-1]
+    return (latest['mrr'], latest['active_users'], users_df['churned'].mean(),
+            latest['paying_users'], users_df['converted_to_paid'].mean())
+
+
+def _sweep_axes(ranges):
+    """Float array per multiplier, in MULTIPLIERS order; [1.0] where no range is given."""
+    unknown = set(ranges) - set(MULTIPLIERS)
+    if unknown:
+        raise ValueError(f"Unknown multipliers: {sorted(unknown)}; expected {MULTIPLIERS}")
+    axes = {key: np.atleast_1d(np.asarray(ranges.get(key, [1.0]), dtype=float)) for key in MULTIPLIERS}
+    empty = [key for key, values in axes.items() if values.size == 0]
+    if empty:
+        raise ValueError(f"Empty range for {empty}")
+    return axes
+
+
+def fit_rate_distributions(users_df):
+    """
+    Fit monthly churn, growth and conversion rate distributions to the users data.
+
+    Rates are observed per month from the first through the last sign-up
+    month: churn = churned / active at month start, growth = sign-ups /
+    active at month start, conversion = converted share of each sign-up
+    cohort. Means and variances are weighted by the month's active users
+    (cohort size for conversion) and matched to a Beta distribution for
+    churn and conversion and a Gamma distribution for growth.
+
+    Args:
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
+
+    Returns:
+        Dict of rate -> (distribution name, parameter 1, parameter 2, mean)
+    """
+    data = as_dataset(users_df)
+    first_month, num_months = data.month_horizon
+    start, end = data.active_months
+    observed = int(data.sign_up_month.max() - first_month) + 1
+
+    active = sweep_active_counts(start, end, num_months)[:observed]
+    in_window = (end >= 0) & (end < observed)
+    churned = np.bincount(end[in_window], minlength=observed)
+    sign_ups = np.bincount(start, minlength=observed)[:observed]
+    converted = np.bincount(start, weights=data.users['converted_to_paid'].to_numpy(dtype=float),
+                            minlength=observed)[:observed]
+
+    seen = active > 0
+    cohorts = sign_ups > 0
+    return {
+        'churn': _beta_fit(churned[seen] / active[seen], active[seen]),
+        'growth': _gamma_fit(sign_ups[seen] / active[seen], active[seen]),
+        'conversion': _beta_fit(converted[cohorts] / sign_ups[cohorts], sign_ups[cohorts]),
+    }
+
+
+def simulate_paths(users_df, base_revenue, num_paths=10_000, months=36, seed=42, scenarios=SCENARIOS,
+                   rates=None):
+    """
+    Simulate every scenario as (months x scenarios x paths) arrays.
+
+    Each month every path draws its churn, growth and conversion rates from
+    the fitted distributions; scenarios scale the same draws by their
+    multipliers (common random numbers), so differences between scenarios
+    are not sampling noise. Churned, new and converted users are the
+    expected counts stochastically rounded to integers, which keeps small
+    bases integral without bias. Paying users carry the latest ARPPU,
+    scaled once by the scenario's price multiplier. LTV:CAC uses the same
+    simplified LTV as generate_scenarios (12 months of ARPU).
+
+    Args:
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
+        base_revenue: Output of calculate_revenue_metrics; its last row is
+            the starting point
+        num_paths: Simulated paths per scenario
+        months: Months projected
+        seed: Random seed
+        scenarios: Scenario definitions (see SCENARIOS)
+        rates: Optional output of fit_rate_distributions (fitted if omitted)
+
+    Returns:
+        Dict of metric -> float array of shape (months, scenarios, paths)
+    """
+    rates = fit_rate_distributions(users_df) if rates is None else rates
+    rng = np.random.default_rng(seed)
+    latest = base_revenue.iloc[-1]
+    arppu = latest['mrr'] / latest['paying_users'] if latest['paying_users'] > 0 else 0.0
+
+    def multiplier(key):
+        return np.array([config[key] for config in scenarios], dtype=float)[:, None]
+
+    shape = (len(scenarios), num_paths)
+    churn_mult, growth_mult = multiplier('churn_mult'), multiplier('growth_mult')
+    conversion_mult, price = multiplier('conversion_mult'), arppu * multiplier('price_mult')
+    cac = BASE_CAC * multiplier('cac_mult')
+
+    users = np.full(shape, latest['active_users'], dtype=float)
+    paying = np.full(shape, latest['paying_users'], dtype=float)
+    out = {metric: np.empty((months,) + shape) for metric in ('mrr', 'users', 'paying_users', 'ltv_cac_ratio')}
+    for month in range(months):
+        churn = np.minimum(_draw(rng, rates['churn'], num_paths) * churn_mult, 1)
+        growth = _draw(rng, rates['growth'], num_paths) * growth_mult
+        conversion = np.minimum(_draw(rng, rates['conversion'], num_paths) * conversion_mult, 1)
+
+        new_users = _round_counts(rng, users * growth)
+        new_paying = _round_counts(rng, new_users * conversion)
+        users += new_users - _round_counts(rng, users * churn)
+        paying += new_paying - _round_counts(rng, paying * churn)
+
+        mrr = np.multiply(paying, price, out=out['mrr'][month])
+        out['users'][month] = users
+        out['paying_users'][month] = paying
+        ltv = np.divide(mrr * 12, users, out=np.zeros(shape), where=users > 0)
+        np.divide(ltv, cac, out=out['ltv_cac_ratio'][month])
+    out['arr'] = out['mrr'] * 12
+    return out
+
+
+@traced
+def simulate_scenarios(users_df, base_revenue, num_paths=10_000, months=36, seed=42, scenarios=SCENARIOS,
+                       quantiles=BAND_QUANTILES):
+    """
+    Monte Carlo scenario projections summarized as percentile bands.
+
+    Args:
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
+        base_revenue: Output of calculate_revenue_metrics
+        num_paths: Simulated paths per scenario
+        months: Months projected (12-60 are typical)
+        seed: Random seed
+        scenarios: Scenario definitions (see SCENARIOS)
+        quantiles: Band quantiles; columns are named p10, p50, p90, ...
+
+    Returns:
+        DataFrame with one row per scenario and month and a column per
+        metric and quantile (mrr_p10, mrr_p50, ..., ltv_cac_ratio_p90)
+    """
+    paths = simulate_paths(users_df, base_revenue, num_paths, months, seed, scenarios)
+    latest = base_revenue.iloc[-1]
+    arppu = latest['mrr'] / latest['paying_users'] if latest['paying_users'] > 0 else 0.0
+    # MRR is paying users x a per-scenario price, so its percentiles are theirs x that price
+    price = np.repeat([arppu * config['price_mult'] for config in scenarios], months)
+
+    bands = pd.DataFrame({
+        'scenario': np.repeat([config['name'] for config in scenarios], months),
+        'month': np.tile(np.arange(1, months + 1), len(scenarios)),
+    })
+    percentiles = {}
+    for metric in ('users', 'paying_users', 'ltv_cac_ratio'):
+        # (quantiles, months, scenarios) -> rows ordered by scenario, then month
+        values = np.quantile(paths[metric], quantiles, axis=-1)
+        percentiles[metric] = values.transpose(0, 2, 1).reshape(len(quantiles), -1)
+    percentiles['mrr'] = percentiles['paying_users'] * price
+    percentiles['arr'] = percentiles['mrr'] * 12
+
+    for metric in BAND_METRICS:
+        for q, band in zip(quantiles, percentiles[metric]):
+            bands[f'{metric}_p{round(q * 100)}'] = band
+    return bands
+
+
+def _beta_fit(rates, weights):
+    """Weighted method-of-moments Beta fit; ('beta', alpha, beta, mean)."""
+    mean, var = _weighted_moments(rates, weights)
+    mean = min(max(mean, 1e-9), 1 - 1e-9)
+    # Beta needs var < mean * (1 - mean); fall back to a tight distribution
+    concentration = mean * (1 - mean) / var - 1 if 0 < var < mean * (1 - mean) else 1e6
+    return ('beta', mean * concentration, (1 - mean) * concentration, mean)
+
+
+def _gamma_fit(rates, weights):
+    """Weighted method-of-moments Gamma fit; ('gamma', shape, scale, mean)."""
+    mean, var = _weighted_moments(rates, weights)
+    if mean <= 0:
+        return ('gamma', 1.0, 0.0, 0.0)
+    if var <= 0:
+        return ('gamma', 1e6, mean / 1e6, mean)
+    return ('gamma', mean ** 2 / var, var / mean, mean)
+
+
+def _weighted_moments(values, weights):
+    """Weighted mean and variance (0, 0 when there is nothing to fit)."""
+    if len(values) == 0 or weights.sum() == 0:
+        return 0.0, 0.0
+    mean = np.average(values, weights=weights)
+    return float(mean), float(np.average((values - mean) ** 2, weights=weights))
+
+
+def _round_counts(rng, expected):
+    """Stochastically round expected counts: floor(x + U), unbiased and integral."""
+    return np.floor(expected + rng.random(expected.shape))
+
+
+def _draw(rng, fit, shape):
+    """Samples of a fitted rate distribution."""
+    kind, a, b, _ = fit
+    if kind == 'beta':
+        return rng.beta(a, b, shape)
+    return rng.gamma(a, b, shape)
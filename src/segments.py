@@ -0,0 +1,130 @@
+"""
+Segment Summaries - Grouping-sets (CUBE) aggregation over user dimensions
+
+One grouped pass builds mergeable partial counts/sums at the finest grain of
+all requested dimensions; every grouping set (Overall, per-channel, channel x
+plan, ...) is then rolled up from those partials instead of re-scanning users.
+"""
+
+from itertools import combinations
+
+import pandas as pd
+import numpy as np
+
+
+# Label shown in the 'segment' column for each dimension
+DIMENSION_LABELS = {
+    'acquisition_channel': 'Channel',
+    'current_plan': 'Plan',
+    'initial_plan': 'Initial Plan',
+    'country': 'Country',
+    'sign_up_month': 'Signup Month'
+}
+
+
+def _sign_up_month(df):
+    """'YYYY-MM' sign-up month as a categorical (formats each month once)."""
+    months = pd.to_datetime(df['sign_up_date']).to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+    uniques, codes = np.unique(months, return_inverse=True)
+    return pd.Categorical.from_codes(codes.ravel(), np.datetime_as_string(uniques, unit='M'))
+
+
+# Dimensions derived from other columns when not already present
+DERIVED_DIMENSIONS = {
+    'sign_up_month': _sign_up_month
+}
+
+# Overall, then per channel, then per plan
+DEFAULT_GROUPING_SETS = [(), ('acquisition_channel',), ('current_plan',)]
+
+
+def cube(*dimensions):
+    """
+    All grouping sets over dimensions (SQL CUBE), coarsest first.
+
+    cube('a', 'b') -> [(), ('a',), ('b',), ('a', 'b')]
+    """
+    return [combo for size in range(len(dimensions) + 1) for combo in combinations(dimensions, size)]
+
+
+def grouping_sets_summary(df, grouping_sets, count_name, aggregations):
+    """
+    Summarize df for every grouping set in one pass over the rows.
+
+    Sums and means are rolled up from partial sums at the finest grain;
+    medians are not mergeable and use one grouped median per grouping set.
+    Segments keep first-appearance order within each grouping set.
+
+    Args:
+        df: Row-level DataFrame (users, unit economics, ...)
+        grouping_sets: List of tuples of dimension columns; () is Overall
+        count_name: Output column holding the row count per segment
+        aggregations: List of (output_column, source_column, 'sum'|'mean'|'median')
+
+    Returns:
+        DataFrame with 'segment', count_name and one column per aggregation
+    """
+    grouping_sets = [tuple(gs) for gs in grouping_sets]
+    dims = list(dict.fromkeys(dim for gs in grouping_sets for dim in gs))
+    additive = list(dict.fromkeys(col for _, col, func in aggregations if func in ('sum', 'mean')))
+    medians = list(dict.fromkeys(col for _, col, func in aggregations if func == 'median'))
+
+    frame = df[[col for col in df.columns if col in set(dims + additive + medians)]]
+    missing = [dim for dim in dims if dim not in frame.columns]
+    if missing:
+        frame = frame.assign(**{dim: DERIVED_DIMENSIONS[dim](df) for dim in missing})
+
+    # Single pass: partial row counts and sums at the finest grain
+    counted = frame[dims + additive].assign(_rows=1)
+    if dims:
+        partial = counted.groupby(dims, sort=False, dropna=False, observed=True).sum()
+    else:
+        partial = _total_row(counted)
+
+    summaries = []
+    for gs in grouping_sets:
+        if gs:
+            rolled = partial.groupby(level=list(gs), sort=False, dropna=False, observed=True).sum()
+            keys = rolled.index.to_frame(index=False)
+            labels = _segment_labels(keys, gs)
+        else:
+            rolled = _total_row(partial)
+            labels = pd.Series(['Overall'])
+
+        rows = rolled['_rows'].to_numpy()
+        summary = {'segment': labels.to_numpy(dtype=object), count_name: rows}
+        for output, col, func in aggregations:
+            if func == 'sum':
+                summary[output] = rolled[col].to_numpy()
+            elif func == 'mean':
+                summary[output] = rolled[col].to_numpy() / rows
+            elif func == 'median':
+                summary[output] = _segment_medians(frame, gs, col, rolled.index)
+            else:
+                raise ValueError(f"Unsupported aggregation: {func}")
+        summaries.append(pd.DataFrame(summary))
+
+    return pd.concat(summaries, ignore_index=True)
+
+
+def _segment_labels(keys, gs):
+    """'Channel: x | Plan: y' labels, concatenated column by column."""
+    labels = None
+    for dim in gs:
+        part = f'{DIMENSION_LABELS.get(dim, dim)}: ' + keys[dim].astype(str).astype(object)
+        labels = part if labels is None else labels + ' | ' + part
+    return labels
+
+
+def _total_row(frame):
+    """Column sums as a one-row DataFrame; bools are summed as counts, integer dtypes are kept."""
+    dtypes = {col: np.int64 if dtype == bool else dtype for col, dtype in frame.dtypes.items()}
+    return frame.astype(dtypes).sum().to_frame().T.astype(dtypes)
+
+
+def _segment_medians(frame, gs, col, index):
+    """Exact median of col per segment of gs, aligned to index."""
+    if not gs:
+        return np.array([frame[col].median()])
+    medians = frame.groupby(list(gs), sort=False, dropna=False, observed=True)[col].median()
+    return medians.reindex(index).to_numpy()
@@ -0,0 +1,172 @@
+"""
+Quantile Sketches - Mergeable approximate ranks for sharded RFM scoring
+
+A KLL sketch (Karnin, Lang & Liberty 2016) keeps a few hundred weighted
+samples of a numeric column in levels of compactors: items at level h
+stand for 2^h inputs. A full level is sorted and every other item (random
+offset) is promoted with twice the weight. Sketches built on separate
+shards merge level by level into a sketch of the union, so quantiles of a
+50M-row column need only each worker's ~3k retained items on one node.
+
+Rank error: with k=200 the normalized rank of any value is within about
+1.3% of its exact rank with 99% confidence (rank_error); it shrinks
+roughly as 1/k and does not grow with n.
+"""
+
+import numpy as np
+
+
+DEFAULT_K = 200
+
+# Level capacities shrink by this factor below the top level
+_CAPACITY_DECAY = 2 / 3
+
+
+def rank_error(k=DEFAULT_K):
+    """
+    Normalized rank error of a KLL sketch at 99% confidence.
+
+    The single-sided fit published with Apache DataSketches' KLL sketch,
+    which uses the same compaction scheme.
+    """
+    return 2.296 / k ** 0.9723
+
+
+class KLLSketch:
+    """
+    Mergeable quantile sketch of a stream of numbers.
+
+    NaNs are ignored. Values are stored as float64; n, min and max are exact.
+
+    Attributes:
+        k: Capacity of the top level; larger is more accurate and bigger
+        n: Number of values added
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+        self._sorted = None
+
+    def __len__(self):
+        return self.n
+
+    @classmethod
+    def from_values(cls, values, k=DEFAULT_K, seed=None):
+        """Sketch of an array-like of values."""
+        return cls(k, seed).update(values)
+
+    @property
+    def retained(self):
+        """Number of items held across all levels."""
+        return sum(len(level) for level in self._levels)
+
+    def update(self, values):
+        """
+        Add a batch of values.
+
+        Returns:
+            self
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """
+        Fold another sketch (of a disjoint shard) into this one.
+
+        Returns:
+            self
+        """
+        if other.k != self.k:
+            raise ValueError(f"Cannot merge sketches with k={self.k} and k={other.k}")
+        if not other.n:
+            return self
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for h, level in enumerate(other._levels):
+            self._levels[h] = np.concatenate([self._levels[h], level])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def cdf(self, values, inclusive=True):
+        """
+        Approximate fraction of the stream <= values (< values if not inclusive).
+
+        Args:
+            values: Scalar or array of query values
+
+        Returns:
+            Array of normalized ranks in [0, 1]
+        """
+        items, cumulative = self._sorted_view()
+        side = 'right' if inclusive else 'left'
+        positions = np.searchsorted(items, np.asarray(values, dtype=float), side=side)
+        return np.concatenate([[0.0], cumulative])[positions] / max(self.n, 1)
+
+    def quantile(self, q):
+        """
+        Approximate q-quantiles: the smallest retained item whose normalized
+        rank is at least q (the exact min and max at q = 0 and 1).
+
+        Args:
+            q: Scalar or array of fractions in [0, 1]
+
+        Returns:
+            Array of quantiles
+        """
+        if not self.n:
+            raise ValueError("Empty sketch")
+        items, cumulative = self._sorted_view()
+        q = np.asarray(q, dtype=float)
+        positions = np.searchsorted(cumulative, q * self.n, side='left')
+        result = items[np.minimum(positions, len(items) - 1)]
+        return np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+
+    def _capacity(self, level):
+        """Capacity of a level; the top level holds k items."""
+        depth = len(self._levels) - level - 1
+        return max(2, int(np.ceil(self.k * _CAPACITY_DECAY ** depth)))
+
+    def _compress(self):
+        """Compact full levels, bottom up, until every level is within capacity."""
+        self._sorted = None
+        h = 0
+        while h < len(self._levels):
+            level = self._levels[h]
+            if len(level) > self._capacity(h):
+                if h + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                level = np.sort(level)
+                # An odd item out stays behind at this level
+                keep = level[:len(level) % 2]
+                offset = self._rng.integers(2)
+                self._levels[h + 1] = np.concatenate([self._levels[h + 1], level[len(keep) + offset::2]])
+                self._levels[h] = keep
+            h += 1
+
+    def _sorted_view(self):
+        """Retained items sorted, with the cumulative weight through each item."""
+        if self._sorted is None:
+            items = np.concatenate(self._levels)
+            weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self._levels)])
+            order = np.argsort(items, kind='stable')
+            self._sorted = (items[order], np.cumsum(weights[order]))
+        return self._sorted
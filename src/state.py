@@ -0,0 +1,214 @@
+"""
+Customer State Store - Incrementally refreshed RFM and churn-risk inputs
+
+Holds one row of running aggregates per customer (last transaction, last
+event, last login, last feature_use, transaction count/sum, bad-ticket flag).
+A daily refresh folds only the new rows into the touched customers and then
+re-scores as of the new reference date, so its cost tracks the delta rather
+than the full history.
+"""
+
+import pandas as pd
+import numpy as np
+
+from engine import NO_ACTIVITY_DAYS, score_churn_risk
+from ids import IdDictionary, as_codes
+from metrics import assemble_rfm
+
+
+# Bump when the persisted layout changes
+STATE_VERSION = 3
+
+DATE_FIELDS = ['last_transaction', 'last_event', 'last_login', 'last_feature_use']
+
+
+class CustomerStateStore:
+    """
+    Columnar per-customer state; row i belongs to customer code i of ids.
+
+    Frequency and monetary are cumulative over every applied transaction,
+    matching the full-history window of metrics.compute_rfm. Deltas must
+    only contain rows on or before the reference date they are scored at.
+
+    Args:
+        ids: IdDictionary shared with ingest (a new one by default); delta
+            customer_id columns may hold its codes or external IDs
+    """
+
+    def __init__(self, ids=None, capacity=1024):
+        self.ids = ids if ids is not None else IdDictionary()
+        capacity = max(capacity, len(self.ids))
+        self.dates = {field: np.full(capacity, np.datetime64('NaT'), dtype='datetime64[ns]')
+                      for field in DATE_FIELDS}
+        self.frequency = np.zeros(capacity, dtype=np.int64)
+        self.monetary = np.zeros(capacity, dtype=np.float64)
+        self.bad_ticket = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_history(cls, transactions_df=None, events_df=None, tickets_df=None, ids=None):
+        """Build the store from full history (one delta containing everything)."""
+        store = cls(ids)
+        store.apply_delta(transactions_df, events_df, tickets_df)
+        return store
+
+    def apply_delta(self, transactions_df=None, events_df=None, tickets_df=None):
+        """
+        Fold new transactions, events and tickets into the state.
+
+        Each table is reduced to one row per customer before touching the
+        store; only those customers' rows are read and written.
+
+        Returns:
+            Number of distinct customers touched
+        """
+        touched = []
+
+        if transactions_df is not None and not transactions_df.empty:
+            codes = self._codes(transactions_df['customer_id'])
+            per_customer = pd.DataFrame({
+                'last': pd.to_datetime(transactions_df['transaction_date']).to_numpy(),
+                'count': 1,
+                'amount': transactions_df['amount'].to_numpy(dtype=np.float64)
+            }).groupby(codes).agg({'last': 'max', 'count': 'sum', 'amount': 'sum'})
+            per_customer = per_customer[per_customer.index >= 0]
+            rows = per_customer.index.to_numpy()
+            self._fold_dates('last_transaction', rows, per_customer['last'])
+            self.frequency[rows] += per_customer['count'].to_numpy(dtype=np.int64)
+            self.monetary[rows] += per_customer['amount'].to_numpy()
+            touched.append(rows)
+
+        if events_df is not None and not events_df.empty:
+            codes = self._codes(events_df['customer_id'])
+            timestamps = pd.Series(pd.to_datetime(events_df['event_timestamp']).to_numpy())
+            last_event = timestamps.groupby(codes).max()
+            last_event = last_event[last_event.index >= 0]
+            self._fold_dates('last_event', last_event.index.to_numpy(), last_event)
+
+            names = events_df['event_name'].to_numpy()
+            for name, field in (('login', 'last_login'), ('feature_use', 'last_feature_use')):
+                is_name = names == name
+                if is_name.any():
+                    last = timestamps[is_name].groupby(codes[is_name]).max()
+                    last = last[last.index >= 0]
+                    self._fold_dates(field, last.index.to_numpy(), last)
+            touched.append(last_event.index.to_numpy())
+
+        if tickets_df is not None and not tickets_df.empty:
+            bad = tickets_df.loc[tickets_df['satisfaction_score'] < 2, 'customer_id']
+            rows = np.unique(self._codes(bad))
+            rows = rows[rows >= 0]
+            self.bad_ticket[rows] = True
+            touched.append(rows)
+
+        return len(np.unique(np.concatenate(touched))) if touched else 0
+
+    def score_rfm(self, reference_date):
+        """RFM scores as of reference_date; same output as metrics.compute_rfm."""
+        size = self._reserve()
+        last_txn = self.dates['last_transaction'][:size]
+        last_evt = self.dates['last_event'][:size]
+        has_txn = np.flatnonzero(self.frequency[:size] > 0)
+        has_evt = np.flatnonzero(~np.isnat(last_evt))
+        txn_ids = self.ids.decode(has_txn)
+
+        rfm_metrics = pd.DataFrame({
+            'frequency_180d': self.frequency[has_txn],
+            'monetary_180d': self.monetary[has_txn]
+        }, index=pd.Index(txn_ids, name='customer_id'))
+        return assemble_rfm(
+            rfm_metrics,
+            pd.Series(last_txn[has_txn], index=txn_ids),
+            pd.Series(last_evt[has_evt], index=self.ids.decode(has_evt)),
+            reference_date
+        )
+
+    def score_churn_risk(self, customer_ids, reference_date):
+        """Churn risk for customer_ids as of reference_date (see engine.compute_churn_risk)."""
+        ref_date = np.datetime64(pd.to_datetime(reference_date), 'ns')
+        customer_ids = pd.Series(customer_ids)
+        rows = as_codes(customer_ids, self.ids, add=False)
+        if pd.api.types.is_integer_dtype(customer_ids):
+            customer_ids = pd.Series(self.ids.decode(rows))
+        self._reserve()
+        known = rows >= 0
+
+        def days_since(field):
+            last = np.full(len(rows), np.datetime64('NaT'), dtype='datetime64[ns]')
+            last[known] = self.dates[field][rows[known]]
+            seen = ~np.isnat(last)
+            days = np.full(len(rows), NO_ACTIVITY_DAYS, dtype=np.int64)
+            days[seen] = (ref_date - last[seen]) // np.timedelta64(1, 'D')
+            return days
+
+        bad_ticket = np.zeros(len(rows), dtype=bool)
+        bad_ticket[known] = self.bad_ticket[rows[known]]
+        return score_churn_risk(customer_ids.to_numpy(), days_since('last_login'),
+                                days_since('last_feature_use'), bad_ticket)
+
+    def save(self, path):
+        """
+        Persist the state (with its ID dictionary) to path as an .npz archive.
+
+        Every field is a plain array (IDs as unicode), so load() needs no
+        pickle and a state file cannot execute code.
+        """
+        size = self._reserve()
+        ids = self.ids.values
+        if ids.dtype == object:
+            ids = ids.astype(str)
+        arrays = {
+            'version': np.array(STATE_VERSION),
+            'ids': ids,
+            'frequency': self.frequency[:size],
+            'monetary': self.monetary[:size],
+            'bad_ticket': self.bad_ticket[:size],
+        }
+        arrays.update({f'date_{field}': values[:size] for field, values in self.dates.items()})
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load a store written by save()."""
+        with np.load(path, allow_pickle=False) as state:
+            version = int(state['version']) if 'version' in state else None
+            if version != STATE_VERSION:
+                raise ValueError(f"Unsupported state version: {version}")
+            ids = state['ids']
+            store = cls(IdDictionary(ids.astype(object) if ids.dtype.kind == 'U' else ids))
+            size = len(state['frequency'])
+            for field in DATE_FIELDS:
+                store.dates[field][:size] = state[f'date_{field}']
+            store.frequency[:size] = state['frequency']
+            store.monetary[:size] = state['monetary']
+            store.bad_ticket[:size] = state['bad_ticket']
+        return store
+
+    def _codes(self, customer_ids):
+        """Codes for a delta's customer_id column, adding unseen customers."""
+        codes = as_codes(customer_ids, self.ids)
+        self._reserve()
+        return codes
+
+    def _reserve(self):
+        """Grow every column (doubling) to cover all codes in ids; returns len(ids)."""
+        size = len(self.ids)
+        capacity = len(self.frequency)
+        if size > capacity:
+            extra = max(size, 2 * capacity) - capacity
+            for field in DATE_FIELDS:
+                self.dates[field] = np.concatenate([
+                    self.dates[field], np.full(extra, np.datetime64('NaT'), dtype='datetime64[ns]')
+                ])
+            self.frequency = np.concatenate([self.frequency, np.zeros(extra, dtype=np.int64)])
+            self.monetary = np.concatenate([self.monetary, np.zeros(extra, dtype=np.float64)])
+            self.bad_ticket = np.concatenate([self.bad_ticket, np.zeros(extra, dtype=bool)])
+        return size
+
+    def _fold_dates(self, field, rows, latest):
+        """Keep the later of the stored and incoming date (NaT-aware)."""
+        column = self.dates[field]
+        column[rows] = np.fmax(column[rows], latest.to_numpy(dtype='datetime64[ns]'))
@@ -0,0 +1,241 @@
+"""
+Tracing - Opt-in spans around pipeline stages and metric functions
+
+Each span records wall time, CPU time of its thread, rows in and out, and
+the growth in peak memory while it ran. A finished trace is written as
+Chrome trace JSON (chrome://tracing, ui.perfetto.dev) and summarized as one
+line per stage. Tracing is off unless a Tracer is activated; the traced
+decorator then costs one global lookup per call.
+
+Peak memory is the growth of the process high-water RSS by default, which
+is free but only moves when a span sets a new peak. Tracer(memory=True)
+measures each span's own peak with tracemalloc instead, at several times
+the runtime. Both are process-wide, so spans running concurrently on
+threads share the attribution.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+_active = None
+
+
+class Tracer:
+    """
+    Collects spans from every thread of this process.
+
+    Attributes:
+        memory: Measure per-span peaks with tracemalloc (else peak RSS growth)
+        start_ns: perf_counter_ns origin of the trace timeline
+        spans: List of span dicts (name, cat, start_ns, wall_ns, cpu_ns,
+            rows_in, rows_out, peak_mb, pid, tid, depth)
+    """
+
+    def __init__(self, memory=False, start_ns=None):
+        self.memory = memory
+        self.start_ns = time.perf_counter_ns() if start_ns is None else start_ns
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return activate(self)
+
+    def __exit__(self, *exc):
+        deactivate()
+
+    @contextmanager
+    def span(self, name, category='function', rows_in=None):
+        """
+        Time the body as one span; set record['rows_out'] on the yielded dict.
+        """
+        stack = self._stack()
+        record = {'name': name, 'cat': category, 'rows_in': rows_in, 'rows_out': None,
+                  'pid': os.getpid(), 'tid': threading.get_ident(), 'depth': len(stack)}
+        frame = {'base': self._memory_now(), 'peak': 0}
+        stack.append(frame)
+        cpu_start = time.thread_time_ns()
+        record['start_ns'] = time.perf_counter_ns()
+        try:
+            yield record
+        finally:
+            record['wall_ns'] = time.perf_counter_ns() - record['start_ns']
+            record['cpu_ns'] = time.thread_time_ns() - cpu_start
+            stack.pop()
+            record['peak_mb'] = self._memory_growth(frame, stack)
+            with self._lock:
+                self.spans.append(record)
+
+    def call(self, name, category, func, args, kwargs):
+        """func(*args, **kwargs) inside a span with input and output row counts."""
+        with self.span(name, category, _rows(args, kwargs)) as record:
+            result = func(*args, **kwargs)
+            record['rows_out'] = _rows((result,))
+        return result
+
+    def add_spans(self, spans):
+        """Merge spans recorded by another Tracer (e.g. in a worker process)."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def chrome_trace(self):
+        """Trace Event Format dict: one complete ('X') event per span, in microseconds."""
+        events = [{
+            'name': span['name'],
+            'cat': span['cat'],
+            'ph': 'X',
+            'ts': (span['start_ns'] - self.start_ns) / 1000,
+            'dur': span['wall_ns'] / 1000,
+            'pid': span['pid'],
+            'tid': span['tid'],
+            'args': {
+                'cpu_ms': span['cpu_ns'] / 1e6,
+                'rows_in': span['rows_in'],
+                'rows_out': span['rows_out'],
+                'peak_mb': span['peak_mb'],
+            },
+        } for span in sorted(self.spans, key=lambda s: s['start_ns'])]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        """Write chrome_trace() as JSON to path."""
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self, categories=('stage',)):
+        """
+        Table with one line per span of the given categories, in start order.
+
+        Returns:
+            The table as a string
+        """
+        spans = sorted((s for s in self.spans if s['cat'] in categories), key=lambda s: s['start_ns'])
+        lines = [f"{'name':<34} {'wall ms':>10} {'cpu ms':>10} {'rows in':>10} {'rows out':>10} {'peak MB':>9}"]
+        lines.append("-" * len(lines[0]))
+        for span in spans:
+            rows_in = f"{span['rows_in']:,}" if span['rows_in'] is not None else "-"
+            rows_out = f"{span['rows_out']:,}" if span['rows_out'] is not None else "-"
+            peak = f"{span['peak_mb']:.1f}" if span['peak_mb'] is not None else "-"
+            lines.append(f"{span['name']:<34} {span['wall_ns'] / 1e6:>10.1f} {span['cpu_ns'] / 1e6:>10.1f} "
+                         f"{rows_in:>10} {rows_out:>10} {peak:>9}")
+        return "\n".join(lines)
+
+    def _stack(self):
+        """This thread's open spans."""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _memory_now(self):
+        """Traced bytes (memory=True) or peak RSS bytes at span start."""
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            stack = self._stack()
+            if stack:
+                # Keep the enclosing span's peak before resetting it for this one
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            return current
+        return _peak_rss_bytes()
+
+    def _memory_growth(self, frame, stack):
+        """MiB the span's peak rose above its starting point."""
+        if self.memory:
+            peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            return max(peak - frame['base'], 0) / 1024 ** 2
+        rss = _peak_rss_bytes()
+        if rss is None or frame['base'] is None:
+            return None
+        return (rss - frame['base']) / 1024 ** 2
+
+
+def activate(tracer):
+    """Make tracer receive spans from traced functions and pipeline stages."""
+    global _active
+    if tracer.memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _active = tracer
+    return tracer
+
+
+def deactivate():
+    """Stop tracing; traced functions go back to plain calls."""
+    global _active
+    if _active is not None and _active.memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _active = None
+
+
+def active_tracer():
+    """The active Tracer, or None when tracing is off."""
+    return _active
+
+
+def span(name, category='function', rows_in=None):
+    """Tracer.span on the active tracer; a no-op context when tracing is off."""
+    tracer = _active
+    if tracer is None:
+        return nullcontext({})
+    return tracer.span(name, category, rows_in)
+
+
+def traced(func=None, *, name=None, category='function'):
+    """
+    Decorator: record each call of func as a span while a tracer is active.
+
+    Usable bare (@traced) or with options (@traced(name='...')).
+    """
+    if func is None:
+        return functools.partial(traced, name=name, category=category)
+    span_name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        tracer = _active
+        if tracer is None:
+            return func(*args, **kwargs)
+        return tracer.call(span_name, category, func, args, kwargs)
+
+    return wrapper
+
+
+def _rows(args, kwargs=None):
+    """
+    Total rows among args: DataFrames, Series and arrays, plus sized objects
+    such as SaaSDataset and PlanChangeLedger (None if there are none).
+    """
+    total, found = 0, False
+    for value in list(args) + list((kwargs or {}).values()):
+        if isinstance(value, np.ndarray) and value.ndim == 0:
+            continue
+        if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)) or (
+                hasattr(value, '__len__') and not isinstance(value, (str, bytes, dict, list, tuple, set))):
+            total += len(value)
+            found = True
+    return total if found else None
+
+
+def _peak_rss_bytes():
+    """Peak resident set size of this process in bytes (None where unavailable)."""
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
@@ -5,6 +5,10 @@ Unit Economics - CAC and LTV calculations
 import pandas as pd
 import numpy as np
 
+from dataset import as_dataset
+from segments import DEFAULT_GROUPING_SETS, grouping_sets_summary
+from tracing import traced
+
 
 # Plan pricing
 PLAN_PRICING = {
@@ -14,93 +18,80 @@ PLAN_PRICING = {
 }
 
 
+@traced
 def calculate_unit_economics(users_df):
     """
     Calculate CAC, LTV, and LTV:CAC ratio for each user.
     
     Args:
-        users_df: DataFrame with user lifecycle data
+        users_df: DataFrame with user lifecycle data (or a SaaSDataset)
         
     Returns:
         DataFrame with unit economics per user
     """
-    economics = []
+    data = as_dataset(users_df)
+    users_df = data.users
     
-    for _, user in users_df.iterrows():
-        # CAC is already in the data
-        cac = user['cac']
-        
-        # LTV = Plan price × (lifetime_days / 30)
-        monthly_price = PLAN_PRICING.get(user['current_plan'], 0)
-        lifetime_months = user['lifetime_days'] / 30.0
-        ltv = monthly_price * lifetime_months
-        
-        # LTV:CAC ratio
-        ltv_cac_ratio = ltv / cac if cac > 0 else 0
-        
-        economics.append({
-            'user_id': user['user_id'],
-            'acquisition_channel': user['acquisition_channel'],
-            'current_plan': user['current_plan'],
-            'cac': cac,
-            'lifetime_days': user['lifetime_days'],
-            'lifetime_months': round(lifetime_months, 2),
-            'monthly_price': monthly_price,
-            'ltv': round(ltv, 2),
-            'ltv_cac_ratio': round(ltv_cac_ratio, 2),
-            'churned': user['churned']
-        })
+    # CAC is already in the data
+    cac = users_df['cac'].to_numpy(dtype=float)
+    
+    # LTV = Plan price × (lifetime_days / 30)
+    monthly_price = data.plan_price
+    lifetime_months = users_df['lifetime_days'].to_numpy() / 30.0
+    ltv = monthly_price * lifetime_months
     
-    return pd.DataFrame(economics)
+    # LTV:CAC ratio
+    ltv_cac_ratio = np.divide(ltv, cac, out=np.zeros(len(users_df)), where=cac > 0)
+    
+    return pd.DataFrame({
+        'user_id': users_df['user_id'].to_numpy(),
+        'acquisition_channel': users_df['acquisition_channel'].to_numpy(),
+        'current_plan': users_df['current_plan'].to_numpy(),
+        'cac': users_df['cac'].to_numpy(),
+        'lifetime_days': users_df['lifetime_days'].to_numpy(),
+        'lifetime_months': _round_half_even(lifetime_months, 2),
+        'monthly_price': monthly_price,
+        'ltv': _round_half_even(ltv, 2),
+        'ltv_cac_ratio': _round_half_even(ltv_cac_ratio, 2),
+        'churned': users_df['churned'].to_numpy()
+    })
 
 
-def calculate_unit_economics_summary(economics_df):
+def _round_half_even(values, decimals):
+    """
+    Round like Python's round(): correctly rounded on the exact binary value.
+
+    np.round scales by 10**decimals first, which can flip ties such as 0.285.
+    Values whose scaled form sits within float noise of a .5 tie are re-rounded
+    through round(); everything else keeps the fast np.round result.
+    """
+    rounded = np.round(values, decimals)
+    scaled = values * 10.0 ** decimals
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(float(v), decimals) for v in values[near_tie]]
+    return rounded
+
+
+@traced
+def calculate_unit_economics_summary(economics_df, grouping_sets=DEFAULT_GROUPING_SETS):
     """
     Calculate summary statistics for unit economics.
     
     Args:
         economics_df: DataFrame with unit economics
+        grouping_sets: Segments to report (see segments.cube). Defaults to
+            Overall, per channel and per plan.
         
     Returns:
         DataFrame with summary metrics
     """
-    summaries = []
-    
-    # Overall
-    summaries.append({
-        'segment': 'Overall',
-        'users': len(economics_df),
-        'avg_cac': economics_df['cac'].mean(),
-        'avg_ltv': economics_df['ltv'].mean(),
-        'avg_ltv_cac_ratio': economics_df['ltv_cac_ratio'].mean(),
-        'median_ltv_cac_ratio': economics_df['ltv_cac_ratio'].median()
-    })
-    
-    # By channel
-    for channel in economics_df['acquisition_channel'].unique():
-        channel_data = economics_df[economics_df['acquisition_channel'] == channel]
-        summaries.append({
-            'segment': f'Channel: {channel}',
-            'users': len(channel_data),
-            'avg_cac': channel_data['cac'].mean(),
-            'avg_ltv': channel_data['ltv'].mean(),
-            'avg_ltv_cac_ratio': channel_data['ltv_cac_ratio'].mean(),
-            'median_ltv_cac_ratio': channel_data['ltv_cac_ratio'].median()
-        })
-    
-    # By plan
-    for plan in economics_df['current_plan'].unique():
-        plan_data = economics_df[economics_df['current_plan'] == plan]
-        summaries.append({
-            'segment': f'Plan: {plan}',
-            'users': len(plan_data),
-            'avg_cac': plan_data['cac'].mean(),
-            'avg_ltv': plan_data['ltv'].mean(),
-            'avg_ltv_cac_ratio': plan_data['ltv_cac_ratio'].mean(),
-            'median_ltv_cac_ratio': plan_data['ltv_cac_ratio'].median()
-        })
-    
-    return pd.DataFrame(summaries)
+    return grouping_sets_summary(economics_df, grouping_sets, 'users', [
+        ('avg_cac', 'cac', 'mean'),
+        ('avg_ltv', 'ltv', 'mean'),
+        ('avg_ltv_cac_ratio', 'ltv_cac_ratio', 'mean'),
+        ('median_ltv_cac_ratio', 'ltv_cac_ratio', 'median')
+    ])
 
 
 if __name__ == "__main__":
@@ -7,14 +7,35 @@ See docs/SCHEMA.md for exported CSV schema (data/raw_sample/)
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
-# Set seed for reproducibility
+# Set seed for reproducibility of unseeded loop runs (module demos)
 np.random.seed(42)
 
+# Users per shard of the columnar generator. Shard boundaries (and therefore the
+# random stream of every user) depend only on this, never on the worker count.
+SHARD_SIZE = 250_000
 
-def generate_user_lifecycle(num_users=10000, start_date='2022-01-01', end_date='2024-12-31'):
+# Acquisition channels with weights
+CHANNELS = ['organic_search', 'paid_ads', 'referral', 'sales_outbound', 'content_marketing']
+CHANNEL_WEIGHTS = [0.30, 0.25, 0.20, 0.15, 0.10]
+
+# CAC distribution per channel: (mean, std) of a normal, floored at 0
+CHANNEL_CAC_PARAMS = {
+    'organic_search': (200, 50),
+    'paid_ads': (500, 100),
+    'referral': (100, 30),
+    'sales_outbound': (800, 150),
+    'content_marketing': (150, 40)
+}
+
+PLANS = ['Free', 'Basic', 'Pro']
+
+
+def generate_user_lifecycle(num_users=10000, start_date='2022-01-01', end_date='2024-12-31',
+                            vectorized=None, seed=None, n_workers=1, shard_size=SHARD_SIZE):
     """
     Generate complete user lifecycle data.
     
@@ -22,35 +43,70 @@ def generate_user_lifecycle(num_users=10000, start_date='2022-01-01', end_date='
         num_users: Number of users to generate
         start_date: Simulation start date
         end_date: Simulation end date
+        vectorized: Draw every random quantity for all users as arrays instead
+            of looping per user. Same distributions and columns, different
+            random stream. Defaults to True when seed or n_workers > 1 is
+            given, else False.
+        seed: Root seed for the columnar generator. With vectorized=False it
+            seeds the loop instead (seed=42 reproduces the import-time seeded
+            global stream). Without it both generators draw from np.random.
+        n_workers: Number of processes generating shards in parallel. Implies
+            vectorized=True; values other than 1 raise ValueError with
+            vectorized=False. The result does not depend on this value.
+        shard_size: Users per shard; each shard draws from its own child
+            stream spawned from the root seed. Vectorized generator only.
         
     Returns:
         DataFrame with user lifecycle data
     """
     start = pd.to_datetime(start_date)
     end = pd.to_datetime(end_date)
+
+    if vectorized is None:
+        vectorized = seed is not None or n_workers > 1
+    elif not vectorized and n_workers != 1:
+        raise ValueError("n_workers applies to the vectorized generator only; pass vectorized=True")
+    if vectorized:
+        if seed is None:
+            # Derive the root seed from the global state so np.random.seed() still applies
+            seed = np.random.randint(0, 2**31 - 1)
+        df = _generate_sharded(num_users, start, end, seed, n_workers, shard_size)
+    elif seed is not None:
+        df = _generate_user_loop(num_users, start, end, np.random.RandomState(seed))
+    else:
+        df = _generate_user_loop(num_users, start, end)
+
+    print(f"Generated {len(df)} users")
+    print(f"Activated: {df['activated'].sum()} ({df['activated'].mean()*100:.1f}%)")
+    print(f"Converted to paid: {df['converted_to_paid'].sum()} ({df['converted_to_paid'].mean()*100:.1f}%)")
+    print(f"Churned: {df['churned'].sum()} ({df['churned'].mean()*100:.1f}%)")
+    
+    return df
+
+
+def _generate_user_loop(num_users, start, end, random=np.random):
+    """
+    Per-user reference simulation.
+
+    random is np.random (the global state) or a np.random.RandomState,
+    which draws the same stream as np.random.seed() with its seed.
+    """
     total_days = (end - start).days
     
     users = []
     
-    # Acquisition channels with weights
-    channels = ['organic_search', 'paid_ads', 'referral', 'sales_outbound', 'content_marketing']
-    channel_weights = [0.30, 0.25, 0.20, 0.15, 0.10]
-    
-    # Plans with conversion rates
-    plans = ['Free', 'Basic', 'Pro']
-    
     for i in range(num_users):
         # Sign-up date (weighted towards recent dates)
-        days_offset = int(np.random.beta(2, 5) * total_days)
+        days_offset = int(random.beta(2, 5) * total_days)
         sign_up_date = start + timedelta(days=days_offset)
         
         # Acquisition channel
-        channel = np.random.choice(channels, p=channel_weights)
+        channel = random.choice(CHANNELS, p=CHANNEL_WEIGHTS)
         
         # Initial plan (80% start on Free)
-        if np.random.random() < 0.80:
+        if random.random() < 0.80:
             initial_plan = 'Free'
-        elif np.random.random() < 0.70:
+        elif random.random() < 0.70:
             initial_plan = 'Basic'
         else:
             initial_plan = 'Pro'
@@ -58,18 +114,18 @@ def generate_user_lifecycle(num_users=10000, start_date='2022-01-01', end_date='
         current_plan = initial_plan
         
         # Activation (did they use the product?)
-        activated = np.random.random() < 0.65  # 65% activation rate
+        activated = random.random() < 0.65  # 65% activation rate
         
         # Conversion to paid (if started Free)
         converted_to_paid = False
         conversion_date = None
         if initial_plan == 'Free' and activated:
-            if np.random.random() < 0.25:  # 25% conversion rate
+            if random.random() < 0.25:  # 25% conversion rate
                 converted_to_paid = True
                 # Convert within 30 days typically
-                days_to_convert = int(np.random.exponential(15))
+                days_to_convert = int(random.exponential(15))
                 conversion_date = sign_up_date + timedelta(days=days_to_convert)
-                current_plan = 'Basic' if np.random.random() < 0.70 else 'Pro'
+                current_plan = 'Basic' if random.random() < 0.70 else 'Pro'
         
         # Upgrades/downgrades
         upgrade_events = []
@@ -77,8 +133,8 @@ def generate_user_lifecycle(num_users=10000, start_date='2022-01-01', end_date='
         
         if converted_to_paid:
             # Chance of upgrade
-            if current_plan == 'Basic' and np.random.random() < 0.20:
-                upgrade_date = conversion_date + timedelta(days=int(np.random.exponential(60)))
+            if current_plan == 'Basic' and random.random() < 0.20:
+                upgrade_date = conversion_date + timedelta(days=int(random.exponential(60)))
                 if upgrade_date < end:
                     upgrade_events.append({
                         'date': upgrade_date,
@@ -88,8 +144,8 @@ def generate_user_lifecycle(num_users=10000, start_date='2022-01-01', end_date='
                     current_plan = 'Pro'
             
             # Chance of downgrade
-            if current_plan == 'Pro' and np.random.random() < 0.10:
-                downgrade_date = conversion_date + timedelta(days=int(np.random.exponential(90)))
+            if current_plan == 'Pro' and random.random() < 0.10:
+                downgrade_date = conversion_date + timedelta(days=int(random.exponential(90)))
                 if downgrade_date < end:
                     downgrade_events.append({
                         'date': downgrade_date,
@@ -117,9 +173,9 @@ def generate_user_lifecycle(num_users=10000, start_date='2022-01-01', end_date='
             churn_prob = 0.15
             avg_lifetime = 365
         
-        if np.random.random() < churn_prob:
+        if random.random() < churn_prob:
             churned = True
-            days_to_churn = int(np.random.exponential(avg_lifetime))
+            days_to_churn = int(random.exponential(avg_lifetime))
             churn_date = sign_up_date + timedelta(days=days_to_churn)
             if churn_date > end:
                 churn_date = None
@@ -129,11 +185,11 @@ def generate_user_lifecycle(num_users=10000, start_date='2022-01-01', end_date='
         
         # CAC (varies by channel)
         cac_by_channel = {
-            'organic_search': np.random.normal(200, 50),
-            'paid_ads': np.random.normal(500, 100),
-            'referral': np.random.normal(100, 30),
-            'sales_outbound': np.random.normal(800, 150),
-            'content_marketing': np.random.normal(150, 40)
+            'organic_search': random.normal(200, 50),
+            'paid_ads': random.normal(500, 100),
+            'referral': random.normal(100, 30),
+            'sales_outbound': random.normal(800, 150),
+            'content_marketing': random.normal(150, 40)
         }
         cac = max(0, cac_by_channel[channel])
         
@@ -148,20 +204,151 @@ def generate_user_lifecycle(num_users=10000, start_date='2022-01-01', end_date='
             'conversion_date': conversion_date,
             'num_upgrades': len(upgrade_events),
             'num_downgrades': len(downgrade_events),
+            'upgrade_date': upgrade_events[0]['date'] if upgrade_events else None,
+            'downgrade_date': downgrade_events[0]['date'] if downgrade_events else None,
             'churned': churned,
             'churn_date': churn_date,
             'lifetime_days': lifetime_days,
             'cac': round(cac, 2)
         })
     
-    df = pd.DataFrame(users)
-    
-    print(f"Generated {len(df)} users")
-    print(f"Activated: {df['activated'].sum()} ({df['activated'].mean()*100:.1f}%)")
-    print(f"Converted to paid: {df['converted_to_paid'].sum()} ({df['converted_to_paid'].mean()*100:.1f}%)")
-    print(f"Churned: {df['churned'].sum()} ({df['churned'].mean()*100:.1f}%)")
-    
-    return df
+    return pd.DataFrame(users)
+
+
+def _generate_sharded(num_users, start, end, seed, n_workers, shard_size):
+    """
+    Generate users in fixed-size shards, one independent child stream per shard.
+
+    Shard i covers users [i * shard_size, (i + 1) * shard_size) and draws from
+    SeedSequence(seed).spawn(num_shards)[i], so the concatenated frame is the
+    same for any n_workers.
+    """
+    num_shards = max(1, -(-num_users // shard_size))
+    tasks = [_shard_task(i, num_users, start, end, seed, shard_size) for i in range(num_shards)]
+
+    if n_workers > 1 and num_shards > 1:
+        with ProcessPoolExecutor(max_workers=min(n_workers, num_shards)) as pool:
+            shards = list(pool.map(_generate_shard, tasks))
+    else:
+        shards = [_generate_shard(task) for task in tasks]
+
+    return pd.concat(shards, ignore_index=True)
+
+
+def generate_user_chunks(num_users, start_date='2022-01-01', end_date='2024-12-31', seed=42,
+                         chunk_size=SHARD_SIZE, first_chunk=0):
+    """
+    Yield users one chunk at a time, for generators that must not hold all users.
+
+    Chunk i is shard i of generate_user_lifecycle(seed=seed, shard_size=chunk_size),
+    so the chunks concatenate to the same frame and any chunk can be
+    regenerated on its own (resuming from first_chunk).
+
+    Yields:
+        Tuple of (chunk index, users DataFrame)
+    """
+    start = pd.to_datetime(start_date)
+    end = pd.to_datetime(end_date)
+    num_chunks = max(1, -(-num_users // chunk_size))
+    for i in range(first_chunk, num_chunks):
+        yield i, _generate_shard(_shard_task(i, num_users, start, end, seed, chunk_size))
+
+
+def _shard_task(i, num_users, start, end, seed, shard_size):
+    """Arguments for shard i; its stream is SeedSequence(seed).spawn(...)[i]."""
+    child_seed = np.random.SeedSequence(seed, spawn_key=(i,))
+    return (min(shard_size, num_users - i * shard_size), start, end, child_seed, i * shard_size + 1)
+
+
+def _generate_shard(task):
+    """Process-pool entry point: generate one shard from its child seed."""
+    num_users, start, end, seed_seq, first_id = task
+    return _generate_user_batch(num_users, start, end, np.random.default_rng(seed_seq), first_id)
+
+
+def _generate_user_batch(num_users, start, end, rng, first_id=1):
+    """
+    Columnar simulation: every random quantity is drawn for all users at once.
+
+    Mirrors the branch structure of _generate_user_loop with boolean masks.
+    Users are numbered from first_id.
+    """
+    n = num_users
+    total_days = (end - start).days
+    start64 = np.datetime64(start, 'ns')
+    end64 = np.datetime64(end, 'ns')
+    nat = np.datetime64('NaT', 'ns')
+
+    def days(values):
+        return values.astype('timedelta64[D]').astype('timedelta64[ns]')
+
+    # Sign-up date (weighted towards recent dates)
+    days_offset = (rng.beta(2, 5, n) * total_days).astype(np.int64)
+    sign_up_date = start64 + days(days_offset)
+
+    # Acquisition channel
+    channel_idx = rng.choice(len(CHANNELS), size=n, p=CHANNEL_WEIGHTS)
+
+    # Initial plan (80% start on Free, then 70/30 Basic/Pro); plan codes index PLANS
+    initial_plan = np.where(rng.random(n) < 0.80, 0, np.where(rng.random(n) < 0.70, 1, 2))
+
+    # Activation (65%) and conversion to paid for activated Free users (25%)
+    activated = rng.random(n) < 0.65
+    converted_to_paid = (initial_plan == 0) & activated & (rng.random(n) < 0.25)
+    days_to_convert = rng.exponential(15, n).astype(np.int64)
+    conversion_date = np.where(converted_to_paid, sign_up_date + days(days_to_convert), nat)
+    paid_plan = np.where(rng.random(n) < 0.70, 1, 2)
+    current_plan = np.where(converted_to_paid, paid_plan, initial_plan)
+
+    # Upgrade Basic -> Pro (20%), then downgrade Pro -> Basic (10%)
+    upgrade_date = conversion_date + days(rng.exponential(60, n).astype(np.int64))
+    upgraded = (converted_to_paid & (current_plan == 1) & (rng.random(n) < 0.20)
+                & (upgrade_date < end64))
+    current_plan = np.where(upgraded, 2, current_plan)
+
+    downgrade_date = conversion_date + days(rng.exponential(90, n).astype(np.int64))
+    downgraded = (converted_to_paid & (current_plan == 2) & (rng.random(n) < 0.10)
+                  & (downgrade_date < end64))
+    current_plan = np.where(downgraded, 1, current_plan)
+
+    # Churn probability and average lifetime based on plan and activation
+    segments = [~activated, current_plan == 0, current_plan == 1]
+    churn_prob = np.select(segments, [0.80, 0.60, 0.30], default=0.15)
+    avg_lifetime = np.select(segments, [7, 45, 180], default=365)
+
+    days_to_churn = rng.exponential(avg_lifetime).astype(np.int64)
+    churn_date = sign_up_date + days(days_to_churn)
+    churned = (rng.random(n) < churn_prob) & (churn_date <= end64)
+    churn_date = np.where(churned, churn_date, nat)
+    days_to_end = (end64 - sign_up_date).astype('timedelta64[D]').astype(np.int64)
+    lifetime_days = np.where(churned, days_to_churn, days_to_end)
+
+    # CAC (varies by channel)
+    cac_mean = np.array([CHANNEL_CAC_PARAMS[c][0] for c in CHANNELS], dtype=float)
+    cac_std = np.array([CHANNEL_CAC_PARAMS[c][1] for c in CHANNELS], dtype=float)
+    cac = np.maximum(0, rng.normal(cac_mean[channel_idx], cac_std[channel_idx]))
+
+    plans = np.array(PLANS, dtype=object)
+    ids = pd.Series(np.arange(first_id, first_id + n)).astype(str).str.zfill(6)
+
+    return pd.DataFrame({
+        'user_id': ('U' + ids).to_numpy(dtype=object),
+        'sign_up_date': sign_up_date,
+        'acquisition_channel': np.array(CHANNELS, dtype=object)[channel_idx],
+        'initial_plan': plans[initial_plan],
+        'current_plan': plans[current_plan],
+        'activated': activated,
+        'converted_to_paid': converted_to_paid,
+        'conversion_date': conversion_date,
+        'num_upgrades': upgraded.astype(np.int64),
+        'num_downgrades': downgraded.astype(np.int64),
+        'upgrade_date': np.where(upgraded, upgrade_date, nat),
+        'downgrade_date': np.where(downgraded, downgrade_date, nat),
+        'churned': churned,
+        'churn_date': churn_date,
+        'lifetime_days': lifetime_days,
+        'cac': np.round(cac, 2)
+    })
 
 
 if __name__ == "__main__":
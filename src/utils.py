@@ -67,6 +67,79 @@ CHANNEL_CAC = {
 }
 
 
+# Ordinal assigned to missing dates; sorts after every real period
+NO_PERIOD = np.iinfo(np.int64).max
+
+
+def period_ordinals(dates, freq='M'):
+    """
+    Convert dates to pandas Period ordinals for the given frequency.
+
+    Missing dates map to NO_PERIOD, i.e. "never" when used as an end bound.
+    """
+    dates = pd.to_datetime(pd.Series(dates))
+    values = dates.to_numpy(dtype='datetime64[ns]')
+    missing = np.isnat(values)
+
+    if freq == 'M':
+        ordinals = values.astype('datetime64[M]').astype(np.int64)
+    elif freq == 'D':
+        ordinals = values.astype('datetime64[D]').astype(np.int64)
+    else:
+        ordinals = dates.dt.to_period(freq).array.asi8.copy()
+
+    ordinals[missing] = NO_PERIOD
+    return ordinals
+
+
+def period_floor(dates, freq='M'):
+    """Start timestamp of the period containing each date (NaT stays NaT)."""
+    dates = pd.to_datetime(pd.Series(dates))
+    if freq in ('M', 'D'):
+        unit = 'datetime64[M]' if freq == 'M' else 'datetime64[D]'
+        values = dates.to_numpy(dtype='datetime64[ns]')
+        return values.astype(unit).astype('datetime64[ns]')
+    return dates.dt.to_period(freq).dt.start_time.to_numpy(dtype='datetime64[ns]')
+
+
+def period_starts(first_ordinal, num_periods, freq='M'):
+    """Start timestamps of num_periods consecutive periods from first_ordinal."""
+    first = pd.Period(ordinal=int(first_ordinal), freq=freq)
+    return pd.period_range(start=first, periods=num_periods, freq=freq).to_timestamp()
+
+
+def sweep_active_counts(start, end, num_periods, weights=None):
+    """
+    Count intervals [start, end) covering each period 0..num_periods-1.
+
+    Sweep line over a difference array: +1 (or +weight) at start, -1 at end,
+    then one cumulative sum. Ends past the horizon are simply never subtracted.
+
+    Args:
+        start: Start period index per interval (0-based, < num_periods)
+        end: Exclusive end period index per interval (may exceed num_periods)
+        num_periods: Number of periods in the horizon
+        weights: Optional value per interval (e.g. plan price) to sum instead of count
+
+    Returns:
+        Array of length num_periods
+    """
+    start = np.asarray(start, dtype=np.int64)
+    end = np.maximum(np.asarray(end, dtype=np.int64), start)
+    if weights is None:
+        weights = np.ones(len(start), dtype=np.int64)
+    weights = np.asarray(weights)
+
+    closes = end < num_periods
+    diff = (np.bincount(start, weights=weights, minlength=num_periods)
+            - np.bincount(end[closes], weights=weights[closes], minlength=num_periods))
+    active = np.cumsum(diff)
+
+    if np.issubdtype(weights.dtype, np.integer):
+        active = np.rint(active).astype(np.int64)
+    return active
+
+
 def get_plan_price(plan_name):
     """Get price for a plan."""
     return PLAN_PRICING.get(plan_name, 0)
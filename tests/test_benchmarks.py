@@ -0,0 +1,45 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
+import json
+import pytest
+import bench_scaling
+from bench_scaling import BENCHMARKS, compare_to_baseline, scaling_exponents
+
+
+def _results(seconds_by_size, name='f', peak_mb=10.0):
+    return [{'benchmark': name, 'size': size, 'seconds': seconds, 'peak_mb': peak_mb}
+            for size, seconds in seconds_by_size.items()]
+
+
+def test_scaling_exponent_uses_largest_sizes():
+    linear = _results({1_000: 0.001, 10_000: 0.02, 100_000: 0.2}, 'linear')
+    quadratic = _results({1_000: 0.01, 10_000: 1.0}, 'quadratic')
+    exponents = scaling_exponents(linear + quadratic + _results({1_000: 0.001}, 'tiny'))
+
+    assert exponents['linear'] == pytest.approx(1.0)
+    assert exponents['quadratic'] == pytest.approx(2.0)
+    assert exponents['tiny'] is None
+
+
+def test_baseline_comparison_thresholds():
+    baseline = _results({1_000: 0.004, 10_000: 0.1})
+    # 2x at 1k is under the 100ms floor; +20% at 10k is under the threshold
+    assert compare_to_baseline(_results({1_000: 0.008, 10_000: 0.12}), baseline) == []
+
+    slower = compare_to_baseline(_results({10_000: 0.3}), baseline)
+    assert slower == [('f', 10_000, 'seconds', 0.1, 0.3)]
+
+    bigger = compare_to_baseline(_results({10_000: 0.1}, peak_mb=20.0), baseline)
+    assert [r[2] for r in bigger] == ['peak_mb']
+
+
+def test_suite_runs_and_matches_baseline_schema(tmp_path):
+    assert bench_scaling.main(['--sizes', '300', '--only', 'compute_rfm', 'calculate_revenue_metrics',
+                               '--repeat', '1', '--output', str(tmp_path / 'results.json')]) == 0
+    results = json.loads((tmp_path / 'results.json').read_text())
+    baseline = json.loads(bench_scaling.BASELINE_PATH.read_text())
+
+    assert {r['benchmark'] for r in results['results']} == {'compute_rfm', 'calculate_revenue_metrics'}
+    assert set(results) == set(baseline)
+    assert {r['benchmark'] for r in baseline['results']} == set(BENCHMARKS)
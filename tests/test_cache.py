@@ -0,0 +1,81 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pickle
+import pandas as pd
+import pytest
+from cache import ResultCache, cached_call
+from dataset import SaaSDataset
+from revenue import calculate_revenue_metrics
+from user_simulation import generate_user_lifecycle
+
+
+CALLS = []
+
+
+def _total(df, column='amount'):
+    CALLS.append(column)
+    return df[column].sum()
+
+
+def _payload(size):
+    return b'x' * size
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'amount': [1.0, 2.0, 3.0], 'plan': ['Free', 'Basic', 'Pro']})
+
+
+def test_hits_reuse_results(tmp_path, frame):
+    CALLS.clear()
+    cache = ResultCache(tmp_path)
+    assert cache.call(_total, frame) == 6.0
+    assert cache.call(_total, frame.copy()) == 6.0
+    assert CALLS == ['amount']
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+    # A fresh instance over the same directory sees the stored result
+    assert ResultCache(tmp_path).call(_total, frame) == 6.0
+    assert len(CALLS) == 1
+
+
+def test_key_tracks_values_and_parameters(tmp_path, frame):
+    cache = ResultCache(tmp_path)
+    key = cache.key(_total, (frame,))
+    changed = frame.copy()
+    changed.loc[1, 'amount'] = 2.5
+
+    assert cache.key(_total, (frame.copy(),)) == key
+    assert cache.key(_total, (changed,)) != key
+    assert cache.key(_total, (frame,), {'column': 'amount'}) != key
+    assert cache.key(_total, (frame.astype({'amount': 'float32'}),)) != key
+    assert cache.key(_payload, (frame,)) != key
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=2500)
+    for i, size in enumerate((1000, 1001, 1002)):
+        cache.call(_payload, size)
+        # Pin access times apart so the order does not depend on clock resolution
+        os.utime(max(tmp_path.glob('*.pkl'), key=os.path.getmtime), (i + 1, i + 1))
+    assert cache.stats['evictions'] == 1
+    assert cache.size() <= 2500
+
+    # The oldest entry was dropped; the newest two are still hits
+    cache.call(_payload, 1001)
+    cache.call(_payload, 1002)
+    assert cache.stats['hits'] == 2
+
+
+def test_cached_dataset_results_match(tmp_path):
+    users = generate_user_lifecycle(num_users=500, seed=3)
+    memoized = ResultCache(tmp_path).memoize(calculate_revenue_metrics)
+    cold = memoized(SaaSDataset(users))
+    restored = pickle.loads(pickle.dumps(memoized))
+    warm = restored(SaaSDataset(users.copy()))
+
+    pd.testing.assert_frame_equal(cold, calculate_revenue_metrics(users))
+    pd.testing.assert_frame_equal(warm, cold)
+    assert restored.cache.stats['hits'] == 1
+    assert cached_call(None, calculate_revenue_metrics, users).equals(cold)
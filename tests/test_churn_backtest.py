@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from engine import backtest_churn_risk, churn_risk_precision_recall, compute_churn_risk
+
+DATA_DIR = Path(__file__).parent.parent / "data" / "raw_sample"
+REFERENCE_DATES = pd.date_range(end='2024-12-12', periods=30, freq='7D')
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return {name: pd.read_csv(DATA_DIR / f"{name}.csv") for name in ('subscriptions', 'events', 'support_tickets')}
+
+
+@pytest.fixture(scope="module")
+def panel(tables):
+    return backtest_churn_risk(tables['subscriptions'], tables['events'], tables['support_tickets'], REFERENCE_DATES)
+
+
+@pytest.mark.parametrize('reference_date', REFERENCE_DATES[[0, 17, -1]])
+def test_matches_compute_churn_risk_on_data_known_at_the_date(tables, panel, reference_date):
+    events, tickets = tables['events'], tables['support_tickets']
+    snapshot = panel[panel['reference_date'] == reference_date].reset_index(drop=True)
+    expected = compute_churn_risk(
+        snapshot[['customer_id']],
+        events[pd.to_datetime(events['event_timestamp']) <= reference_date],
+        tickets[pd.to_datetime(tickets['created_at']) <= reference_date],
+        reference_date,
+    )
+    pd.testing.assert_frame_equal(snapshot[expected.columns], expected)
+
+
+def test_live_customers_and_realized_churn():
+    subscriptions = pd.DataFrame({
+        'customer_id': ['A', 'B', 'C'],
+        'start_date': ['2024-01-01', '2024-01-01', '2024-03-01'],
+        'end_date': ['2024-02-20', None, None],
+    })
+    events = pd.DataFrame({
+        'customer_id': ['A', 'B', 'B', 'C'],
+        'event_name': ['login', 'login', 'feature_use', 'login'],
+        'event_timestamp': ['2024-01-25', '2024-01-30', '2024-02-01', '2024-03-02'],
+    })
+    panel = backtest_churn_risk(subscriptions, events, reference_dates=['2024-02-01', '2024-03-01'],
+                                horizon_days=30)
+
+    first = panel[panel['reference_date'] == '2024-02-01'].set_index('customer_id')
+    assert list(first.index) == ['A', 'B']
+    assert first['churned'].tolist() == [True, False]
+    assert first['days_since_login'].tolist() == [7, 2]
+    assert first['churn_risk'].tolist() == ['Medium', 'Low']
+
+    # A churned before March; C starts on the date but its login comes later
+    second = panel[panel['reference_date'] == '2024-03-01'].set_index('customer_id')
+    assert list(second.index) == ['B', 'C']
+    assert second.loc['C', 'days_since_login'] == 999
+
+    strict = backtest_churn_risk(subscriptions, events, reference_dates=['2024-02-01'], login_days=5)
+    assert strict.set_index('customer_id').loc['A', 'churn_risk'] == 'High'
+
+
+def test_precision_recall(panel):
+    pooled = churn_risk_precision_recall(panel).set_index('flagged_as')
+    by_date = churn_risk_precision_recall(panel, by_date=True)
+    assert len(by_date) == 2 * len(REFERENCE_DATES)
+
+    totals = by_date.groupby('flagged_as')[['customers', 'churned', 'flagged', 'true_positives']].sum()
+    pd.testing.assert_frame_equal(totals, pooled[totals.columns])
+
+    high = panel['churn_risk'] == 'High'
+    assert pooled.loc['High', 'precision'] == pytest.approx((high & panel['churned']).sum() / high.sum())
+    assert pooled.loc['High', 'recall'] <= pooled.loc['High+Medium', 'recall']
+    assert np.isnan(by_date.loc[by_date['churned'] == 0, 'recall']).all()
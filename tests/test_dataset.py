@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from pathlib import Path
+import pandas as pd
+import pytest
+from dataset import SaaSDataset
+from engine import compute_churn_risk
+from funnel import calculate_funnel_metrics, calculate_conversion_summary
+from metrics import compute_rfm
+from retention import (calculate_churn_rate_monthly, calculate_retention_metrics,
+                       generate_cohort_retention_matrix)
+from revenue import calculate_mrr_bridge, calculate_net_revenue_retention, calculate_revenue_metrics
+from unit_economics import calculate_unit_economics
+from user_simulation import generate_user_lifecycle
+
+DATA_DIR = Path(__file__).parent.parent / "data" / "raw_sample"
+REFERENCE_DATE = '2024-12-12'
+
+USER_FUNCTIONS = [
+    calculate_funnel_metrics,
+    calculate_conversion_summary,
+    calculate_retention_metrics,
+    calculate_churn_rate_monthly,
+    generate_cohort_retention_matrix,
+    calculate_revenue_metrics,
+    calculate_mrr_bridge,
+    calculate_net_revenue_retention,
+    calculate_unit_economics,
+]
+
+
+@pytest.fixture(scope="module")
+def users():
+    return generate_user_lifecycle(num_users=3000, seed=5)
+
+
+@pytest.mark.parametrize('func', USER_FUNCTIONS, ids=lambda f: f.__name__)
+def test_dataset_matches_dataframe(users, func):
+    pd.testing.assert_frame_equal(func(SaaSDataset(users)), func(users))
+
+
+def test_derivations_are_shared_and_inputs_untouched(users):
+    before = users.copy()
+    data = SaaSDataset(users)
+    for func in USER_FUNCTIONS:
+        func(data)
+
+    assert data.sign_up_month is data.periods('sign_up_date', 'M')
+    assert data.ledger is data.ledger
+    assert set(data._datetimes) == {('users', 'sign_up_date'), ('users', 'churn_date')}
+    pd.testing.assert_frame_equal(users, before)
+
+
+@pytest.mark.skipif(not DATA_DIR.exists(), reason="raw sample data not generated")
+def test_rfm_and_churn_risk_accept_dataset():
+    customers = pd.read_csv(DATA_DIR / "customers.csv")
+    transactions = pd.read_csv(DATA_DIR / "transactions.csv")
+    events = pd.read_csv(DATA_DIR / "events.csv")
+    tickets = pd.read_csv(DATA_DIR / "support_tickets.csv")
+    data = SaaSDataset(customers, transactions, events, tickets)
+
+    pd.testing.assert_frame_equal(
+        compute_rfm(data, reference_date=REFERENCE_DATE),
+        compute_rfm(customers, transactions, REFERENCE_DATE, events_df=events))
+    pd.testing.assert_frame_equal(
+        compute_churn_risk(data, reference_date=REFERENCE_DATE),
+        compute_churn_risk(customers, events, tickets, REFERENCE_DATE))
+    assert ('events', 'event_timestamp') in data._datetimes
+
+    with pytest.raises(ValueError, match='reference_date'):
+        compute_rfm(data)
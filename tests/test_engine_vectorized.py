@@ -0,0 +1,92 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from pathlib import Path
+import pandas as pd
+import pytest
+from engine import compute_churn_risk
+
+DATA_DIR = Path(__file__).parent.parent / "data" / "raw_sample"
+REFERENCE_DATE = '2024-12-12'
+
+
+def _loop_churn_risk(users_df, events_df, tickets_df, reference_date):
+    """Original per-customer implementation, kept as the parity reference."""
+    ref_date = pd.to_datetime(reference_date)
+    events_df = events_df.copy()
+    events_df['event_timestamp'] = pd.to_datetime(events_df['event_timestamp'])
+
+    churn_ticket_ids = set()
+    if tickets_df is not None and not tickets_df.empty:
+        bad_tickets = tickets_df[tickets_df['satisfaction_score'] < 2]
+        churn_ticket_ids = set(bad_tickets['customer_id'].unique())
+
+    grouped_events = events_df.groupby('customer_id')
+    risk_scores = []
+    for _, user in users_df.iterrows():
+        user_id = user['customer_id']
+        last_login = pd.NaT
+        last_feature = pd.NaT
+        if user_id in grouped_events.groups:
+            user_events = grouped_events.get_group(user_id)
+            logins = user_events[user_events['event_name'] == 'login']['event_timestamp']
+            if not logins.empty:
+                last_login = logins.max()
+            features = user_events[user_events['event_name'] == 'feature_use']['event_timestamp']
+            if not features.empty:
+                last_feature = features.max()
+
+        days_since_login = (ref_date - last_login).days if pd.notna(last_login) else 999
+        days_since_feature = (ref_date - last_feature).days if pd.notna(last_feature) else 999
+
+        risk = 'Low'
+        if days_since_login > 30 or user_id in churn_ticket_ids:
+            risk = 'High'
+        elif days_since_feature > 14:
+            risk = 'Medium'
+
+        risk_scores.append({
+            'customer_id': user_id,
+            'churn_risk': risk,
+            'days_since_active': min(days_since_login, days_since_feature)
+        })
+    return pd.DataFrame(risk_scores)
+
+
+@pytest.mark.skipif(not DATA_DIR.exists(), reason="raw sample data not generated")
+def test_vectorized_matches_loop_on_raw_sample():
+    customers = pd.read_csv(DATA_DIR / "customers.csv")
+    events = pd.read_csv(DATA_DIR / "events.csv")
+    tickets = pd.read_csv(DATA_DIR / "support_tickets.csv")
+
+    expected = _loop_churn_risk(customers, events, tickets, REFERENCE_DATE)
+    actual = compute_churn_risk(customers, events, tickets, REFERENCE_DATE)
+
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_customers_without_events_are_high_risk():
+    users = pd.DataFrame({'customer_id': ['U1', 'U2']})
+    events = pd.DataFrame({
+        'customer_id': ['U1'],
+        'event_name': ['page_view'],
+        'event_timestamp': ['2024-12-10']
+    })
+
+    risks = compute_churn_risk(users, events, None, REFERENCE_DATE)
+
+    assert list(risks['churn_risk']) == ['High', 'High']
+    assert list(risks['days_since_active']) == [999, 999]
+
+
+def test_does_not_mutate_events():
+    users = pd.DataFrame({'customer_id': ['U1']})
+    events = pd.DataFrame({
+        'customer_id': ['U1'],
+        'event_name': ['login'],
+        'event_timestamp': ['2024-12-10']
+    })
+
+    compute_churn_risk(users, events, None, REFERENCE_DATE)
+
+    assert events['event_timestamp'].dtype == object
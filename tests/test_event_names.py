@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pandas as pd
+import pytest
+from event_names import EventNameNormalizer, load_event_name_map, default_normalizer
+from ingest import load_table, stream_event_aggregates
+from engine import compute_churn_risk
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), '..', 'configs')
+
+
+def test_yaml_and_csv_maps_load():
+    yaml_map = load_event_name_map(os.path.join(CONFIG_DIR, 'event_name_map.yaml'))
+    assert yaml_map['sign_in'] == 'login'
+    assert yaml_map['core_action'] == 'feature_use'
+    assert yaml_map['login'] == 'login'
+
+    csv_map = load_event_name_map(os.path.join(CONFIG_DIR, 'event_name_map.csv'))
+    assert csv_map['logged_in'] == 'login'
+
+
+def test_conflicting_alias_rejected(tmp_path):
+    path = tmp_path / 'map.yaml'
+    path.write_text("login:\n  - x\nfeature_use:\n  - x\n")
+    with pytest.raises(ValueError):
+        load_event_name_map(path)
+
+
+def test_normalize_counts_unknown_names():
+    normalizer = EventNameNormalizer({'Login': 'login', 'login': 'login'})
+    names = pd.Series(['Login', 'mystery', 'login', None, 'mystery'], dtype='category')
+    result = normalizer.normalize(names)
+    assert list(result[:3]) == ['login', 'mystery', 'login']
+    assert pd.isna(result[3])
+    assert normalizer.unknown_counts == {'mystery': 2}
+
+
+@pytest.fixture
+def aliased_events(tmp_path):
+    pd.DataFrame({
+        'event_id': ['E1', 'E2', 'E3', 'E4'],
+        'customer_id': ['U1', 'U1', 'U2', 'U2'],
+        'event_name': ['user_login', 'FeatureUsed', 'sign_in', 'clicked_ad'],
+        'event_timestamp': ['2024-12-10', '2024-12-11', '2024-11-01', '2024-12-01']
+    }).to_csv(tmp_path / 'events.csv', index=False)
+    return tmp_path
+
+
+def test_ingest_normalizes_aliases(aliased_events):
+    with pytest.warns(UserWarning, match='clicked_ad'):
+        events = load_table('events', aliased_events, use_cache=False)
+    assert list(events['event_name']) == ['login', 'feature_use', 'login', 'clicked_ad']
+    assert events.attrs['unknown_event_names'] == {'clicked_ad': 1}
+
+    # Aliased logins now count toward churn risk
+    users = pd.DataFrame({'customer_id': ['U1', 'U2']})
+    risk = compute_churn_risk(users, events, reference_date='2024-12-12')
+    assert list(risk['churn_risk']) == ['Low', 'High']
+
+
+def test_streaming_normalizes_aliases(aliased_events):
+    with pytest.warns(UserWarning, match='clicked_ad'):
+        aggregates, report = stream_event_aggregates(aliased_events / 'events.csv', chunksize=2)
+    assert aggregates.loc['U2', 'last_login'] == pd.Timestamp('2024-11-01')
+    assert aggregates.loc['U1', 'last_feature_use'] == pd.Timestamp('2024-12-11')
+    assert report['unknown_event_names'] == {'clicked_ad': 1}
+
+
+def test_raw_sample_names_are_canonical():
+    events = load_table('events', use_cache=False)
+    assert events.attrs['unknown_event_names'] == {}
+    assert set(events['event_name'].unique()) <= set(default_normalizer().canonical)
@@ -0,0 +1,141 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+import pandas as pd
+import pytest
+import export_data_snapshots
+from export_data_snapshots import build_snapshots, build_snapshots_loop, _monthly_schedule
+from user_simulation import generate_user_lifecycle
+
+NUM_USERS = 4000
+
+
+@pytest.fixture(scope="module")
+def loop_and_vectorized():
+    users = generate_user_lifecycle(NUM_USERS, end_date='2024-12-12', seed=11)
+    np.random.seed(5)
+    loop = build_snapshots_loop(users)
+    vectorized = build_snapshots(users, np.random.default_rng(5))
+    return users, loop, vectorized
+
+
+def test_month_end_drift_matches_dateoffset():
+    start = np.array(['2024-01-31', '2023-05-15'], dtype='datetime64[ns]')
+    end = np.array(['2024-06-30', '2023-07-14'], dtype='datetime64[ns]')
+    dates, owner = _monthly_schedule(start, end)
+
+    expected = []
+    for s, e in zip(pd.to_datetime(start), pd.to_datetime(end)):
+        current = s
+        while current <= e:
+            expected.append(current)
+            current += pd.DateOffset(months=1)
+    assert list(pd.to_datetime(dates)) == expected
+    assert list(owner) == [0] * 6 + [1] * 2
+
+
+@pytest.mark.parametrize('table', ['transactions', 'subscriptions'])
+def test_deterministic_tables_match_loop(loop_and_vectorized, table):
+    _, loop, vectorized = loop_and_vectorized
+    pd.testing.assert_frame_equal(vectorized[table], loop[table])
+
+
+@pytest.mark.parametrize('table', ['customers', 'events', 'support_tickets'])
+def test_same_columns_and_dtypes(loop_and_vectorized, table):
+    _, loop, vectorized = loop_and_vectorized
+    assert list(vectorized[table].columns) == list(loop[table].columns)
+    assert vectorized[table].dtypes.equals(loop[table].dtypes)
+
+
+def test_event_distribution_matches_loop(loop_and_vectorized):
+    users, loop, vectorized = loop_and_vectorized
+    for events in (loop['events'], vectorized['events']):
+        per_user = events.groupby('customer_id').size()
+        assert per_user.between(5, 20).all()
+        assert set(per_user.index) == set(users.loc[users['activated'], 'user_id'])
+
+    # Mean events per user (uniform 5..20: mean 12.5, sd ~4.6)
+    n_active = users['activated'].sum()
+    se = 4.61 / np.sqrt(n_active)
+    assert abs(len(loop['events']) - len(vectorized['events'])) / n_active < 6 * se
+
+    shares = pd.concat([
+        loop['events']['event_name'].value_counts(normalize=True),
+        vectorized['events']['event_name'].value_counts(normalize=True)
+    ], axis=1)
+    assert (shares.iloc[:, 0] - shares.iloc[:, 1]).abs().max() < 0.02
+
+
+def test_event_timestamps_within_user_window(loop_and_vectorized):
+    users, _, vectorized = loop_and_vectorized
+    window = users.set_index('user_id')
+    events = vectorized['events']
+    start = window.loc[events['customer_id'], 'sign_up_date'].to_numpy()
+    end = window.loc[events['customer_id'], 'churn_date'].fillna(pd.Timestamp('2024-12-12')).to_numpy()
+    stamps = events['event_timestamp'].to_numpy()
+    assert ((stamps >= start) & (stamps <= end)).all()
+    assert (events['event_timestamp'].dt.normalize() == events['event_timestamp']).all()
+
+
+def test_ticket_distribution_matches_loop(loop_and_vectorized):
+    _, loop, vectorized = loop_and_vectorized
+    # Share of users with tickets (~20%)
+    p_loop = loop['support_tickets']['customer_id'].nunique() / NUM_USERS
+    p_vec = vectorized['support_tickets']['customer_id'].nunique() / NUM_USERS
+    se = np.sqrt(2 * 0.2 * 0.8 / NUM_USERS)
+    assert abs(p_loop - p_vec) < 6 * se
+
+    tickets = vectorized['support_tickets']
+    open_tickets = tickets['status'] == 'open'
+    assert tickets.loc[open_tickets, 'closed_at'].isna().all()
+    assert tickets.loc[open_tickets, 'satisfaction_score'].isna().all()
+    closed = tickets[~open_tickets]
+    gap = (closed['closed_at'] - closed['created_at']).dt.days
+    assert gap.between(1, 7).all()
+    assert closed['satisfaction_score'].between(1, 5).all()
+    assert tickets['ticket_id'].iloc[0] == 'TKT000001' and tickets['ticket_id'].is_unique
+
+
+def _export_files(directory):
+    return {path.name: path.read_bytes() for path in sorted(directory.iterdir())}
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'csv.gz'])
+def test_scaled_export_resumes_after_interrupted_chunk(tmp_path, monkeypatch, fmt):
+    export_data_snapshots.export_scaled_snapshots(2500, tmp_path / 'full', seed=3, chunk_size=1000, fmt=fmt)
+
+    # Fail midway through the second chunk, after some tables were appended
+    real_append = export_data_snapshots._append_csv
+    calls = []
+
+    def failing_append(path, df, offset, compress):
+        calls.append(path.name)
+        if len(calls) == 8:
+            raise RuntimeError("disk full")
+        return real_append(path, df, offset, compress)
+
+    monkeypatch.setattr(export_data_snapshots, '_append_csv', failing_append)
+    with pytest.raises(RuntimeError):
+        export_data_snapshots.export_scaled_snapshots(2500, tmp_path / 'resumed', seed=3, chunk_size=1000, fmt=fmt)
+    monkeypatch.setattr(export_data_snapshots, '_append_csv', real_append)
+
+    manifest = export_data_snapshots.export_scaled_snapshots(2500, tmp_path / 'resumed', seed=3,
+                                                             chunk_size=1000, fmt=fmt)
+    assert manifest['chunks_done'] == 3
+    assert _export_files(tmp_path / 'resumed') == _export_files(tmp_path / 'full')
+
+    customers = pd.read_csv(tmp_path / 'full' / f'customers.{fmt}')
+    events = pd.read_csv(tmp_path / 'full' / f'events.{fmt}')
+    assert len(customers) == 2500 and customers['customer_id'].is_unique
+    assert events['event_id'].is_unique and len(events) == manifest['rows']['events']
+
+    users = generate_user_lifecycle(2500, end_date='2024-12-12', seed=3, shard_size=1000)
+    assert list(customers['customer_id']) == list(users['user_id'])
+
+
+def test_scaled_export_rejects_different_settings(tmp_path):
+    export_data_snapshots.export_scaled_snapshots(500, tmp_path, seed=3, chunk_size=250)
+    with pytest.raises(ValueError):
+        export_data_snapshots.export_scaled_snapshots(500, tmp_path, seed=4, chunk_size=250)
@@ -0,0 +1,111 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from ids import IdDictionary, NO_ID, group_max_dates
+from ingest import RAW_SAMPLE_DIR, load_raw_sample, stream_event_aggregates
+from ledger import PlanChangeLedger
+from metrics import compute_rfm, compute_rfm_history
+from engine import backtest_churn_risk, compute_churn_risk
+
+REFERENCE_DATE = '2024-12-12'
+
+
+def test_codes_are_dense_and_stable():
+    ids = IdDictionary(['U2', 'U1'])
+    assert list(ids.encode(['U1', 'U3', None, 'U2'])) == [1, 2, NO_ID, 0]
+    assert ids.encode(['U9'], add=False)[0] == NO_ID
+    assert list(ids.decode([2, NO_ID])) == ['U3', None]
+
+    restored = pickle.loads(pickle.dumps(ids))
+    assert list(restored.encode(['U3', 'U4'])) == [2, 3]
+
+
+def test_many_appends_keep_codes():
+    ids = IdDictionary()
+    batches = [[f'U{i:06d}' for i in range(start, start + 700)] for start in range(0, 7000, 700)]
+    for batch in batches:
+        ids.encode(batch)
+    everything = [uid for batch in batches for uid in batch]
+    assert (ids.encode(everything, add=False) == np.arange(len(everything))).all()
+
+
+def test_group_max_dates():
+    dates = np.array(['2024-01-02', '2024-01-01', '2024-03-01', 'NaT'], dtype='datetime64[ns]')
+    result = group_max_dates(np.array([1, 0, 1, 2]), dates, 3)
+    assert list(result.astype(str)) == ['2024-01-01T00:00:00.000000000', '2024-03-01T00:00:00.000000000', 'NaT']
+
+
+@pytest.fixture(scope='module')
+def tables():
+    return load_raw_sample(use_cache=False)
+
+
+def test_coded_rfm_matches_string_ids(tables):
+    ids = IdDictionary()
+    coded = load_raw_sample(use_cache=False, ids=ids)
+    assert coded['transactions']['customer_id'].dtype == np.int32
+
+    expected = compute_rfm(tables['customers'], tables['transactions'], REFERENCE_DATE, events_df=tables['events'])
+    result = compute_rfm(coded['customers'], coded['transactions'], REFERENCE_DATE, events_df=coded['events'], ids=ids)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_names=False)
+
+
+def test_coded_churn_risk_matches_string_ids(tables):
+    ids = IdDictionary()
+    coded = load_raw_sample(use_cache=False, ids=ids)
+
+    expected = compute_churn_risk(tables['customers'], tables['events'], tables['support_tickets'], REFERENCE_DATE)
+    result = compute_churn_risk(coded['customers'], coded['events'], coded['support_tickets'], REFERENCE_DATE, ids=ids)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_coded_event_aggregates_match_string_ids(tables):
+    ids = IdDictionary()
+    coded = load_raw_sample(use_cache=False, ids=ids)
+    plain, _ = stream_event_aggregates(RAW_SAMPLE_DIR / 'events.csv', chunksize=50_000, as_of=REFERENCE_DATE)
+    aggregates, _ = stream_event_aggregates(RAW_SAMPLE_DIR / 'events.csv', chunksize=50_000, as_of=REFERENCE_DATE,
+                                            ids=ids)
+    assert aggregates.index.dtype == np.int32
+    decoded = aggregates.set_axis(ids.decode(aggregates.index)).sort_index()
+    pd.testing.assert_frame_equal(decoded, plain.sort_index(), check_names=False)
+
+    expected = compute_rfm(tables['customers'], tables['transactions'], REFERENCE_DATE, event_aggregates=plain)
+    result = compute_rfm(coded['customers'], coded['transactions'], REFERENCE_DATE, event_aggregates=aggregates,
+                         ids=ids)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_names=False)
+
+
+def _sorted(frame):
+    return frame.sort_values(['reference_date', 'customer_id']).reset_index(drop=True)
+
+
+def test_coded_histories_match_string_ids(tables):
+    ids = IdDictionary()
+    coded = load_raw_sample(use_cache=False, ids=ids)
+    dates = pd.date_range(end=REFERENCE_DATE, periods=4, freq='30D')
+
+    expected = compute_rfm_history(tables['customers'], tables['transactions'], dates, events_df=tables['events'])
+    result = compute_rfm_history(coded['customers'], coded['transactions'], dates, events_df=coded['events'],
+                                 ids=ids)
+    pd.testing.assert_frame_equal(_sorted(result), _sorted(expected), check_dtype=False)
+
+    args = ('subscriptions', 'events', 'support_tickets')
+    expected = backtest_churn_risk(*(tables[name] for name in args), reference_dates=dates)
+    result = backtest_churn_risk(*(coded[name] for name in args), reference_dates=dates, ids=ids)
+    pd.testing.assert_frame_equal(_sorted(result), _sorted(expected))
+
+
+def test_coded_ledger_decodes_ids(tables):
+    ids = IdDictionary()
+    coded = load_raw_sample(use_cache=False, ids=ids)
+    ledger = PlanChangeLedger.from_subscriptions(coded['subscriptions'], ids=ids)
+    assert ledger.customer_id.dtype == np.int32
+
+    def ordered(frame):
+        return frame.sort_values(['customer_id', 'change_date', 'to_plan']).reset_index(drop=True)
+    expected = PlanChangeLedger.from_subscriptions(tables['subscriptions']).to_frame()
+    pd.testing.assert_frame_equal(ordered(ledger.to_frame()), ordered(expected))
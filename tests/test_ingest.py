@@ -0,0 +1,119 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pandas as pd
+import pytest
+from ingest import load_table, load_raw_sample
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    pd.DataFrame({
+        'event_id': ['EVT1', 'EVT2', 'EVT3'],
+        'customer_id': ['U1', 'U1', 'U2'],
+        'event_name': ['login', 'feature_use', 'login'],
+        'event_timestamp': ['2024-12-01', '2024-12-05', '2024-11-20']
+    }).to_csv(tmp_path / 'events.csv', index=False)
+    pd.DataFrame({
+        'customer_id': ['U1', 'U2'],
+        'signup_date': ['2024-01-01', '2024-02-01'],
+        'acquisition_source': ['referral', 'paid_ads'],
+        'initial_plan': ['Free', 'Basic'],
+        'activated': [True, False],
+        'country': ['US', 'UK']
+    }).to_csv(tmp_path / 'customers.csv', index=False)
+    return tmp_path
+
+
+def test_declared_dtypes(data_dir):
+    tables = load_raw_sample(data_dir)
+
+    assert set(tables) == {'events', 'customers'}
+    events, customers = tables['events'], tables['customers']
+    assert isinstance(events['event_name'].dtype, pd.CategoricalDtype)
+    assert events['event_timestamp'].dtype == 'datetime64[ns]'
+    assert customers['activated'].dtype == bool
+    assert customers['signup_date'].dtype == 'datetime64[ns]'
+    assert isinstance(customers['acquisition_source'].dtype, pd.CategoricalDtype)
+
+
+def test_warm_load_reuses_cache(data_dir):
+    cold = load_table('events', data_dir)
+    cache_dirs = list((data_dir / '.cache').glob('events-*'))
+    assert len(cache_dirs) == 1
+    assert not list(cache_dirs[0].glob('*.pkl'))
+
+    warm = load_table('events', data_dir)
+    pd.testing.assert_frame_equal(cold, warm)
+
+
+@pytest.mark.parametrize('validate', ['stat', 'hash'])
+def test_cache_invalidated_when_csv_changes(data_dir, validate):
+    load_table('events', data_dir, validate=validate)
+
+    with open(data_dir / 'events.csv', 'a') as f:
+        f.write('EVT4,U2,feature_use,2024-12-10\n')
+    events = load_table('events', data_dir, validate=validate)
+
+    assert len(events) == 4
+    assert len(list((data_dir / '.cache').glob('events-*'))) == 1
+
+
+def test_validate_modes_keep_separate_caches(data_dir):
+    cache_dir = data_dir / '.cache'
+    load_table('events', data_dir, validate='hash')
+    hash_dirs = list(cache_dir.glob('events-*-hash-*'))
+    load_table('events', data_dir, validate='stat')
+    assert list(cache_dir.glob('events-*-hash-*')) == hash_dirs
+
+    # Rebuilding the stat cache drops its old entry and pre-v2 pickles, not the hash cache
+    (cache_dir / 'events-v1-stat-0-0.pkl').write_bytes(b'')
+    with open(data_dir / 'events.csv', 'a') as f:
+        f.write('EVT4,U2,feature_use,2024-12-10\n')
+    load_table('events', data_dir, validate='stat')
+    assert list(cache_dir.glob('events-*-hash-*')) == hash_dirs
+    assert len(list(cache_dir.glob('events-*-stat-*'))) == 1 and not list(cache_dir.glob('*.pkl'))
+
+
+def test_unknown_table(data_dir):
+    with pytest.raises(ValueError):
+        load_table('invoices', data_dir)
+
+
+RAW_SAMPLE = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw_sample')
+
+
+@pytest.mark.skipif(not os.path.exists(os.path.join(RAW_SAMPLE, 'events.csv')), reason="raw sample data not generated")
+def test_streamed_aggregates_feed_rfm_and_churn_risk():
+    from ingest import stream_event_aggregates
+    from metrics import compute_rfm
+    from engine import compute_churn_risk
+
+    reference_date = '2024-12-12'
+    customers = pd.read_csv(os.path.join(RAW_SAMPLE, 'customers.csv'))
+    transactions = pd.read_csv(os.path.join(RAW_SAMPLE, 'transactions.csv'))
+    events = pd.read_csv(os.path.join(RAW_SAMPLE, 'events.csv'))
+    tickets = pd.read_csv(os.path.join(RAW_SAMPLE, 'support_tickets.csv'))
+
+    aggregates, report = stream_event_aggregates(os.path.join(RAW_SAMPLE, 'events.csv'),
+                                                 chunksize=7000, as_of=reference_date)
+    assert report['rows'] == len(events)
+    assert report['chunks'] == -(-len(events) // 7000)
+
+    pd.testing.assert_frame_equal(
+        compute_rfm(customers, transactions, reference_date, event_aggregates=aggregates),
+        compute_rfm(customers, transactions, reference_date, events_df=events))
+    pd.testing.assert_frame_equal(
+        compute_churn_risk(customers, None, tickets, reference_date, event_aggregates=aggregates),
+        compute_churn_risk(customers, events, tickets, reference_date))
+
+
+def test_rfm_rejects_aggregates_for_another_date(data_dir):
+    from ingest import stream_event_aggregates
+    from metrics import compute_rfm
+
+    aggregates, _ = stream_event_aggregates(data_dir / 'events.csv', as_of='2024-12-01')
+    transactions = pd.DataFrame({'transaction_id': ['T1'], 'customer_id': ['U1'],
+                                 'transaction_date': ['2024-11-01'], 'amount': [49]})
+    with pytest.raises(ValueError):
+        compute_rfm(None, transactions, '2024-12-12', event_aggregates=aggregates)
@@ -0,0 +1,95 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import threading
+import time
+from functools import partial
+import pytest
+from pipeline import Pipeline
+
+
+def _add(*values):
+    return sum(values)
+
+
+def _constant(value):
+    return value
+
+
+def _diamond(calls=None):
+    """a -> (b, c) -> d, counting calls per stage."""
+    def counted(name, func):
+        def wrapper(*args):
+            if calls is not None:
+                calls[name] = calls.get(name, 0) + 1
+            return func(*args)
+        return wrapper
+
+    pipeline = Pipeline()
+    pipeline.add('a', counted('a', partial(_constant, 1)))
+    pipeline.add('b', counted('b', partial(_add, 10)), ['a'])
+    pipeline.add('c', counted('c', partial(_add, 100)), ['a'])
+    pipeline.add('d', counted('d', _add), ['b', 'c'])
+    return pipeline
+
+
+@pytest.mark.parametrize('executor', ['serial', 'thread'])
+def test_each_stage_runs_once(executor):
+    calls = {}
+    results = _diamond(calls).run(executor=executor)
+    assert results == {'a': 1, 'b': 11, 'c': 101, 'd': 112}
+    assert calls == {'a': 1, 'b': 1, 'c': 1, 'd': 1}
+
+
+def test_process_executor():
+    pipeline = Pipeline()
+    pipeline.add('a', partial(_constant, 2))
+    pipeline.add('b', partial(_add, 3), ['a'])
+    assert pipeline.run(executor='process', max_workers=2) == {'a': 2, 'b': 5}
+
+
+def test_targets_limit_work():
+    calls = {}
+    results = _diamond(calls).run(targets=['b'])
+    assert results == {'a': 1, 'b': 11}
+    assert set(calls) == {'a', 'b'}
+
+
+def test_independent_stages_overlap():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(_):
+        # Deadlocks (BrokenBarrierError) unless both stages run at once
+        barrier.wait()
+        return True
+
+    pipeline = Pipeline()
+    pipeline.add('root', partial(_constant, 0))
+    pipeline.add('left', meet, ['root'])
+    pipeline.add('right', meet, ['root'])
+    start = time.perf_counter()
+    assert pipeline.run(executor='thread', max_workers=2)['left']
+    assert time.perf_counter() - start < 5
+
+
+def test_invalid_graphs_rejected():
+    pipeline = Pipeline()
+    pipeline.add('a', _add, ['b'])
+    pipeline.add('b', _add, ['a'])
+    with pytest.raises(ValueError, match='cycle'):
+        pipeline.run()
+
+    with pytest.raises(ValueError, match='Unknown stage'):
+        Pipeline().add('a', _add, ['missing']).run()
+
+    with pytest.raises(ValueError, match='Duplicate'):
+        Pipeline().add('a', _add).add('a', _add)
+
+
+def test_stage_errors_propagate():
+    def fail():
+        raise RuntimeError("boom")
+
+    pipeline = Pipeline().add('a', fail)
+    with pytest.raises(RuntimeError, match='boom'):
+        pipeline.run(executor='thread')
@@ -0,0 +1,141 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from datetime import timedelta
+import pandas as pd
+import pytest
+from user_simulation import generate_user_lifecycle
+from revenue import calculate_revenue_metrics, PLAN_PRICING
+from retention import (calculate_churn_rate_monthly, calculate_retention_metrics,
+                       generate_cohort_retention_matrix)
+
+
+@pytest.fixture(scope="module")
+def users():
+    return generate_user_lifecycle(num_users=5000, seed=11)
+
+
+def _loop_revenue_metrics(users_df):
+    """Original month-by-month implementation, kept as the parity reference."""
+    users_df = users_df.copy()
+    users_df['sign_up_month'] = pd.to_datetime(users_df['sign_up_date']).dt.to_period('M')
+    users_df['churn_month'] = pd.to_datetime(users_df['churn_date']).dt.to_period('M')
+    all_months = pd.period_range(start=users_df['sign_up_month'].min(),
+                                 end=users_df['sign_up_month'].max() + 12, freq='M')
+    rows = []
+    for month in all_months:
+        alive = (users_df['sign_up_month'] <= month) & (
+            users_df['churn_month'].isna() | (users_df['churn_month'] > month))
+        active_paying = users_df[alive & (users_df['current_plan'] != 'Free')]
+        mrr = sum(PLAN_PRICING.get(plan, 0) for plan in active_paying['current_plan'])
+        total_active = int(alive.sum())
+        paying_users = len(active_paying)
+        rows.append({
+            'month': month.to_timestamp(),
+            'mrr': mrr,
+            'arr': mrr * 12,
+            'active_users': total_active,
+            'paying_users': paying_users,
+            'arpu': mrr / total_active if total_active > 0 else 0,
+            'arppu': mrr / paying_users if paying_users > 0 else 0
+        })
+    return pd.DataFrame(rows)
+
+
+def _loop_churn_rate_monthly(users_df):
+    """Original month-by-month implementation, kept as the parity reference."""
+    users_df = users_df.copy()
+    users_df['sign_up_month'] = pd.to_datetime(users_df['sign_up_date']).dt.to_period('M')
+    users_df['churn_month'] = pd.to_datetime(users_df['churn_date']).dt.to_period('M')
+    all_months = pd.period_range(start=users_df['sign_up_month'].min(),
+                                 end=users_df['sign_up_month'].max() + 12, freq='M')
+    rows = []
+    for month in all_months:
+        active_start = int(((users_df['sign_up_month'] <= month) & (
+            users_df['churn_month'].isna() | (users_df['churn_month'] > month))).sum())
+        churned_in_month = int((users_df['churn_month'] == month).sum())
+        rows.append({
+            'month': month.to_timestamp(),
+            'active_users_start': active_start,
+            'churned_users': churned_in_month,
+            'churn_rate_monthly': churned_in_month / active_start if active_start > 0 else 0
+        })
+    return pd.DataFrame(rows)
+
+
+def _loop_retention_metrics(users_df):
+    """Original iterrows implementation, kept as the parity reference."""
+    rows = []
+    for _, user in users_df.iterrows():
+        sign_up = pd.to_datetime(user['sign_up_date'])
+        churn = pd.to_datetime(user['churn_date']) if pd.notna(user['churn_date']) else None
+        rows.append({
+            'user_id': user['user_id'],
+            'sign_up_date': user['sign_up_date'],
+            'current_plan': user['current_plan'],
+            'retention_week_1': not user['churned'] or (churn and churn > sign_up + timedelta(days=7)),
+            'retention_week_4': not user['churned'] or (churn and churn > sign_up + timedelta(days=28)),
+            'retention_month_3': not user['churned'] or (churn and churn > sign_up + timedelta(days=90)),
+            'lifetime_days': user['lifetime_days'],
+            'churned': user['churned']
+        })
+    return pd.DataFrame(rows)
+
+
+def _loop_cohort_retention_matrix(users_df):
+    """Original cohort x offset loop, kept as the parity reference."""
+    users_df = users_df.copy()
+    users_df['cohort_month'] = pd.to_datetime(users_df['sign_up_date']).dt.to_period('M')
+    cohorts = []
+    for cohort in sorted(users_df['cohort_month'].unique()):
+        cohort_users = users_df[users_df['cohort_month'] == cohort]
+        cohort_size = len(cohort_users)
+        cohort_data = {'cohort_month': cohort.to_timestamp(), 'cohort_size': cohort_size}
+        for month_offset in range(13):
+            target_date = cohort.to_timestamp() + pd.DateOffset(months=month_offset)
+            retained = len(cohort_users[
+                (pd.to_datetime(cohort_users['sign_up_date']) <= target_date) &
+                ((cohort_users['churn_date'].isna()) |
+                 (pd.to_datetime(cohort_users['churn_date']) > target_date))
+            ])
+            cohort_data[f'month_{month_offset}'] = retained / cohort_size if cohort_size > 0 else 0
+        cohorts.append(cohort_data)
+    return pd.DataFrame(cohorts)
+
+
+def test_revenue_metrics_match_loop(users):
+    pd.testing.assert_frame_equal(calculate_revenue_metrics(users), _loop_revenue_metrics(users))
+
+
+def test_churn_rate_monthly_matches_loop(users):
+    pd.testing.assert_frame_equal(calculate_churn_rate_monthly(users), _loop_churn_rate_monthly(users))
+
+
+def test_monthly_series_do_not_mutate_input(users):
+    columns = list(users.columns)
+    calculate_revenue_metrics(users)
+    calculate_churn_rate_monthly(users)
+    assert list(users.columns) == columns
+
+
+def test_retention_metrics_match_loop(users):
+    pd.testing.assert_frame_equal(calculate_retention_metrics(users), _loop_retention_metrics(users))
+
+
+def test_cohort_matrix_matches_loop(users):
+    pd.testing.assert_frame_equal(generate_cohort_retention_matrix(users), _loop_cohort_retention_matrix(users))
+
+
+def test_weekly_cohort_matrix():
+    users = pd.DataFrame({
+        'sign_up_date': pd.to_datetime(['2024-01-01', '2024-01-03', '2024-01-10']),
+        'churn_date': pd.to_datetime([None, '2024-01-15', '2024-01-16'])
+    })
+
+    matrix = generate_cohort_retention_matrix(users, granularity='W', horizon=3)
+
+    # 2024-01-01 is a Monday: weekly periods start on Mondays
+    assert list(matrix.columns) == ['cohort_week', 'cohort_size', 'week_0', 'week_1', 'week_2', 'week_3']
+    assert list(matrix['cohort_size']) == [2, 1]
+    assert list(matrix.iloc[0, 2:]) == [0.5, 1.0, 0.5, 0.5]
+    assert list(matrix.iloc[1, 2:]) == [0.0, 1.0, 0.0, 0.0]
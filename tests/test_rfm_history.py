@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from dataset import SaaSDataset
+from metrics import compute_rfm, compute_rfm_history
+
+DATA_DIR = Path(__file__).parent.parent / "data" / "raw_sample"
+REFERENCE_DATES = pd.date_range(end='2024-12-12', periods=6, freq='30D')
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return {name: pd.read_csv(DATA_DIR / f"{name}.csv") for name in ('customers', 'transactions', 'events')}
+
+
+@pytest.fixture(scope="module")
+def history(tables):
+    return compute_rfm_history(tables['customers'], tables['transactions'], REFERENCE_DATES,
+                               windows=(90, 100_000), events_df=tables['events'])
+
+
+@pytest.mark.parametrize('reference_date', REFERENCE_DATES[[0, 3, 5]])
+def test_unbounded_window_matches_compute_rfm(tables, history, reference_date):
+    expected = compute_rfm(tables['customers'], tables['transactions'], reference_date, events_df=tables['events'])
+    snapshot = history[history['reference_date'] == reference_date].set_index('customer_id')
+    assert set(snapshot.index) == set(expected.index)
+
+    snapshot = snapshot.loc[expected.index]
+    np.testing.assert_array_equal(snapshot['recency_days'], expected['recency_days'])
+    np.testing.assert_array_equal(snapshot['frequency_100000d'], expected['frequency_180d'])
+    np.testing.assert_allclose(snapshot['monetary_100000d'], expected['monetary_180d'], atol=1e-6)
+
+
+def test_windows_count_only_recent_transactions(tables, history):
+    reference_date = REFERENCE_DATES[-1]
+    transactions = tables['transactions']
+    dates = pd.to_datetime(transactions['transaction_date'])
+    recent = transactions[(dates <= reference_date) & (dates > reference_date - pd.Timedelta(days=90))]
+    expected = recent.groupby('customer_id')['amount'].agg(['count', 'sum'])
+
+    snapshot = history[history['reference_date'] == reference_date].set_index('customer_id')
+    expected = expected.reindex(snapshot.index, fill_value=0)
+    np.testing.assert_array_equal(snapshot['frequency_90d'], expected['count'])
+    np.testing.assert_allclose(snapshot['monetary_90d'], expected['sum'], atol=1e-6)
+    assert (snapshot['frequency_90d'] <= snapshot['frequency_100000d']).all()
+
+
+def test_dataset_input_and_scoring(tables, history):
+    data = SaaSDataset(tables['customers'], tables['transactions'], tables['events'])
+    pd.testing.assert_frame_equal(compute_rfm_history(data, reference_dates=REFERENCE_DATES, windows=(90, 100_000)),
+                                  history)
+
+    scored = compute_rfm_history(data, reference_dates=REFERENCE_DATES[-1:], windows=(100_000,), scoring='exact')
+    expected = compute_rfm(data, reference_date=REFERENCE_DATES[-1])
+    scored = scored.set_index('customer_id').loc[expected.index]
+    np.testing.assert_array_equal(scored['r_q'], expected['r_q'])
+    np.testing.assert_array_equal(scored['f_q_100000d'], expected['f_q'])
+    with pytest.raises(ValueError):
+        compute_rfm_history(data)
@@ -0,0 +1,143 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import numpy as np
+import pandas as pd
+import pytest
+from retention import calculate_churn_rate_monthly
+from revenue import calculate_revenue_metrics
+from scenarios import (MULTIPLIERS, SCENARIOS, fit_rate_distributions, generate_scenarios, project_scenarios,
+                       sensitivity_sweep, simulate_paths, simulate_scenarios, tornado)
+from user_simulation import generate_user_lifecycle
+
+
+@pytest.fixture(scope="module")
+def users():
+    return generate_user_lifecycle(num_users=3000, seed=21)
+
+
+@pytest.fixture(scope="module")
+def revenue(users):
+    return calculate_revenue_metrics(users)
+
+
+def test_deterministic_scenarios_unchanged(users, revenue):
+    scenarios = generate_scenarios(users, revenue)
+    assert len(scenarios) == len(SCENARIOS) * 12
+    base = scenarios[scenarios['scenario'] == 'Base Case']
+    churn = users['churned'].mean()
+    assert base['churn_rate'].eq(churn).all()
+    assert base['users'].iloc[0] == (revenue['active_users'].iloc[-1]
+                                     - int(revenue['active_users'].iloc[-1] * churn)
+                                     + int(revenue['active_users'].iloc[-1] * 0.05))
+
+    # Conversion drives paying users, not the MRR formula
+    improved = scenarios[scenarios['scenario'] == 'Improved Conversion (+10%)']
+    np.testing.assert_array_equal(improved['mrr'], base['mrr'])
+
+
+def test_conversion_scales_new_paying_users(users, revenue):
+    start_users, start_paying = revenue['active_users'].iloc[-1], revenue['paying_users'].iloc[-1]
+    churn, conversion = users['churned'].mean(), users['converted_to_paid'].mean()
+    projection = project_scenarios(revenue['mrr'].iloc[-1], start_users, churn,
+                                   conversion_mult=np.array([1.0, 1.5]), months=3,
+                                   base_paying=start_paying, base_conversion=conversion)
+    new_users = int(start_users * 0.05)
+    assert projection['paying_users'][0, 0] == (start_paying - int(start_paying * churn)
+                                                + int(new_users * conversion))
+    assert (projection['paying_users'][1] >= projection['paying_users'][0]).all()
+    np.testing.assert_array_equal(projection['mrr'][0], projection['mrr'][1])
+
+
+def test_fitted_means_are_pooled_rates(users):
+    rates = fit_rate_distributions(users)
+    monthly = calculate_churn_rate_monthly(users)
+    last_sign_up = pd.to_datetime(users['sign_up_date']).max().to_period('M').to_timestamp()
+    window = monthly[monthly['month'] <= last_sign_up]
+
+    kind, alpha, beta, mean = rates['churn']
+    assert kind == 'beta'
+    assert mean == pytest.approx(window['churned_users'].sum() / window['active_users_start'].sum())
+    assert alpha / (alpha + beta) == pytest.approx(mean)
+    assert rates['conversion'][3] == pytest.approx(users['converted_to_paid'].mean())
+    assert rates['growth'][0] == 'gamma' and rates['growth'][3] > 0
+
+
+def test_bands_are_ordered_and_reproducible(users, revenue):
+    bands = simulate_scenarios(users, revenue, num_paths=2000, months=24, seed=3)
+    assert len(bands) == len(SCENARIOS) * 24
+    for metric in ('mrr', 'arr', 'users', 'paying_users', 'ltv_cac_ratio'):
+        assert (bands[f'{metric}_p10'] <= bands[f'{metric}_p50']).all()
+        assert (bands[f'{metric}_p50'] <= bands[f'{metric}_p90']).all()
+    np.testing.assert_allclose(bands['arr_p50'], bands['mrr_p50'] * 12)
+
+    pd.testing.assert_frame_equal(bands, simulate_scenarios(users, revenue, num_paths=2000, months=24, seed=3))
+
+
+def test_mrr_bands_match_path_percentiles(users, revenue):
+    paths = simulate_paths(users, revenue, num_paths=1000, months=12, seed=5)
+    bands = simulate_scenarios(users, revenue, num_paths=1000, months=12, seed=5)
+    assert paths['mrr'].shape == (12, len(SCENARIOS), 1000)
+
+    expected = np.quantile(paths['mrr'], 0.9, axis=-1).T.ravel()
+    np.testing.assert_allclose(bands['mrr_p90'], expected)
+
+
+def test_scenario_multipliers_shift_outcomes(users, revenue):
+    bands = simulate_scenarios(users, revenue, num_paths=4000, months=36, seed=8)
+    final = bands[bands['month'] == 36].set_index('scenario')
+
+    assert final.loc['Reduced Churn (-15%)', 'users_p50'] > final.loc['Base Case', 'users_p50']
+    assert final.loc['High Churn (+20%)', 'users_p50'] < final.loc['Base Case', 'users_p50']
+    assert final.loc['Pricing Change (+15% ARPU)', 'mrr_p50'] > final.loc['Base Case', 'mrr_p50']
+    # Growth barely moves ARPU, while CAC is 25% higher
+    assert (final.loc['Increased Marketing (+25% CAC)', 'ltv_cac_ratio_p50']
+            < final.loc['Base Case', 'ltv_cac_ratio_p50'])
+
+
+def test_sweep_matches_named_scenarios(users, revenue):
+    scenarios = generate_scenarios(users, revenue)
+    ranges = {key: sorted({config[key] for config in SCENARIOS}) for key in MULTIPLIERS}
+    grid = sensitivity_sweep(users, revenue, ranges, month=12)
+    assert len(grid) == np.prod([len(values) for values in ranges.values()])
+    final = scenarios[scenarios['month'] == 12].set_index('scenario')
+    for config in SCENARIOS:
+        row = grid[np.logical_and.reduce([grid[key] == config[key] for key in MULTIPLIERS])].iloc[0]
+        expected = final.loc[config['name']]
+        assert row['users'] == expected['users']
+        assert round(row['mrr'], 2) == expected['mrr']
+        assert round(row['ltv_cac_ratio'], 2) == expected['ltv_cac_ratio']
+
+
+def test_sweep_chunks_match_broadcast_projection(users, revenue):
+    ranges = {'churn_mult': np.linspace(0.8, 1.2, 5), 'cac_mult': [1.0, 2.0], 'price_mult': [0.9, 1.1]}
+    grid = sensitivity_sweep(users, revenue, ranges, month=6, chunk_size=3)
+    pd.testing.assert_frame_equal(grid, sensitivity_sweep(users, revenue, ranges, month=6))
+    assert len(grid) == 20 and grid['growth_mult'].eq(1.0).all()
+
+    churn = users['churned'].mean()
+    projection = project_scenarios(revenue['mrr'].iloc[-1], revenue['active_users'].iloc[-1], churn,
+                                   churn_mult=np.linspace(0.8, 1.2, 5)[:, None, None],
+                                   cac_mult=np.array([1.0, 2.0])[:, None], price_mult=np.array([0.9, 1.1]),
+                                   months=6, base_paying=revenue['paying_users'].iloc[-1],
+                                   base_conversion=users['converted_to_paid'].mean())
+    np.testing.assert_array_equal(grid['mrr'], projection['mrr'][..., -1].ravel())
+    np.testing.assert_array_equal(grid['ltv_cac_ratio'], projection['ltv_cac_ratio'][..., -1].ravel())
+    np.testing.assert_array_equal(grid['paying_users'], projection['paying_users'][..., -1].ravel())
+    np.testing.assert_array_equal(grid['arr'], grid['mrr'] * 12)
+
+    with pytest.raises(ValueError):
+        sensitivity_sweep(users, revenue, {'discount_mult': [1.0]})
+
+
+def test_tornado_is_sorted_by_swing(users, revenue):
+    ranges = {key: [0.8, 1.2] for key in MULTIPLIERS}
+    chart = tornado(users, revenue, ranges, metric='mrr')
+    assert list(chart['swing']) == sorted(chart['swing'], reverse=True)
+    assert set(chart['parameter']) == set(MULTIPLIERS)
+    swings = chart.set_index('parameter')['swing']
+    assert swings['cac_mult'] == 0
+    assert swings['conversion_mult'] == 0 and swings['price_mult'] > swings['growth_mult']
+
+    paying = tornado(users, revenue, ranges, metric='paying_users', month=1).set_index('parameter')['swing']
+    assert paying['conversion_mult'] > 0 and paying['price_mult'] == 0
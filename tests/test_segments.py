@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pandas as pd
+import pytest
+from user_simulation import generate_user_lifecycle
+from funnel import calculate_conversion_summary
+from unit_economics import calculate_unit_economics, calculate_unit_economics_summary
+from segments import cube
+
+
+@pytest.fixture(scope="module")
+def users():
+    return generate_user_lifecycle(num_users=20000, seed=21)
+
+
+def _mask_summary(df, segment, mask):
+    seg = df[mask]
+    return {
+        'segment': segment,
+        'total_users': len(seg),
+        'activated': seg['activated'].sum(),
+        'activation_rate': seg['activated'].mean(),
+        'converted_to_paid': seg['converted_to_paid'].sum(),
+        'conversion_rate': seg['converted_to_paid'].mean(),
+        'churned': seg['churned'].sum(),
+        'churn_rate': seg['churned'].mean()
+    }
+
+
+def _loop_conversion_summary(users_df):
+    """Original one-mask-per-segment implementation, kept as the parity reference."""
+    rows = [_mask_summary(users_df, 'Overall', slice(None))]
+    for channel in users_df['acquisition_channel'].unique():
+        rows.append(_mask_summary(users_df, f'Channel: {channel}', users_df['acquisition_channel'] == channel))
+    for plan in users_df['current_plan'].unique():
+        rows.append(_mask_summary(users_df, f'Plan: {plan}', users_df['current_plan'] == plan))
+    return pd.DataFrame(rows)
+
+
+def test_default_conversion_summary_matches_loop(users):
+    pd.testing.assert_frame_equal(calculate_conversion_summary(users), _loop_conversion_summary(users))
+
+
+def test_overall_only_grouping_set_counts_bools(users):
+    overall = calculate_conversion_summary(users, grouping_sets=[()])
+    pd.testing.assert_frame_equal(overall, calculate_conversion_summary(users).iloc[:1])
+
+    tiny = pd.DataFrame({'acquisition_channel': ['a', 'b', 'a'], 'current_plan': ['Free', 'Pro', 'Basic'],
+                         'activated': [True, True, False], 'converted_to_paid': [True, True, False],
+                         'churned': [False, True, False]})
+    row = calculate_conversion_summary(tiny, grouping_sets=[()]).iloc[0]
+    assert row['activated'] == 2 and row['conversion_rate'] == pytest.approx(2 / 3)
+
+
+def test_default_unit_economics_summary_segments(users):
+    economics = calculate_unit_economics(users)
+    summary = calculate_unit_economics_summary(economics).set_index('segment')
+
+    pro = economics[economics['current_plan'] == 'Pro']
+    assert summary.loc['Plan: Pro', 'users'] == len(pro)
+    assert summary.loc['Plan: Pro', 'avg_ltv'] == pytest.approx(pro['ltv'].mean())
+    assert summary.loc['Plan: Pro', 'median_ltv_cac_ratio'] == pro['ltv_cac_ratio'].median()
+    assert summary.loc['Overall', 'avg_cac'] == pytest.approx(economics['cac'].mean())
+
+
+def test_cube_combinations_match_direct_masks(users):
+    summary = calculate_conversion_summary(
+        users, cube('acquisition_channel', 'current_plan', 'sign_up_month')).set_index('segment')
+
+    months = pd.to_datetime(users['sign_up_date']).dt.strftime('%Y-%m')
+    mask = ((users['acquisition_channel'] == 'paid_ads') & (users['current_plan'] == 'Pro')
+            & (months == '2023-06'))
+    expected = _mask_summary(users, None, mask)
+
+    row = summary.loc['Channel: paid_ads | Plan: Pro | Signup Month: 2023-06']
+    for column in ['total_users', 'activated', 'converted_to_paid', 'churned']:
+        assert row[column] == expected[column]
+    assert row['churn_rate'] == pytest.approx(expected['churn_rate'])
+
+    # Every grouping set partitions the same users
+    channel_rows = summary[summary.index.str.match(r'^Channel: [^|]+$')]
+    assert channel_rows['total_users'].sum() == summary.loc['Overall', 'total_users']
+
+
+def test_cube_enumerates_grouping_sets():
+    assert cube('a', 'b') == [(), ('a',), ('b',), ('a', 'b')]
+    assert len(cube('a', 'b', 'c', 'd')) == 16
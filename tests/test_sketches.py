@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from metrics import build_rfm_sketches, compute_rfm, merge_rfm_sketches, score_rfm
+from sketches import KLLSketch, rank_error
+
+DATA_DIR = Path(__file__).parent.parent / "data" / "raw_sample"
+REFERENCE_DATE = '2024-12-12'
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return {name: pd.read_csv(DATA_DIR / f"{name}.csv") for name in ('customers', 'transactions', 'events')}
+
+
+def test_merged_shards_stay_within_rank_error():
+    values = np.random.default_rng(0).lognormal(size=100_000)
+    merged = KLLSketch(seed=1)
+    for i, shard in enumerate(np.array_split(values, 7)):
+        merged.merge(KLLSketch.from_values(shard, seed=i))
+    assert merged.n == len(values) and merged.retained < 3 * merged.k
+
+    probes = np.quantile(values, np.linspace(0.01, 0.99, 99))
+    exact = np.searchsorted(np.sort(values), probes, side='right') / len(values)
+    assert np.abs(merged.cdf(probes) - exact).max() <= rank_error(merged.k)
+    assert merged.quantile(0) == values.min() and merged.quantile(1) == values.max()
+
+
+def test_sketch_edge_cases():
+    sketch = KLLSketch.from_values([3.0, np.nan, 1.0, 2.0])
+    assert sketch.n == 3
+    np.testing.assert_array_equal(sketch.cdf([0, 1, 2.5, 3]), [0, 1 / 3, 2 / 3, 1])
+    np.testing.assert_array_equal(sketch.cdf([1, 3], inclusive=False), [0, 2 / 3])
+    with pytest.raises(ValueError):
+        sketch.merge(KLLSketch(k=100))
+    with pytest.raises(ValueError):
+        KLLSketch().quantile(0.5)
+
+
+def test_exact_scoring_is_default(tables):
+    args = (tables['customers'], tables['transactions'], REFERENCE_DATE)
+    default = compute_rfm(*args, events_df=tables['events'])
+    pd.testing.assert_frame_equal(default, compute_rfm(*args, events_df=tables['events'], scoring='exact'))
+
+    raw = compute_rfm(*args, events_df=tables['events'], scoring=None)
+    assert 'r_q' not in raw
+    pd.testing.assert_frame_equal(score_rfm(raw), default)
+    with pytest.raises(ValueError):
+        score_rfm(raw, scoring='tdigest')
+
+
+def test_sharded_sketch_scores_match_exact_up_to_ties(tables):
+    args = (tables['customers'], tables['transactions'], REFERENCE_DATE)
+    exact = compute_rfm(*args, events_df=tables['events'])
+    raw = compute_rfm(*args, events_df=tables['events'], scoring=None)
+
+    shards = np.array_split(raw, 4)
+    merged = merge_rfm_sketches(build_rfm_sketches(shard) for shard in shards)
+    scored = pd.concat([score_rfm(shard, 'sketch', merged) for shard in shards])
+    pd.testing.assert_frame_equal(scored, compute_rfm(*args, events_df=tables['events'], scoring='sketch',
+                                                      sketches=merged))
+
+    for column, score in (('recency_days', 'r_q'), ('frequency_180d', 'f_q'), ('monetary_180d', 'm_q')):
+        # Exact scores of tied values depend on row order; compare against their range
+        spread = exact.groupby(column)[score].agg(['min', 'max'])
+        low, high = scored[column].map(spread['min']), scored[column].map(spread['max'])
+        assert ((scored[score] >= low - 1) & (scored[score] <= high + 1)).all()
+        assert ((scored[score] < low) | (scored[score] > high)).mean() < 2 * rank_error()
@@ -0,0 +1,68 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pandas as pd
+import pytest
+from ingest import load_raw_sample
+from metrics import compute_rfm
+from engine import compute_churn_risk
+from state import CustomerStateStore
+
+BASE_DATE = pd.Timestamp('2024-12-10')
+REFERENCE_DATE = pd.Timestamp('2024-12-12')
+
+
+@pytest.fixture(scope='module')
+def raw():
+    tables = load_raw_sample(use_cache=False)
+    tables['transactions'] = tables['transactions'][tables['transactions']['transaction_date'] <= REFERENCE_DATE]
+    tables['events'] = tables['events'][tables['events']['event_timestamp'] <= REFERENCE_DATE]
+    return tables
+
+
+def _split(df, column):
+    """History up to BASE_DATE and the delta after it."""
+    before = df[column] <= BASE_DATE
+    return df[before], df[~before]
+
+
+def _refreshed_store(raw):
+    txn_base, txn_delta = _split(raw['transactions'], 'transaction_date')
+    evt_base, evt_delta = _split(raw['events'], 'event_timestamp')
+    tkt_base, tkt_delta = _split(raw['support_tickets'], 'created_at')
+    store = CustomerStateStore.from_history(txn_base, evt_base, tkt_base)
+    touched = store.apply_delta(txn_delta, evt_delta, tkt_delta)
+    assert 0 < touched < len(store)
+    return store
+
+
+def test_incremental_rfm_matches_full_recompute(raw):
+    store = _refreshed_store(raw)
+    expected = compute_rfm(raw['customers'], raw['transactions'], REFERENCE_DATE, events_df=raw['events'])
+    pd.testing.assert_frame_equal(store.score_rfm(REFERENCE_DATE), expected, check_dtype=False, check_names=False)
+
+
+def test_incremental_churn_risk_matches_full_recompute(raw):
+    store = _refreshed_store(raw)
+    customers = raw['customers']
+    expected = compute_churn_risk(customers, raw['events'], raw['support_tickets'], REFERENCE_DATE)
+    result = store.score_churn_risk(customers['customer_id'], REFERENCE_DATE)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_save_load_round_trip(raw, tmp_path):
+    store = _refreshed_store(raw)
+    store.save(tmp_path / 'state.npz')
+    loaded = CustomerStateStore.load(tmp_path / 'state.npz')
+    assert len(loaded) == len(store)
+    assert list(loaded.ids.values) == list(store.ids.values)
+    pd.testing.assert_frame_equal(loaded.score_rfm(REFERENCE_DATE), store.score_rfm(REFERENCE_DATE))
+
+    # A reloaded store keeps accepting deltas
+    loaded.apply_delta(pd.DataFrame({
+        'transaction_id': ['T1'], 'customer_id': ['NEW1'],
+        'transaction_date': [REFERENCE_DATE], 'amount': [49.0]
+    }))
+    rfm = loaded.score_rfm(REFERENCE_DATE)
+    assert rfm.loc['NEW1', 'recency_days'] == 0
+    assert rfm.loc['NEW1', 'frequency_180d'] == 1
@@ -0,0 +1,91 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import json
+from functools import partial
+import numpy as np
+import pandas as pd
+import pytest
+import tracing
+from pipeline import Pipeline
+from revenue import calculate_revenue_metrics
+from tracing import Tracer, traced
+from user_simulation import generate_user_lifecycle
+
+
+@traced
+def _allocate(frame, megabytes=0):
+    block = np.ones(megabytes * 1024 ** 2 // 8)
+    return frame.head(2).assign(total=block.sum())
+
+
+@traced(name='outer', category='custom')
+def _outer(frame):
+    return _allocate(frame)
+
+
+def _constant(value):
+    return value
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'amount': range(10)})
+
+
+def test_disabled_tracing_records_nothing(frame):
+    assert tracing.active_tracer() is None
+    tracer = Tracer()
+    assert len(_outer(frame)) == 2
+    assert tracer.spans == []
+    with tracing.span('noop') as record:
+        record['rows_out'] = 1
+
+
+def test_nested_spans_rows_and_chrome_trace(tmp_path, frame):
+    with Tracer() as tracer:
+        _outer(frame)
+        with tracing.span('write', 'io', 5):
+            pass
+    assert tracing.active_tracer() is None
+
+    spans = {span['name']: span for span in tracer.spans}
+    assert spans['outer']['cat'] == 'custom' and spans['outer']['depth'] == 0
+    assert spans['_allocate']['depth'] == 1
+    assert (spans['_allocate']['rows_in'], spans['_allocate']['rows_out']) == (10, 2)
+    assert spans['outer']['wall_ns'] >= spans['_allocate']['wall_ns']
+
+    tracer.write_chrome_trace(tmp_path / 'trace.json')
+    events = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    assert [e['name'] for e in events] == ['outer', '_allocate', 'write']
+    assert all(e['ph'] == 'X' and e['dur'] >= 0 and 'cpu_ms' in e['args'] for e in events)
+
+    table = tracer.summary(categories=('io',)).splitlines()
+    assert len(table) == 3 and table[2].startswith('write')
+
+
+def test_tracemalloc_peaks_are_per_span(frame):
+    with Tracer(memory=True) as tracer:
+        _allocate(frame, megabytes=16)
+        _allocate(frame)
+    big, small = tracer.spans
+    assert big['peak_mb'] >= 15
+    assert small['peak_mb'] < 1
+
+
+@pytest.mark.parametrize('executor', ['serial', 'thread', 'process'])
+def test_pipeline_stages_are_traced(executor):
+    users = generate_user_lifecycle(num_users=300, seed=9)
+    pipeline = Pipeline()
+    pipeline.add('users', partial(_constant, users))
+    pipeline.add('revenue', calculate_revenue_metrics, ['users'])
+
+    with Tracer() as tracer:
+        results = pipeline.run(executor=executor, max_workers=2)
+
+    stages = {span['name']: span for span in tracer.spans if span['cat'] == 'stage'}
+    assert set(stages) == {'users', 'revenue'}
+    assert stages['revenue']['rows_in'] == 300
+    assert stages['revenue']['rows_out'] == len(results['revenue'])
+    # The metric function inside the stage is traced too, also in worker processes
+    assert any(span['name'] == 'calculate_revenue_metrics' for span in tracer.spans)
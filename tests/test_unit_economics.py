@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import numpy as np
+import pandas as pd
+import pytest
+from user_simulation import generate_user_lifecycle
+from unit_economics import calculate_unit_economics, _round_half_even, PLAN_PRICING
+
+
+@pytest.fixture(scope="module")
+def users():
+    return generate_user_lifecycle(num_users=20000, seed=9)
+
+
+def _loop_unit_economics(users_df):
+    """Original iterrows implementation, kept as the parity reference."""
+    economics = []
+    for _, user in users_df.iterrows():
+        cac = user['cac']
+        monthly_price = PLAN_PRICING.get(user['current_plan'], 0)
+        lifetime_months = user['lifetime_days'] / 30.0
+        ltv = monthly_price * lifetime_months
+        ltv_cac_ratio = ltv / cac if cac > 0 else 0
+        economics.append({
+            'user_id': user['user_id'],
+            'acquisition_channel': user['acquisition_channel'],
+            'current_plan': user['current_plan'],
+            'cac': cac,
+            'lifetime_days': user['lifetime_days'],
+            'lifetime_months': round(lifetime_months, 2),
+            'monthly_price': monthly_price,
+            'ltv': round(ltv, 2),
+            'ltv_cac_ratio': round(ltv_cac_ratio, 2),
+            'churned': user['churned']
+        })
+    return pd.DataFrame(economics)
+
+
+def test_unit_economics_match_loop(users):
+    pd.testing.assert_frame_equal(calculate_unit_economics(users), _loop_unit_economics(users))
+
+
+def test_rounding_matches_builtin_round_on_ties():
+    # np.round(x, 2) disagrees with round(x, 2) on all of these
+    values = np.array([0.165, 7.295, 7.215, 8.895, 5.715, 8.765, 2.5, 1.0 / 3])
+    expected = [round(float(v), 2) for v in values]
+    assert list(_round_half_even(values, 2)) == expected
@@ -0,0 +1,117 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import numpy as np
+import pandas as pd
+import pytest
+from user_simulation import generate_user_lifecycle
+
+NUM_USERS = 20000
+
+
+@pytest.fixture(scope="module")
+def loop_and_vectorized():
+    np.random.seed(7)
+    loop = generate_user_lifecycle(NUM_USERS)
+    np.random.seed(8)
+    vectorized = generate_user_lifecycle(NUM_USERS, vectorized=True)
+    return loop, vectorized
+
+
+def _ks_statistic(a, b):
+    """Two-sample Kolmogorov-Smirnov statistic."""
+    a = np.sort(np.asarray(a, dtype=float))
+    b = np.sort(np.asarray(b, dtype=float))
+    grid = np.concatenate([a, b])
+    cdf_a = np.searchsorted(a, grid, side='right') / len(a)
+    cdf_b = np.searchsorted(b, grid, side='right') / len(b)
+    return np.abs(cdf_a - cdf_b).max()
+
+
+def _ks_critical(n, m, alpha_coeff=1.95):
+    """KS critical value at alpha ~= 0.001."""
+    return alpha_coeff * np.sqrt((n + m) / (n * m))
+
+
+def test_same_columns_and_dtypes(loop_and_vectorized):
+    loop, vectorized = loop_and_vectorized
+    assert list(vectorized.columns) == list(loop.columns)
+    assert vectorized.dtypes.equals(loop.dtypes)
+    assert vectorized['user_id'].iloc[0] == 'U000001'
+    assert vectorized['user_id'].is_unique
+
+
+@pytest.mark.parametrize('column', ['activated', 'converted_to_paid', 'churned', 'num_upgrades', 'num_downgrades'])
+def test_rates_match(loop_and_vectorized, column):
+    loop, vectorized = loop_and_vectorized
+    p_loop = loop[column].mean()
+    p_vec = vectorized[column].mean()
+    pooled = (p_loop + p_vec) / 2
+    se = np.sqrt(2 * pooled * (1 - pooled) / NUM_USERS)
+    assert abs(p_loop - p_vec) < 5 * se + 1e-9, f"{column}: {p_loop:.4f} vs {p_vec:.4f}"
+
+
+@pytest.mark.parametrize('column', ['acquisition_channel', 'initial_plan', 'current_plan'])
+def test_categorical_shares_match(loop_and_vectorized, column):
+    loop, vectorized = loop_and_vectorized
+    shares = pd.concat([
+        loop[column].value_counts(normalize=True),
+        vectorized[column].value_counts(normalize=True)
+    ], axis=1).fillna(0)
+    assert (shares.iloc[:, 0] - shares.iloc[:, 1]).abs().max() < 0.015
+
+
+def test_continuous_distributions_match(loop_and_vectorized):
+    loop, vectorized = loop_and_vectorized
+    critical = _ks_critical(len(loop), len(vectorized))
+
+    sign_up_days = lambda df: (df['sign_up_date'] - df['sign_up_date'].min()).dt.days
+    assert _ks_statistic(sign_up_days(loop), sign_up_days(vectorized)) < critical
+    assert _ks_statistic(loop['lifetime_days'], vectorized['lifetime_days']) < critical
+
+    for channel in loop['acquisition_channel'].unique():
+        cac_loop = loop.loc[loop['acquisition_channel'] == channel, 'cac']
+        cac_vec = vectorized.loc[vectorized['acquisition_channel'] == channel, 'cac']
+        assert _ks_statistic(cac_loop, cac_vec) < _ks_critical(len(cac_loop), len(cac_vec)), channel
+
+
+def test_lifecycle_invariants(loop_and_vectorized):
+    _, users = loop_and_vectorized
+    assert not users.loc[~users['converted_to_paid'], 'conversion_date'].notna().any()
+    assert (users.loc[users['converted_to_paid'], 'initial_plan'] == 'Free').all()
+    assert users.loc[users['churned'], 'churn_date'].notna().all()
+    assert users.loc[~users['churned'], 'churn_date'].isna().all()
+    assert (users['cac'] >= 0).all()
+
+
+def test_sharded_output_independent_of_worker_count():
+    kwargs = dict(num_users=25000, seed=123, shard_size=10000)
+    serial = generate_user_lifecycle(n_workers=1, **kwargs)
+    parallel = generate_user_lifecycle(n_workers=3, **kwargs)
+
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert (pd.util.hash_pandas_object(serial) == pd.util.hash_pandas_object(parallel)).all()
+    assert serial['user_id'].iloc[-1] == 'U025000'
+
+
+def test_seed_controls_stream():
+    a = generate_user_lifecycle(num_users=5000, seed=1)
+    b = generate_user_lifecycle(num_users=5000, seed=1)
+    c = generate_user_lifecycle(num_users=5000, seed=2)
+
+    pd.testing.assert_frame_equal(a, b)
+    assert not a['cac'].equals(c['cac'])
+
+
+def test_seeded_loop_matches_global_seed():
+    np.random.seed(42)
+    global_stream = generate_user_lifecycle(num_users=500)
+    seeded = generate_user_lifecycle(num_users=500, seed=42, vectorized=False)
+
+    pd.testing.assert_frame_equal(seeded, global_stream)
+    # The seeded loop leaves the global state alone
+    state = np.random.get_state()[1].copy()
+    generate_user_lifecycle(num_users=50, seed=1, vectorized=False)
+    np.testing.assert_array_equal(np.random.get_state()[1], state)
+    with pytest.raises(ValueError):
+        generate_user_lifecycle(num_users=50, vectorized=False, n_workers=2)